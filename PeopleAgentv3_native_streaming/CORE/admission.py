@@ -0,0 +1,151 @@
+"""
+Admission control for the query path.
+
+At most max_in_flight queries run at once. Further queries wait in a bounded
+FIFO queue; a query is shed immediately when the queue is full or when its
+expected wait already exceeds its deadline, and dropped from the queue once its
+deadline passes. Shed queries get an Overloaded error carrying a Retry-After
+estimate, so transports can answer fast (HTTP 429) instead of letting every
+admitted request slow down together.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """
+    Raised when a query is not admitted. retry_after is a suggested wait in seconds.
+    """
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Service overloaded ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency plus a bounded, deadline-aware wait queue.
+    """
+
+    def __init__(self, max_in_flight=32, max_queue=64, queue_timeout=10.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()  # futures, FIFO
+        self._service_times = deque(maxlen=200)
+        self._wait_times = deque(maxlen=200)
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    def _avg_service_time(self):
+        return sum(self._service_times) / len(self._service_times) if self._service_times else 2.0
+
+    def _expected_wait(self, position):
+        """Rough wait before the query at this queue position gets a slot."""
+        return self._avg_service_time() * (position + 1) / self.max_in_flight
+
+    def retry_after(self):
+        return max(1, math.ceil(self._expected_wait(len(self._waiters))))
+
+    def _reject(self, reason):
+        self.rejected += 1
+        retry_after = self.retry_after()
+        logger.warning(f"Query shed ({reason}): in_flight={self.in_flight} queue={len(self._waiters)} "
+                       f"retry_after={retry_after}s")
+        raise Overloaded(reason, retry_after)
+
+    async def acquire(self, deadline=None):
+        """
+        Wait for a slot. deadline is an absolute time.monotonic() value; the queue
+        wait is also bounded by queue_timeout. Returns the admission timestamp.
+        """
+        enqueued = time.monotonic()
+        limit = enqueued + self.queue_timeout
+        if deadline is not None:
+            limit = min(limit, deadline)
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return self._admit(enqueued)
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue full")
+        if enqueued + self._expected_wait(len(self._waiters)) > limit:
+            self._reject("deadline unreachable")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max(0.0, limit - time.monotonic()))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the deadline hit; keep it.
+                return self._admit(enqueued)
+            waiter.cancel()
+            self.expired += 1
+            self._reject("deadline expired in queue")
+        except asyncio.CancelledError:
+            self.cancelled += 1  # client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # hand the slot we were just given to the next waiter
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        return self._admit(enqueued)
+
+    def _admit(self, enqueued):
+        now = time.monotonic()
+        self.admitted += 1
+        self._wait_times.append(now - enqueued)
+        return now
+
+    def release(self, admitted_at=None):
+        """
+        Free a slot and hand it to the oldest waiter that is still waiting.
+        """
+        if admitted_at is not None:
+            self._service_times.append(time.monotonic() - admitted_at)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)  # slot passes straight to the waiter
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, deadline=None):
+        admitted_at = await self.acquire(deadline)
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self):
+        waits = sorted(self._wait_times)
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired_in_queue": self.expired,
+            "cancelled_in_queue": self.cancelled,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            "service_ms_avg": round(1000 * self._avg_service_time(), 1),
+        }
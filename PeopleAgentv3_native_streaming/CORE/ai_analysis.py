@@ -5,7 +5,7 @@ logger = logging.getLogger(__name__)
 
 
 #analyze_query_modified
-def analyze_query(openai_client, user_query):
+async def analyze_query(openai_client, user_query):
     """
     Determine which data needs to be fetched based on the user query (Azure OpenAI).
     """
@@ -37,7 +37,7 @@ def analyze_query(openai_client, user_query):
         {"role": "user", "content": user_query}
     ]
     print("user_query:", user_query)
-    intent = openai_client.invoke(messages).content.strip().lower()
+    intent = (await openai_client.ainvoke(messages)).content.strip().lower()
     print("Generated intent:", intent)
     return intent.split(',')
 
@@ -0,0 +1,116 @@
+"""
+Application context shared by every PeopleAgent in the process.
+
+Configuration, logging, Graph credentials and the Graph / Azure OpenAI clients
+are built once here. A PeopleAgent is then only a lightweight per-conversation
+view (history, caches, session snapshot) over this context, so creating one
+costs microseconds instead of a token round trip and fresh client objects.
+
+Run as a module to benchmark agent creation:
+    python -m PeopleAgentv3_native_streaming.CORE.app_context [count]
+"""
+
+import logging
+import sys
+import threading
+import time
+
+from PeopleAgentv3_native_streaming.UTIL.config import load_config
+from PeopleAgentv3_native_streaming.UTIL.logging_setup import setup_logging
+from PeopleAgentv3_native_streaming.CORE.auth import TokenProvider
+from PeopleAgentv3_native_streaming.CORE.ms_graph_client import MSGraphClient
+from PeopleAgentv3_native_streaming.CORE.llm_client import get_chat_client
+from PeopleAgentv3_native_streaming.CORE.model_router import ModelRouter
+from PeopleAgentv3_native_streaming.CORE.admission import AdmissionController
+from PeopleAgentv3_native_streaming.CORE.cancellation import CancellationTracker
+from PeopleAgentv3_native_streaming.CORE.prefetch import PrefetchStats
+from PeopleAgentv3_native_streaming.CORE.intent_model import IntentTransitionModel, GraphCallBudget
+from PeopleAgentv3_native_streaming.CORE.fast_path import FastPathStats
+from PeopleAgentv3_native_streaming.CORE.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_app_context = None
+_app_context_lock = threading.Lock()
+
+
+class AppContext:
+    """
+    Process-wide configuration, credentials and clients.
+    """
+    def __init__(self, config=None):
+        self.config = config or load_config()
+        self.token_provider = TokenProvider(self.config)
+        if not self.token_provider.get_token():
+            logger.error("Failed to acquire access token.")
+            sys.exit(1)
+
+        self.openai_client = get_chat_client(self.config)
+        # Per-call choice between the fast and the premium deployment
+        self.model_router = ModelRouter(self.config)
+        self.graph_client = MSGraphClient(self.config, self.token_provider)
+
+        # Admission control in front of every agent's query path
+        self.admission = AdmissionController(
+            max_in_flight=self.config.get("ADMISSION_MAX_IN_FLIGHT", 32),
+            max_queue=self.config.get("ADMISSION_MAX_QUEUE", 64),
+            queue_timeout=self.config.get("ADMISSION_QUEUE_TIMEOUT", 10.0)
+        )
+
+        # Cancelled-work metrics and the running query per session
+        self.cancellations = CancellationTracker()
+
+        # Session-start prefetch outcomes (how often the first question finds warm data)
+        self.prefetch_stats = PrefetchStats()
+
+        # Intent transitions learned from all sessions, and the Graph budget for speculative refreshes
+        self.intent_model = IntentTransitionModel(self.config.get("INTENT_MODEL_FILE") or None)
+        self.prefetch_budget = GraphCallBudget(self.config.get("PREDICTIVE_PREFETCH_BUDGET", 60))
+
+        # Share of queries answered by the deterministic fast path
+        self.fast_path_stats = FastPathStats()
+
+        # Identical prompts in flight share one LLM call / stream
+        self.single_flight = SingleFlight() if self.config.get("SINGLE_FLIGHT_ENABLED", True) else None
+
+
+def get_app_context(config=None, configure_logging=True):
+    """
+    Return the process-wide AppContext, creating it (and configuring logging,
+    unless the caller already has) on first use.
+    """
+    global _app_context
+    if _app_context is None:
+        with _app_context_lock:
+            if _app_context is None:
+                config = config or load_config()
+                if configure_logging:
+                    setup_logging(config)
+                _app_context = AppContext(config)
+                logger.info("Application context initialized")
+    return _app_context
+
+
+def benchmark_agent_creation(count=1000):
+    """
+    Time PeopleAgent construction: the first agent pays for building the
+    application context, every later one only for its own per-conversation state.
+    """
+    from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+
+    started = time.perf_counter()
+    PeopleAgent("benchmark@example.com")
+    first = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index in range(count):
+        PeopleAgent(f"benchmark{index}@example.com")
+    per_agent = (time.perf_counter() - started) / count
+
+    print(f"first agent (builds app context): {first * 1000:.1f} ms")
+    print(f"subsequent agents: {per_agent * 1e6:.1f} us each over {count} agents")
+    return first, per_agent
+
+
+if __name__ == "__main__":
+    benchmark_agent_creation(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -1,5 +1,8 @@
 import msal
+import asyncio
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -23,4 +26,53 @@ def get_access_token(config):
     else:
         logger.error(f"Error getting token: {result.get('error')}")
         logger.error(f"Error description: {result.get('error_description')}")
-        return None
\ No newline at end of file
+        return None
+
+
+class TokenProvider:
+    """
+    Client-credentials token source shared by all agents.
+    Builds the MSAL application once and hands out the cached token until
+    shortly before it expires, then acquires a new one.
+    """
+    def __init__(self, config, refresh_margin=300):
+        self.config = config
+        self.refresh_margin = refresh_margin
+        self.app = msal.ConfidentialClientApplication(
+            client_id=config["client_id"],
+            authority=config["authority"],
+            client_credential=config["secret"]
+        )
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        """
+        Return a valid access token, or None if one cannot be acquired.
+        """
+        if self._token and time.time() < self._expires_at - self.refresh_margin:
+            return self._token
+        with self._lock:
+            if self._token and time.time() < self._expires_at - self.refresh_margin:
+                return self._token
+            result = self.app.acquire_token_for_client(scopes=self.config["scope"])
+            if "access_token" not in result:
+                logger.error(f"Error getting token: {result.get('error')}")
+                logger.error(f"Error description: {result.get('error_description')}")
+                return None
+            self._token = result["access_token"]
+            self._expires_at = time.time() + int(result.get("expires_in", 3600))
+            return self._token
+
+    async def aget_token(self):
+        """
+        Async accessor: the cached token is returned directly; a refresh (a blocking
+        MSAL HTTPS call) runs in a worker thread so the event loop keeps serving sessions.
+        """
+        if self._token and time.time() < self._expires_at - self.refresh_margin:
+            return self._token
+        return await asyncio.to_thread(self.get_token)
+
+    def __call__(self):
+        return self.get_token()
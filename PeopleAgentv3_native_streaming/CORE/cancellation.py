@@ -0,0 +1,75 @@
+"""
+Cancellation bookkeeping for abandoned queries.
+
+When a client disconnects, cancels a WebSocket conversation or sends a new
+query on the same session, the running query's task is cancelled. The
+CancelledError travels from the transport through the agent into the Graph
+fetches and the LLM stream, whose HTTP requests are closed at that point.
+This module records what was cut short, so the cost of abandoned questions
+is visible, and lets a new query supersede the one still running on its session.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationTracker:
+    """
+    Counts cancelled work and tracks the running query per session.
+    """
+
+    def __init__(self):
+        self.by_stage = {}  # stage -> queries cancelled while in that stage
+        self.graph_calls_cancelled = 0
+        self.llm_streams_cancelled = 0
+        self.llm_chunks_discarded = 0
+        self.superseded = 0
+        self._running = {}  # session key -> task
+
+    def record(self, stage, graph_calls=0, llm_chunks=None):
+        """
+        Record one cancelled query. stage is where it was when cancelled
+        ("graph" or "llm"); llm_chunks is set when an LLM stream was cut short.
+        """
+        self.by_stage[stage] = self.by_stage.get(stage, 0) + 1
+        self.graph_calls_cancelled += graph_calls
+        if llm_chunks is not None:
+            self.llm_streams_cancelled += 1
+            self.llm_chunks_discarded += llm_chunks
+        logger.info(f"Query cancelled during {stage} (graph calls aborted: {graph_calls}, "
+                    f"llm chunks received: {llm_chunks or 0})")
+
+    def start(self, key, task):
+        """
+        Register task as the running query for key, cancelling the one it supersedes.
+        """
+        previous = self._running.get(key)
+        if previous is not None and previous is not task and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+            logger.info(f"Query for {key} superseded by a newer one")
+        self._running[key] = task
+
+    def finish(self, key, task):
+        if self._running.get(key) is task:
+            del self._running[key]
+
+    def cancel(self, key):
+        """
+        Cancel the running query for key, if any (e.g. when its session ends).
+        """
+        task = self._running.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def stats(self):
+        return {
+            "queries_cancelled": sum(self.by_stage.values()),
+            "by_stage": dict(self.by_stage),
+            "graph_calls_cancelled": self.graph_calls_cancelled,
+            "llm_streams_cancelled": self.llm_streams_cancelled,
+            "llm_chunks_discarded": self.llm_chunks_discarded,
+            "superseded": self.superseded,
+            "running": len(self._running),
+        }
@@ -0,0 +1,121 @@
+"""
+Incremental citation parsing over a streamed answer.
+
+The model is asked to cite with [n] markers and to end with a References
+section of "[n] source" lines. CitationParser is fed the answer as it streams
+and looks at each line as soon as it is complete: inside the References section
+every "[n] source" line becomes a Citation event right away, and in the body the
+[n] markers are collected. Once the stream ends, references_block() is empty
+when the model wrote its own References section (so it is not repeated), and
+otherwise lists the "[n] source" passages found in the body, as
+PeopleAgent.extract_citations used to. No second pass over the answer is
+needed.
+"""
+
+import re
+
+_HEADER = re.compile(r"^\s*(?:#+\s*)?(?:\*\*)?references\s*:?\s*(?:\*\*)?\s*:?\s*$", re.IGNORECASE)
+_DEFINITION = re.compile(r"^\s*(?:[-*]\s*)?\[(\d+)\]\s*(.+?)\s*$")
+_BODY_CITATION = re.compile(r"\[(\d+)\]\s+(.*?)(?=\n|$)")
+_MARKER = re.compile(r"\[(\d+)\]")
+
+
+class Citation:
+    """
+    One reference: its number and the source text after the [n] marker.
+    """
+    __slots__ = ("number", "source")
+
+    def __init__(self, number, source):
+        self.number = number
+        self.source = source
+
+    def as_dict(self):
+        return {"number": self.number, "source": self.source}
+
+    def __str__(self):
+        return f"[{self.number}] {self.source}"
+
+    def __repr__(self):
+        return f"Citation({self.number!r}, {self.source!r})"
+
+
+class CitationParser:
+    """
+    Line-by-line citation state for one answer.
+    """
+
+    def __init__(self):
+        self._line = ""
+        self.in_references = False
+        self.citations = {}  # number -> Citation, in order of appearance
+        self.markers = set()
+        self._body_citations = []
+
+    def feed(self, text):
+        """
+        Consume a chunk of the answer; return the Citations completed by it.
+        """
+        self._line += text
+        if "\n" not in self._line:
+            return []
+        *lines, self._line = self._line.split("\n")
+        events = []
+        for line in lines:
+            citation = self._parse_line(line)
+            if citation is not None:
+                events.append(citation)
+        return events
+
+    def finish(self):
+        """
+        Consume the last (unterminated) line; return the remaining Citations. Without a
+        References section from the model, these are the [n] passages found in the body.
+        """
+        events = []
+        if self._line:
+            citation = self._parse_line(self._line)
+            self._line = ""
+            if citation is not None:
+                events.append(citation)
+        if not self.in_references:
+            for citation in self._body_citations:
+                if citation.number not in self.citations:
+                    self.citations[citation.number] = citation
+                    events.append(citation)
+        return events
+
+    def _parse_line(self, line):
+        if not self.in_references:
+            if _HEADER.match(line):
+                self.in_references = True
+                return None
+            for match in _MARKER.finditer(line):
+                self.markers.add(int(match.group(1)))
+            for match in _BODY_CITATION.finditer(line):
+                if match.group(2).strip():
+                    self._body_citations.append(Citation(int(match.group(1)), match.group(2).strip()))
+            return None
+        found = _DEFINITION.match(line)
+        if found is None:
+            return None
+        number = int(found.group(1))
+        if number in self.citations:
+            return None  # repeated reference line
+        citation = Citation(number, found.group(2))
+        self.citations[number] = citation
+        return citation
+
+    def references_block(self):
+        """
+        Block to append after the answer: empty when the model wrote its own References.
+        """
+        if self.in_references or not self.citations:
+            return ""
+        return "\n\nReferences:\n" + "\n".join(str(citation) for citation in self.citations.values())
+
+    def unresolved(self):
+        """
+        Markers used in the body without a matching reference.
+        """
+        return sorted(self.markers - set(self.citations))
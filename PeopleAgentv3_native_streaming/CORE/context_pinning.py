@@ -0,0 +1,133 @@
+"""
+Session-level context snapshot with per-turn deltas.
+
+The first turn of a session pins every successfully fetched source into a
+snapshot that is placed in the stable prompt prefix (see build_messages in
+response_generation.py). Later turns only send the sources whose fingerprint
+changed since the snapshot, plus sources fetched for the first time, so
+follow-up questions carry a small fresh payload while the snapshot is served
+from the provider's prompt cache.
+"""
+
+import hashlib
+import json
+import logging
+
+from PeopleAgentv3_native_streaming.CORE.context_serializer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def source_fingerprint(data):
+    """
+    Stable fingerprint of one formatted source (dict, list or error string).
+    """
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SessionContext:
+    """
+    Tracks the pinned snapshot for one conversation and splits each turn's
+    context into the snapshot (unchanged sources) and a delta.
+    """
+
+    def __init__(self, render, subject, repin_ratio=0.5):
+        """
+        Args:
+            render: Callable turning a context dict into prompt text.
+            subject: The user identifier the session is about.
+            repin_ratio: Re-pin the snapshot once more than this share of
+                pinned sources has changed, instead of growing the delta.
+        """
+        self.render = render
+        self.subject = subject
+        self.repin_ratio = repin_ratio
+        self.fingerprints = {}
+        self.pinned = {}
+        self.pinned_text = None
+        self.turns = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self.last_full_tokens = 0
+
+    def reset(self):
+        self.fingerprints = {}
+        self.pinned = {}
+        self.pinned_text = None
+        self.turns = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self.last_full_tokens = 0
+
+    def is_pinned(self, key):
+        return key in self.fingerprints
+
+    def _pin(self, context):
+        # Pinned sources missing from this turn (e.g. late, see _gather_context) keep their value
+        pinnable = {key: data for key, data in self.pinned.items() if key not in context}
+        pinnable.update((key, data) for key, data in context.items() if not isinstance(data, str))
+        self.pinned = pinnable
+        self.fingerprints = {key: source_fingerprint(data) for key, data in pinnable.items()}
+        self.pinned_text = self.render({"subject": self.subject, **pinnable})
+        logger.info(f"Pinned session snapshot for {self.subject}: sources={sorted(pinnable)}")
+
+    def update(self, context):
+        """
+        Fold this turn's context into the session and return the delta to send.
+
+        Error strings are never pinned: they are sent with every turn until the
+        source recovers, at which point it shows up as a new source. A pinned source
+        left out of the context is sent as nothing; its Session Data value stands.
+        """
+        pinned_now = self.pinned_text is None
+        if pinned_now:
+            self._pin(context)
+
+        delta = {}
+        changed = 0
+        for key, data in context.items():
+            if isinstance(data, str):
+                delta[key] = data
+                continue
+            fingerprint = self.fingerprints.get(key)
+            if fingerprint != source_fingerprint(data):
+                # An emptied source would render as nothing; say so explicitly
+                delta[key] = data if data or fingerprint is None else "none (changed since Session Data)"
+                if fingerprint is not None:
+                    changed += 1
+
+        if self.fingerprints and changed / len(self.fingerprints) > self.repin_ratio:
+            logger.info(f"{changed} of {len(self.fingerprints)} pinned sources changed, re-pinning snapshot")
+            self._pin(context)
+            pinned_now = True
+            delta = {key: data for key, data in context.items() if isinstance(data, str)}
+
+        self._account(context, delta, pinned_now)
+        return delta
+
+    def _account(self, context, delta, pinned_now):
+        """
+        Log full-context tokens (previous behaviour) against the fresh tokens this
+        turn actually adds. The snapshot counts as fresh only on the turn it is pinned;
+        afterwards it is part of the cached prefix.
+        """
+        full = count_tokens(self.render(context))
+        sent = count_tokens(self.render(delta)) if delta else 0
+        if pinned_now:
+            sent += count_tokens(self.pinned_text)
+        self.turns += 1
+        self.last_full_tokens = full
+        self.full_tokens += full
+        self.sent_tokens += sent
+        saved_pct = 100.0 * (full - sent) / full if full else 0.0
+        logger.info(f"Context tokens turn={self.turns} full={full} delta={sent} saved={saved_pct:.1f}% "
+                    f"(session full={self.full_tokens} delta={self.sent_tokens}) delta_sources={sorted(delta)}")
+
+    def stats(self):
+        return {
+            "turns": self.turns,
+            "full_tokens": self.full_tokens,
+            "sent_tokens": self.sent_tokens,
+            "saved_tokens": self.full_tokens - self.sent_tokens,
+        }
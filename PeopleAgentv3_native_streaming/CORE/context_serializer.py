@@ -0,0 +1,301 @@
+"""
+Compact serialization of the Graph context that is sent to the LLM.
+
+The prompt used to embed the context via str(dict), which repeats every key
+for every row and spends tokens on Python quoting. This module renders the
+same data as:
+  - "key: k=v; k=v" lines for single records (profile, manager)
+  - header-once tables for collections (devices, reports, all_users, ...)
+  - short, stable key aliases with a legend of only the aliases used
+  - a reference table for long strings that repeat across the context
+Null, empty and "Unknown" values and OData metadata are left out entirely.
+Separators inside values are backslash-escapes ("\\|", "\\;", "\\n", "\\\\"),
+so the data reaches the model unchanged.
+
+Run as a module to compare token counts on recorded contexts:
+    python -m PeopleAgentv3_native_streaming.CORE.context_serializer contexts.jsonl
+"""
+
+import json
+import logging
+import sys
+from collections import Counter
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain-openai, but stay usable without it
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Stable key aliases. Never reuse an alias for a different key: cached prompts
+# and recorded contexts rely on these staying the same between releases.
+KEY_ALIASES = {
+    "name": "n",
+    "displayName": "dn",
+    "email": "e",
+    "mail": "m",
+    "userPrincipalName": "upn",
+    "title": "t",
+    "jobTitle": "jt",
+    "location": "loc",
+    "officeLocation": "ol",
+    "timezone": "tz",
+    "manufacturer": "mfr",
+    "model": "mdl",
+    "status": "st",
+    "type": "ty",
+    "department": "dep",
+    "businessPhones": "ph",
+    "mobilePhone": "mob",
+    "givenName": "gn",
+    "surname": "sn",
+    "preferredLanguage": "lang",
+    "companyName": "co",
+    "scoredEmailAddresses": "sea",
+    "address": "addr",
+    "relevanceScore": "rs",
+    "personType": "pt",
+    "lastModifiedDateTime": "mod",
+    "createdDateTime": "cre",
+    "webUrl": "url",
+    "remoteItem": "ri",
+    "lastModifiedBy": "lmb",
+    "user": "u",
+    "size": "sz",
+    "file": "f",
+    "mimeType": "mime",
+}
+
+# Strings at least this long that occur more than once are deduplicated.
+DEDUP_MIN_LENGTH = 16
+
+# Cells are joined with this separator, so it must be escaped inside values.
+CELL_SEPARATOR = "|"
+
+# Reversible escapes for characters that would break a row or a "k=v; k=v" record.
+# The backslash goes first so escapes added later are not escaped again.
+_ESCAPES = (("\\", "\\\\"), ("\n", "\\n"), (CELL_SEPARATOR, "\\" + CELL_SEPARATOR), (";", "\\;"))
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip() in ("", "Unknown")
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+class _Renderer:
+    """
+    Renders one context. Collects the aliases and repeated strings it sees so
+    the legend and reference table only contain what the body actually uses.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.refs = {}
+        self.used_aliases = set()
+
+    def _alias(self, key):
+        alias = KEY_ALIASES.get(key)
+        if alias is None:
+            return key
+        self.used_aliases.add(alias)
+        return alias
+
+    def _is_kept(self, value):
+        if isinstance(value, dict):
+            return any(self._is_kept(item) for item in value.values())
+        return not _is_empty(value)
+
+    def _flatten(self, record, prefix=""):
+        """
+        Flatten nested dicts into dotted keys, dropping metadata and empty values.
+        """
+        flat = {}
+        for key, value in record.items():
+            if key.startswith("@odata") or (key == "id" and prefix) or not self._is_kept(value):
+                continue
+            dotted = f"{prefix}{self._alias(key)}"
+            if isinstance(value, dict):
+                flat.update(self._flatten(value, f"{dotted}."))
+            elif isinstance(value, list):
+                flat[dotted] = [item for item in value if not _is_empty(item)]
+            else:
+                flat[dotted] = value
+        return flat
+
+    def render(self):
+        sections = {key: self._normalize(value) for key, value in self.context.items()}
+        self.refs = self._find_repeats(sections)
+
+        body = []
+        for key, value in sections.items():
+            if value is None:
+                continue
+            body.extend(self._render_section(key, value))
+
+        header = []
+        if self.used_aliases:
+            header.append("#keys " + " ".join(
+                f"{alias}={key}" for key, alias in KEY_ALIASES.items() if alias in self.used_aliases))
+        for text, ref in self.refs.items():
+            header.append(f"#ref {ref}={self._escape(text)}")
+        return "\n".join(header + body)
+
+    def _normalize(self, value):
+        if isinstance(value, dict):
+            flat = self._flatten(value)
+            return flat or None
+        if isinstance(value, list):
+            rows = []
+            for item in value:
+                if isinstance(item, dict):
+                    flat = self._flatten(item)
+                    if flat:
+                        rows.append(flat)
+                elif not _is_empty(item):
+                    rows.append(item)
+            return rows or None
+        if _is_empty(value):
+            return None
+        return value
+
+    def _find_repeats(self, sections):
+        counts = Counter()
+
+        def visit(value):
+            if isinstance(value, dict):
+                for item in value.values():
+                    visit(item)
+            elif isinstance(value, list):
+                for item in value:
+                    visit(item)
+            elif isinstance(value, str) and len(value) >= DEDUP_MIN_LENGTH:
+                counts[value] += 1
+
+        for value in sections.values():
+            if isinstance(value, (dict, list)):
+                visit(value)
+        repeats = [text for text, count in counts.items() if count > 1]
+        return {text: f"~{index}" for index, text in enumerate(repeats, 1)}
+
+    def _escape(self, value):
+        text = str(value)
+        for raw, escaped in _ESCAPES:
+            text = text.replace(raw, escaped)
+        return text
+
+    def _cell(self, value):
+        if isinstance(value, dict):
+            return " ".join(f"{name}:{self._cell(item)}" for name, item in self._flatten(value).items())
+        if isinstance(value, list):
+            return ",".join(self._cell(item) for item in value)
+        if isinstance(value, float):
+            return f"{value:g}"
+        if isinstance(value, str) and value in self.refs:
+            return self.refs[value]
+        return self._escape(value)
+
+    def _render_section(self, key, value):
+        if isinstance(value, dict):
+            pairs = "; ".join(f"{name}={self._cell(item)}" for name, item in value.items())
+            return [f"{key}: {pairs}"]
+        if isinstance(value, list):
+            if not all(isinstance(row, dict) for row in value):
+                return [f"{key}[{len(value)}]: " + ", ".join(self._cell(row) for row in value)]
+            columns = []
+            for row in value:
+                for column in row:
+                    if column not in columns:
+                        columns.append(column)
+            lines = [f"{key}[{len(value)}]{{{','.join(columns)}}}:"]
+            for row in value:
+                lines.append(CELL_SEPARATOR.join(self._cell(row[column]) if column in row else "" for column in columns))
+            return lines
+        return [f"{key}: {self._cell(value)}"]
+
+
+def serialize_context(context):
+    """
+    Render a context dict (as built by PeopleAgent._process_query_core) in the
+    compact prompt format. Non-dict contexts are returned as plain strings.
+    """
+    if not isinstance(context, dict):
+        return str(context)
+    return _Renderer(context).render()
+
+
+def count_tokens(text, model="gpt-4o"):
+    """
+    Count prompt tokens with tiktoken when available, otherwise estimate
+    (roughly 4 characters per token for English text).
+    """
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def measure_context_tokens(context, model="gpt-4o"):
+    """
+    Compare the token cost of the legacy str(dict) format with the compact format.
+    """
+    legacy_tokens = count_tokens(str(context), model)
+    compact_tokens = count_tokens(serialize_context(context), model)
+    saved = legacy_tokens - compact_tokens
+    return {
+        "legacy_tokens": legacy_tokens,
+        "compact_tokens": compact_tokens,
+        "saved_tokens": saved,
+        "saved_pct": round(100.0 * saved / legacy_tokens, 1) if legacy_tokens else 0.0,
+    }
+
+
+def record_context(path, context):
+    """
+    Append a context as one JSON line so it can be measured offline later.
+    """
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(context, default=str) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not record context to {path}: {e}")
+
+
+def main(argv=None):
+    """
+    Print legacy vs compact token counts for every context recorded in the given JSONL files.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python -m PeopleAgentv3_native_streaming.CORE.context_serializer contexts.jsonl [...]")
+        return 1
+
+    total_legacy = total_compact = records = 0
+    for path in argv:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                stats = measure_context_tokens(json.loads(line))
+                records += 1
+                total_legacy += stats["legacy_tokens"]
+                total_compact += stats["compact_tokens"]
+                print(f"{path}:{line_number} legacy={stats['legacy_tokens']} "
+                      f"compact={stats['compact_tokens']} saved={stats['saved_pct']}%")
+
+    if records:
+        saved_pct = 100.0 * (total_legacy - total_compact) / total_legacy if total_legacy else 0.0
+        print(f"{records} contexts: legacy={total_legacy} compact={total_compact} saved={saved_pct:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
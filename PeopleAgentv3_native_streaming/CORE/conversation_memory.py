@@ -0,0 +1,174 @@
+"""
+Token-aware conversation memory with a rolling summary.
+
+Recent turns are kept verbatim up to a token budget (assistant answers are
+stored without their References block). Older turns are folded out of the
+window into a rolling summary plus a small set of structured facts, produced
+by the LLM in a background task after the answer has been delivered, so the
+history part of every prompt stays roughly constant in size however long the
+session runs. Until the background summary catches up, folded turns are still
+sent verbatim, so nothing is lost in between.
+"""
+
+import asyncio
+import json
+import logging
+import re
+
+from PeopleAgentv3_native_streaming.CORE.context_serializer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """
+You maintain the memory of a conversation about people in an organisation.
+Merge the new turns into the current summary and facts. Reply with JSON only:
+{"summary": "<at most WORDS words: what was asked and answered, oldest first>",
+ "facts": {"<short key>": "<short value>", ...}}
+Facts are durable specifics worth remembering (names, titles, managers, locations, counts, user preferences).
+Keep existing facts unless the new turns correct them.
+"""
+
+_REFERENCES = re.compile(r"\n+References:\n.*\Z", re.DOTALL)
+
+
+def strip_references(text):
+    """
+    Drop a trailing References block; it is re-derived per answer and only costs tokens in history.
+    """
+    return _REFERENCES.sub("", text)
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + 4  # role and separators
+
+
+class ConversationMemory:
+    """
+    Rolling summary and facts for the turns folded out of an agent's history window.
+    """
+
+    def __init__(self, openai_client, token_budget=800, max_messages=10, summary_words=120):
+        self.openai_client = openai_client
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summary_words = summary_words
+        self.summary = ""
+        self.facts = {}
+        self.pending = []  # folded messages not yet in the summary
+        self.folded = 0
+        self.summaries = 0
+        self.failures = 0
+        self._task = None
+
+    def fold(self, history):
+        """
+        Return the part of history that fits the token budget (and max_messages),
+        moving older messages to the pending summary queue.
+        """
+        kept = list(history)
+        tokens = sum(message_tokens(message) for message in kept)
+        folded = []
+        # Always keep the latest exchange verbatim
+        while len(kept) > 2 and (tokens > self.token_budget or len(kept) > self.max_messages):
+            message = kept.pop(0)
+            tokens -= message_tokens(message)
+            folded.append(message)
+        if folded:
+            self.pending.extend(folded)
+            self.folded += len(folded)
+            self._schedule()
+        return kept
+
+    def prompt_history(self, history):
+        """
+        Messages to send as history: folded turns not yet summarized, then the window.
+        """
+        return self.pending + list(history)
+
+    def prompt_text(self):
+        """
+        The summary and facts as one compact block for the prompt, or None before the first fold.
+        """
+        if not self.summary and not self.facts:
+            return None
+        parts = []
+        if self.summary:
+            parts.append(f"Earlier in this conversation: {self.summary}")
+        if self.facts:
+            parts.append("Known facts: " + "; ".join(f"{key}: {value}" for key, value in self.facts.items()))
+        return "\n".join(parts)
+
+    def _schedule(self):
+        if self._task is not None and not self._task.done():
+            return  # the running task drains everything pending
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._summarize())
+        except RuntimeError:
+            self._extractive_fallback(len(self.pending))  # no event loop (sync callers)
+
+    async def _summarize(self):
+        while self.pending:
+            batch = len(self.pending)
+            transcript = "\n".join(f"{message['role']}: {message['content']}" for message in self.pending[:batch])
+            messages = [
+                {"role": "system", "content": SUMMARY_PROMPT.replace("WORDS", str(self.summary_words))},
+                {"role": "user", "content": f"Current summary: {self.summary or 'none'}\n"
+                                            f"Current facts: {json.dumps(self.facts)}\nNew turns:\n{transcript}"},
+            ]
+            try:
+                reply = (await self.openai_client.ainvoke(messages)).content
+                data = json.loads(reply[reply.index("{"):reply.rindex("}") + 1])
+                self.summary = str(data.get("summary", self.summary)).strip()
+                if isinstance(data.get("facts"), dict):
+                    self.facts = {str(key): str(value) for key, value in data["facts"].items()}
+                self.summaries += 1
+                del self.pending[:batch]
+                logger.info(f"Conversation summary updated: {batch} messages folded, "
+                            f"summary={count_tokens(self.summary)} tokens, facts={len(self.facts)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Conversation summary failed, keeping questions only: {str(e)}")
+                self._extractive_fallback(batch)
+
+    def _extractive_fallback(self, batch):
+        """
+        Fold pending messages without the LLM: keep only the questions that were asked.
+        """
+        questions = [message["content"] for message in self.pending[:batch] if message["role"] == "user"]
+        if questions:
+            asked = "; ".join(questions)
+            self.summary = f"{self.summary}; {asked}" if self.summary else f"Earlier questions: {asked}"
+            words = self.summary.split()
+            if len(words) > self.summary_words:
+                self.summary = " ".join(words[-self.summary_words:])
+        del self.pending[:batch]
+
+    def reset(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self.summary = ""
+        self.facts = {}
+        self.pending = []
+
+    def snapshot(self):
+        return {"summary": self.summary, "facts": self.facts, "pending": self.pending}
+
+    def restore(self, saved):
+        if not saved:
+            return
+        self.summary = saved.get("summary", "")
+        self.facts = saved.get("facts", {})
+        self.pending = saved.get("pending", [])
+
+    def stats(self):
+        return {
+            "folded_messages": self.folded,
+            "pending": len(self.pending),
+            "summaries": self.summaries,
+            "failures": self.failures,
+            "summary_tokens": count_tokens(self.summary) if self.summary else 0,
+            "facts": len(self.facts),
+        }
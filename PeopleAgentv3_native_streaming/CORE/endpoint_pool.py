@@ -0,0 +1,244 @@
+"""
+Load balancing and failover across Azure OpenAI endpoints serving the same deployment.
+
+The same model can be deployed in several regions or resources (AOAI_ENDPOINT
+plus AOAI_ENDPOINTS). An EndpointPool holds one shared chat client per
+endpoint and picks one per call:
+
+- Sticky: a session key (the user the conversation is about, whose pinned data
+  forms the prompt prefix) keeps going to the same endpoint, so that endpoint's
+  prompt cache keeps the prefix warm.
+- Latency-weighted: new keys, and keys whose endpoint is unavailable, go to a
+  healthy endpoint chosen at random with weight 1 / (EWMA latency x load).
+- Health: an endpoint is taken out for a cooldown after consecutive failures,
+  and skipped while its scheduler is paused by a 429 (Retry-After).
+- Failover: a failed call moves straight to the next endpoint (the per-endpoint
+  client only retries on the last candidate). A stream fails over only before
+  its first chunk.
+
+With a single endpoint the pool is a pass-through to that client.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from PeopleAgentv3_native_streaming.CORE.admission import Overloaded
+from PeopleAgentv3_native_streaming.CORE.llm_client import get_chat_client
+from PeopleAgentv3_native_streaming.CORE.rate_limiter import is_rate_limited, is_transient
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def parse_endpoints(config):
+    """
+    [(endpoint, key)] from AOAI_ENDPOINT / AOAI_KEY and AOAI_ENDPOINTS ("url|key,url|key"; key optional).
+    """
+    endpoints = [(config.get("AOAI_ENDPOINT", ""), config.get("AOAI_KEY", ""))]
+    for entry in config.get("AOAI_ENDPOINTS", []):
+        url, _, key = entry.partition("|")
+        url = url.strip()
+        if url and url not in [known for known, _ in endpoints]:
+            endpoints.append((url, key.strip() or config.get("AOAI_KEY", "")))
+    return endpoints
+
+
+def endpoint_name(url):
+    return urlparse(url).hostname or url
+
+
+class EndpointState:
+    """
+    Health and latency of one endpoint.
+    """
+
+    def __init__(self, name, client, alpha=0.2):
+        self.name = name
+        self.client = client
+        self.alpha = alpha
+        self.ewma = None  # seconds
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+
+    def available(self, now):
+        return now >= self.down_until and now >= self.client.scheduler.paused_until
+
+    def weight(self, untried_latency=1.0):
+        latency = self.ewma if self.ewma is not None else untried_latency
+        load = 1 + self.client.in_flight + len(self.client.scheduler._waiting)
+        return 1.0 / (latency * load)
+
+    def succeeded(self, seconds):
+        self.calls += 1
+        self.consecutive_errors = 0
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def failed(self, threshold, cooldown):
+        self.calls += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        if self.consecutive_errors >= threshold:
+            self.down_until = time.monotonic() + cooldown
+            logger.warning(f"LLM endpoint {self.name} marked unhealthy for {cooldown:.0f} s "
+                           f"after {self.consecutive_errors} consecutive errors")
+
+    def stats(self, now):
+        return {
+            "healthy": self.available(now),
+            "calls": self.calls,
+            "errors": self.errors,
+            "ewma_ms": round(1000 * self.ewma) if self.ewma is not None else None,
+            "in_flight": self.client.in_flight,
+        }
+
+
+class EndpointPool:
+    """
+    Same interface as the shared chat client; pass session= to ainvoke / astream for stickiness.
+    """
+
+    def __init__(self, config, get_client=get_chat_client):
+        self.members = [
+            EndpointState(endpoint_name(url), get_client(dict(config, AOAI_ENDPOINT=url, AOAI_KEY=key)))
+            for url, key in parse_endpoints(config)
+        ]
+        self.failure_threshold = config.get("LLM_ENDPOINT_FAILURE_THRESHOLD", 3)
+        self.cooldown = config.get("LLM_ENDPOINT_COOLDOWN", 30.0)
+        self.sticky_limit = config.get("LLM_STICKY_SESSIONS", 10000)
+        self._sticky = OrderedDict()  # session -> member index
+        self.sticky_hits = 0
+        self.sticky_moves = 0
+        self.failovers = 0
+
+    @property
+    def in_flight(self):
+        return sum(member.client.in_flight for member in self.members)
+
+    def _candidates(self, session):
+        """
+        Members in the order to try them: the sticky or weighted pick first, then the
+        other available ones by weight, then the unavailable ones as a last resort.
+        """
+        now = time.monotonic()
+        available = [index for index, member in enumerate(self.members) if member.available(now)]
+        if not available:
+            return list(range(len(self.members)))
+        # Unmeasured endpoints count as fast as the best one so they get tried
+        measured = [member.ewma for member in self.members if member.ewma is not None]
+        untried = min(measured) if measured else 1.0
+        weight = lambda index: self.members[index].weight(untried)
+        sticky = self._sticky.get(session) if session is not None else None
+        if sticky in available:
+            first = sticky
+            self.sticky_hits += 1
+        else:
+            first = random.choices(available, weights=[weight(index) for index in available])[0]
+            if sticky is not None:
+                self.sticky_moves += 1
+        if session is not None:
+            self._sticky[session] = first
+            self._sticky.move_to_end(session)
+            while len(self._sticky) > self.sticky_limit:
+                self._sticky.popitem(last=False)
+        rest = sorted((index for index in available if index != first), key=lambda index: -weight(index))
+        return [first] + rest + [index for index in range(len(self.members)) if index not in available]
+
+    def _failover(self, member, error, last):
+        """
+        Record a failed call and say whether to try the next endpoint. Request errors
+        (4xx other than 429) would fail anywhere and do not count against the endpoint.
+        """
+        if not (is_rate_limited(error) or is_transient(error)):
+            return False
+        if not (is_rate_limited(error) or isinstance(error, Overloaded)):
+            # Throttling and quota queueing are capacity, not health; the scheduler pause covers 429s
+            member.failed(self.failure_threshold, self.cooldown)
+        if not last:
+            self.failovers += 1
+        logger.warning(f"LLM endpoint {member.name} failed: {str(error)}" + ("" if last else ", failing over"))
+        return not last
+
+    def _call_kwargs(self, kwargs, last):
+        # Only the last candidate spends the per-endpoint retries; earlier ones fail over at once
+        return kwargs if last else dict(kwargs, retries=0)
+
+    def invoke(self, messages, **kwargs):
+        kwargs.pop("session", None)
+        return self.members[0].client.invoke(messages, **kwargs)
+
+    def stream(self, messages, **kwargs):
+        kwargs.pop("session", None)
+        return self.members[0].client.stream(messages, **kwargs)
+
+    async def ainvoke(self, messages, **kwargs):
+        order = self._candidates(kwargs.pop("session", None))
+        for position, index in enumerate(order):
+            member, last = self.members[index], position == len(order) - 1
+            started = time.perf_counter()
+            try:
+                reply = await member.client.ainvoke(messages, **self._call_kwargs(kwargs, last))
+            except Exception as e:
+                if not self._failover(member, e, last):
+                    raise
+                continue
+            member.succeeded(time.perf_counter() - started)
+            return reply
+
+    async def astream(self, messages, **kwargs):
+        order = self._candidates(kwargs.pop("session", None))
+        for position, index in enumerate(order):
+            member, last = self.members[index], position == len(order) - 1
+            started = time.perf_counter()
+            first_chunk = None
+            stream = member.client.astream(messages, **self._call_kwargs(kwargs, last))
+            try:
+                async for chunk in stream:
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    yield chunk
+            except Exception as e:
+                if not self._failover(member, e, last or first_chunk is not None):
+                    raise
+                continue
+            finally:
+                await stream.aclose()
+            # Time to first chunk is what the endpoint choice affects
+            member.succeeded((first_chunk or time.perf_counter()) - started)
+            return
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "endpoints": {member.name: member.stats(now) for member in self.members},
+            "sticky_sessions": len(self._sticky),
+            "sticky_hits": self.sticky_hits,
+            "sticky_moves": self.sticky_moves,
+            "failovers": self.failovers,
+        }
+
+
+def get_endpoint_pool(config):
+    """
+    Return the shared endpoint pool for the configured deployment.
+    """
+    key = config.get("AOAI_DEPLOYMENT", "")
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = EndpointPool(config)
+            _pools[key] = pool
+            logger.info(f"LLM endpoint pool for deployment {key}: {[member.name for member in pool.members]}")
+        return pool
+
+
+def endpoint_stats():
+    with _pools_lock:
+        return {deployment: pool.stats() for deployment, pool in _pools.items()}
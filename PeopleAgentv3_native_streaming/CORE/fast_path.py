@@ -0,0 +1,202 @@
+"""
+Deterministic fast-path answers for simple lookups.
+
+Questions such as "who is her manager", "what's his title", "where is she
+located", "what time is it for her" or "how many direct reports does he have" are matched against a small
+set of templates. The answer is then rendered straight from the structured
+output of PeopleAgent.format_data, with References in the same "[n] ..." format
+the LLM is asked to produce. Only the sources a template needs are fetched.
+
+A template only answers when it is confident: the whole question matches, the
+subject is the session's user (a pronoun, "my", or their name / email), the
+source was fetched fresh without error, and the field has a value. Anything
+else falls back to the LLM path.
+"""
+
+import logging
+import re
+
+from PeopleAgentv3_native_streaming.CORE.timezones import local_time
+
+logger = logging.getLogger(__name__)
+
+PRONOUNS = {"her", "his", "their", "my", "she", "he", "they", "them", "me", "i", "this user", "the user"}
+
+_WHO = r"(?P<who>[\w .@'-]+?)"
+_POSSESSIVE = r"(?:'s|s'|’s)?"
+
+
+class Template:
+    """
+    One question type: the patterns that recognise it, the sources it needs and how to render it.
+    """
+
+    def __init__(self, name, patterns, sources, render):
+        self.name = name
+        self.patterns = [re.compile(rf"^\s*{pattern}\s*[?.!]*\s*$", re.IGNORECASE) for pattern in patterns]
+        self.sources = sources
+        self.render = render
+
+    def match(self, query):
+        for pattern in self.patterns:
+            found = pattern.match(query)
+            if found:
+                return found.group("who").strip()
+        return None
+
+
+def _known(value):
+    return value not in (None, "", "Unknown") and not isinstance(value, (dict, list))
+
+
+def _graph_ref(path, label):
+    return f"{label} (Graph API): {path}"
+
+
+def _render_manager(context, subject):
+    manager, profile = context.get("manager"), context.get("profile")
+    if not isinstance(manager, dict) or not _known(manager.get("name")):
+        return None
+    name = profile.get("name") if isinstance(profile, dict) and _known(profile.get("name")) else subject
+    details = ", ".join(part for part in (manager.get("title"), manager.get("email")) if _known(part))
+    text = f"{name}'s manager is **{manager['name']}**" + (f" ({details})" if details else "") + ". [1]"
+    return text, [_graph_ref(f"/users/{subject}/manager", "Manager")]
+
+
+def _profile_field(field, phrase):
+    def render(context, subject):
+        profile = context.get("profile")
+        if not isinstance(profile, dict) or not _known(profile.get(field)):
+            return None
+        name = profile.get("name") if _known(profile.get("name")) else subject
+        return f"{name}'s {phrase} is **{profile[field]}**. [1]", [_graph_ref(f"/users/{subject}", "Profile")]
+    return render
+
+
+def _render_local_time(context, subject):
+    profile = context.get("profile")
+    if not isinstance(profile, dict) or not _known(profile.get("timezone")):
+        return None
+    name = profile.get("name") if _known(profile.get("name")) else subject
+    return (f"It is currently **{local_time(profile['timezone'])}** for {name}. [1]",
+            [_graph_ref(f"/users/{subject}", "Profile")])
+
+
+def _render_report_count(context, subject):
+    reports, profile = context.get("reports"), context.get("profile")
+    if not isinstance(reports, list):
+        return None
+    name = profile.get("name") if isinstance(profile, dict) and _known(profile.get("name")) else subject
+    names = [report.get("displayName") for report in reports if isinstance(report, dict) and report.get("displayName")]
+    count = len(reports)
+    text = f"{name} has **{count}** direct report{'s' if count != 1 else ''}"
+    if names and count <= 10:
+        text += f": {', '.join(names)}"
+    return text + ". [1]", [_graph_ref(f"/users/{subject}/directReports", "Direct reports")]
+
+
+TEMPLATES = [
+    Template("manager", [
+        rf"(?:who|what) is {_WHO}{_POSSESSIVE} manager",
+        rf"who(?:'s| is) {_WHO}{_POSSESSIVE} (?:boss|manager)",
+        rf"who does {_WHO} report to",
+    ], ("profile", "manager"), _render_manager),
+    Template("title", [
+        rf"what(?:'s| is) {_WHO}{_POSSESSIVE} (?:job )?title",
+        rf"what(?:'s| is) {_WHO}{_POSSESSIVE} (?:role|position)",
+    ], ("profile",), _profile_field("title", "job title")),
+    Template("location", [
+        rf"where is {_WHO} (?:located|based)",
+        rf"where does {_WHO} work",
+        rf"what(?:'s| is) {_WHO}{_POSSESSIVE} (?:office )?location",
+    ], ("profile",), _profile_field("location", "office location")),
+    Template("email", [
+        rf"what(?:'s| is) {_WHO}{_POSSESSIVE} (?:email|e-mail|mail)(?: address)?",
+    ], ("profile",), _profile_field("email", "email address")),
+    Template("local_time", [
+        rf"what time is it (?:for|where) {_WHO}(?: is)?",
+        rf"what(?:'s| is) {_WHO}{_POSSESSIVE} (?:local )?time",
+    ], ("profile",), _render_local_time),
+    Template("report_count", [
+        rf"how many (?:direct )?reports does {_WHO} have",
+        rf"how many people report to {_WHO}",
+    ], ("profile", "reports"), _render_report_count),
+]
+
+
+def match_question(query):
+    """
+    Return (template, who) for a templated question, or None.
+    """
+    for template in TEMPLATES:
+        who = template.match(query)
+        if who is not None:
+            return template, who
+    return None
+
+
+def is_subject(who, subject, profile):
+    """
+    True if the question's subject is the session's user.
+    """
+    who = who.lower().strip()
+    if who in PRONOUNS or who == subject.lower():
+        return True
+    if isinstance(profile, dict):
+        name = (profile.get("name") or "").lower()
+        email = (profile.get("email") or "").lower()
+        return bool(who) and (who == name or who == email or who == name.split(" ")[0])
+    return False
+
+
+def render_answer(template, who, context, subject):
+    """
+    Return (text, references_block, None), or (None, None, reason) when not confident.
+    references_block is in the agent's usual "\n\nReferences:\n[1] ..." form.
+    """
+    if not is_subject(who, subject, context.get("profile")):
+        return None, None, "other subject"
+    partial = context.get("partial", "")
+    for source in template.sources:
+        if isinstance(context.get(source), str) or source in partial:
+            return None, None, f"{source} unavailable"
+    rendered = template.render(context, subject)
+    if rendered is None:
+        return None, None, "missing field"
+    text, references = rendered
+    numbered = "\n".join(f"[{index}] {reference}" for index, reference in enumerate(references, 1))
+    return text, f"\n\nReferences:\n{numbered}", None
+
+
+class FastPathStats:
+    """
+    Share of queries answered without the LLM, with fallback reasons.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.matched = 0
+        self.answered = 0
+        self.by_template = {}
+        self.fallbacks = {}
+
+    def record(self, template=None, answered=False, reason=None):
+        self.queries += 1
+        if template is None:
+            return
+        self.matched += 1
+        if answered:
+            self.answered += 1
+            self.by_template[template] = self.by_template.get(template, 0) + 1
+        else:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def stats(self):
+        return {
+            "queries": self.queries,
+            "matched": self.matched,
+            "answered": self.answered,
+            "share": round(self.answered / self.queries, 4) if self.queries else 0.0,
+            "by_template": dict(self.by_template),
+            "fallbacks": dict(self.fallbacks),
+        }
@@ -0,0 +1,119 @@
+"""
+Hedged requests for small idempotent Graph GETs.
+
+If a request has not completed by its source's observed p90 latency, a
+duplicate is sent and whichever finishes first wins; the other is cancelled.
+Hedges are capped at a fraction of all hedgeable requests (the tenant budget),
+so a Graph-wide slowdown cannot double the request rate.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Per-source latency tracking and the hedge decision.
+    """
+
+    def __init__(self, sources=("profile", "manager"), budget=0.05, min_samples=20, window=200):
+        """
+        Args:
+            sources: Graph sources that may be hedged (cheap, idempotent GETs only).
+            budget: Maximum hedges as a share of hedgeable requests.
+            min_samples: Latency samples needed per source before hedging starts.
+            window: Latency samples kept per source.
+        """
+        self.sources = set(sources)
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.latencies = {}  # source -> deque of seconds
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self.denied = 0
+
+    def p90(self, source):
+        samples = self.latencies.get(source)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def _observe(self, source, seconds):
+        self.latencies.setdefault(source, deque(maxlen=self.window)).append(seconds)
+
+    def _observe_primary(self, source, started, task):
+        """
+        Record the primary request's own latency, not the winner's: a hedge win would
+        otherwise pull the p90 down. A primary cancelled as the loser is recorded with
+        the time it had taken so far, a lower bound on its latency; failures are not recorded.
+        """
+        if task.cancelled() or task.exception() is None:
+            self._observe(source, time.monotonic() - started)
+
+    def _allow(self):
+        return self.hedged < self.budget * self.requests
+
+    async def run(self, source, request):
+        """
+        Await request() for source, hedging with a second request() if the first is
+        slower than the source's p90. request is a zero-argument coroutine function.
+        """
+        self.requests += 1
+        started = time.monotonic()
+        delay = self.p90(source)
+        primary = asyncio.ensure_future(request())
+        primary.add_done_callback(lambda done: self._observe_primary(source, started, done))
+        tasks = [primary]
+        hedge = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self._allow():
+                        self.hedged += 1
+                        hedge = asyncio.ensure_future(request())
+                        tasks.append(hedge)
+                        logger.debug(f"Hedging {source} request after {1000 * delay:.0f} ms (p90)")
+                    else:
+                        self.denied += 1
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                # A failed request only wins if there is nothing left to wait for.
+                if succeeded or not pending:
+                    winner = next((task for task in (primary, hedge) if task in succeeded), None)
+                    if winner is None:
+                        winner = primary if primary in done else done.pop()
+                    break
+                tasks = list(pending)
+            if winner is hedge:
+                self.hedge_wins += 1
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+                    if hedge is not None:
+                        self.cancelled += 1  # the losing copy of a hedged pair
+
+    def stats(self):
+        p90s = {source: self.p90(source) for source in self.latencies}
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            "cancelled": self.cancelled,
+            "budget_denied": self.denied,
+            "tenant_requests": self.requests + self.hedged,
+            "p90_ms": {source: round(1000 * p90, 1) for source, p90 in p90s.items() if p90 is not None},
+        }
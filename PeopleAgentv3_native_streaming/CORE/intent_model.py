@@ -0,0 +1,129 @@
+"""
+First-order intent transition model for predictive prefetching.
+
+Each query is mapped to an intent named after the Graph source it mostly needs
+(profile, manager, reports, devices, colleagues, documents) by a keyword match,
+with no LLM call. The model counts intent -> next-intent transitions across all
+sessions. After an answer, the agent refreshes the sources for the top predicted
+next intents while the user reads, so the follow-up finds them in the cache.
+Refreshes are paid from a Graph call budget, and the share of follow-ups whose
+intent was predicted is reported as the hit rate.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Checked in order; the first matching intent wins.
+INTENT_KEYWORDS = [
+    ("manager", r"\b(manager|boss|reports? to|supervisor|lead)\b"),
+    ("reports", r"\b(direct reports?|team|reportees|manages)\b"),
+    ("documents", r"\b(documents?|files?|working on|recent work|drive)\b"),
+    ("colleagues", r"\b(colleagues?|works? with|peers?|people)\b"),
+    ("devices", r"\b(devices?|laptop|phone|computer|machine)\b"),
+]
+DEFAULT_INTENT = "profile"
+
+
+def classify_intent(query):
+    """
+    Map a query to an intent (the Graph source it mostly needs).
+    """
+    text = query.lower()
+    for intent, pattern in INTENT_KEYWORDS:
+        if re.search(pattern, text):
+            return intent
+    return DEFAULT_INTENT
+
+
+class GraphCallBudget:
+    """
+    Token bucket limiting speculative Graph calls to calls_per_minute.
+    """
+
+    def __init__(self, calls_per_minute=60):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1.0, float(calls_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.spent = 0
+        self.denied = 0
+        self.joined = 0  # speculative fetches a query awaited instead of fetching again
+        self.cancelled = 0  # speculative fetches cancelled when the session was cleared
+
+    def try_spend(self, calls=1):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < calls:
+            self.denied += calls
+            return False
+        self.tokens -= calls
+        self.spent += calls
+        return True
+
+
+class IntentTransitionModel:
+    """
+    Counts of intent -> next intent, optionally persisted as JSON.
+    """
+
+    def __init__(self, path=None, save_every=20):
+        self.path = path or None
+        self.save_every = save_every
+        self.counts = {}  # intent -> {next_intent: count}
+        self.observations = 0
+        self.predictions = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.counts = json.load(f)
+                logger.info(f"Loaded intent transition counts from {self.path}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load intent transition counts from {self.path}: {e}")
+
+    def observe(self, previous, intent):
+        with self._lock:
+            row = self.counts.setdefault(previous, {})
+            row[intent] = row.get(intent, 0) + 1
+            self.observations += 1
+            if self.path and self.observations % self.save_every == 0:
+                self.save()
+
+    def predict(self, intent, top_k=2):
+        """
+        The top_k most frequent next intents after intent (empty until it has been seen).
+        """
+        row = self.counts.get(intent, {})
+        return [name for name, _ in sorted(row.items(), key=lambda item: -item[1])[:top_k]]
+
+    def score(self, predicted, actual):
+        """
+        Record whether the follow-up's intent was among the predicted ones.
+        """
+        self.predictions += 1
+        if actual in predicted:
+            self.hits += 1
+
+    def save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.counts, f)
+        except OSError as e:
+            logger.warning(f"Could not save intent transition counts to {self.path}: {e}")
+
+    def stats(self):
+        return {
+            "observations": self.observations,
+            "predictions": self.predictions,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.predictions, 4) if self.predictions else 0.0,
+            "transitions": {intent: dict(row) for intent, row in self.counts.items()},
+        }
@@ -0,0 +1,202 @@
+"""
+Process-wide Azure OpenAI chat client shared by all PeopleAgent instances.
+
+One client per (endpoint, deployment, api version) is built on first use and
+reused by every agent, so sessions share keep-alive HTTP connections instead
+of each opening their own. Async calls go through ainvoke / astream and are
+capped by a semaphore (LLM_MAX_CONCURRENCY), so concurrent sessions overlap
+their LLM calls without overrunning the deployment.
+
+httpx async connections and asyncio semaphores belong to the event loop that
+created them, so those are kept per running loop.
+
+Async calls are also scheduled against the deployment's TPM / RPM quota (see
+rate_limiter.py). The async client is built without the SDK's own retries, so a
+429 reaches the scheduler, which pauses the deployment for its Retry-After and
+then retries the call.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+from langchain_openai import AzureChatOpenAI
+
+from PeopleAgentv3_native_streaming.CORE.context_serializer import count_tokens
+from PeopleAgentv3_native_streaming.CORE.rate_limiter import (LLMScheduler, INTERACTIVE, is_rate_limited, is_transient,
+                                                              retry_after)
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class SharedChatClient:
+    """
+    Thin wrapper around AzureChatOpenAI exposing the same invoke / stream /
+    ainvoke / astream calls, with pooled connections and a concurrency cap.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.max_concurrency = int(config.get("LLM_MAX_CONCURRENCY", 16))
+        self.limits = httpx.Limits(
+            max_connections=int(config.get("LLM_MAX_CONNECTIONS", 32)),
+            max_keepalive_connections=int(config.get("LLM_MAX_CONNECTIONS", 32)),
+            keepalive_expiry=float(config.get("LLM_KEEPALIVE_EXPIRY", 30)),
+        )
+        self.sync_client = self._build(http_client=httpx.Client(limits=self.limits))
+        self._per_loop = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+
+        # Quota scheduling for async calls; retries are ours so 429s are seen here
+        self.scheduler = LLMScheduler(
+            tpm=int(config.get("LLM_TPM", 0)),
+            rpm=int(config.get("LLM_RPM", 0)),
+            queue_timeout=float(config.get("LLM_QUEUE_TIMEOUT", 30))
+        )
+        self.expected_output_tokens = int(config.get("LLM_EXPECTED_OUTPUT_TOKENS", 300))
+        self.max_retries = int(config.get("LLM_MAX_RETRIES", 3))
+
+    def _build(self, **http_clients):
+        return AzureChatOpenAI(
+            azure_deployment=self.config.get("AOAI_DEPLOYMENT", ""),
+            api_version=self.config.get("AOAI_API_VERSION", "2024-02-15-preview"),
+            api_key=self.config.get("AOAI_KEY", ""),
+            azure_endpoint=self.config.get("AOAI_ENDPOINT", ""),
+            **http_clients
+        )
+
+    def _for_loop(self):
+        """
+        Return (async-capable client, semaphore) for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._per_loop.get(loop)
+        if entry is None:
+            client = self._build(http_async_client=httpx.AsyncClient(limits=self.limits), max_retries=0)
+            entry = (client, asyncio.Semaphore(self.max_concurrency))
+            self._per_loop[loop] = entry
+        return entry
+
+    def _estimate(self, messages, kwargs):
+        """
+        Tokens a call will use: the prompt plus max_tokens or the expected completion.
+        Only counted when a TPM quota is configured.
+        """
+        if not self.scheduler.tokens.capacity:
+            return 0
+        prompt = sum(count_tokens(message["content"] if isinstance(message, dict) else str(message.content))
+                     for message in messages)
+        return prompt + 4 * len(messages) + int(kwargs.get("max_tokens") or self.expected_output_tokens)
+
+    async def _should_retry(self, error, attempt, retries):
+        """
+        Back off after a 429 (the whole deployment) or a transient error (this call) and
+        say whether to retry.
+        """
+        if is_rate_limited(error):
+            self.scheduler.backoff(retry_after(error))
+            return attempt < retries
+        if attempt >= retries:
+            return False
+        if is_transient(error):
+            logger.warning(f"LLM call failed ({str(error)}), retrying")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            return True
+        return False
+
+    def _settle(self, estimate, usage):
+        if usage and estimate:
+            self.scheduler.settle(estimate, usage.get("total_tokens", 0))
+
+    def invoke(self, messages, **kwargs):
+        kwargs.pop("priority", None)
+        kwargs.pop("retries", None)
+        return self.sync_client.invoke(messages, **kwargs)
+
+    def stream(self, messages, **kwargs):
+        kwargs.pop("priority", None)
+        kwargs.pop("retries", None)
+        return self.sync_client.stream(messages, **kwargs)
+
+    async def ainvoke(self, messages, **kwargs):
+        priority = kwargs.pop("priority", INTERACTIVE)
+        retries = kwargs.pop("retries", self.max_retries)
+        client, semaphore = self._for_loop()
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(estimate, priority)
+            async with semaphore:
+                self.in_flight += 1
+                try:
+                    reply = await client.ainvoke(messages, **kwargs)
+                except Exception as e:
+                    if not await self._should_retry(e, attempt, retries):
+                        raise
+                    attempt += 1
+                    continue
+                finally:
+                    self.in_flight -= 1
+            self._settle(estimate, getattr(reply, "usage_metadata", None))
+            return reply
+
+    async def astream(self, messages, **kwargs):
+        priority = kwargs.pop("priority", INTERACTIVE)
+        retries = kwargs.pop("retries", self.max_retries)
+        client, semaphore = self._for_loop()
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(estimate, priority)
+            async with semaphore:
+                self.in_flight += 1
+                stream = client.astream(messages, **kwargs)
+                started = False
+                usage = None
+                try:
+                    async for chunk in stream:
+                        started = True
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+                        yield chunk
+                except Exception as e:
+                    # Only retry before the first chunk; afterwards the caller already has text
+                    if started or not await self._should_retry(e, attempt, retries):
+                        raise
+                    attempt += 1
+                    continue
+                finally:
+                    # Close the HTTP stream now, not at garbage collection, when the consumer stops early
+                    await stream.aclose()
+                    self.in_flight -= 1
+            self._settle(estimate, usage)
+            return
+
+
+def get_chat_client(config):
+    """
+    Return the shared chat client for the configured Azure OpenAI deployment.
+    """
+    key = (config.get("AOAI_ENDPOINT", ""), config.get("AOAI_DEPLOYMENT", ""), config.get("AOAI_API_VERSION", ""))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.info(f"Creating shared chat client for deployment {key[1]} "
+                        f"(max concurrency {config.get('LLM_MAX_CONCURRENCY', 16)})")
+            client = SharedChatClient(config)
+            _clients[key] = client
+        return client
+
+
+def rate_limit_stats():
+    """
+    Quota scheduler metrics per deployment, for every shared client built so far.
+    """
+    with _clients_lock:
+        return {f"{urlparse(key[0]).hostname or key[0]}/{key[1]}": client.scheduler.stats()
+                for key, client in _clients.items()}
@@ -18,9 +18,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 try:
-    from PeopleAgentv2.UTIL.config import load_config
-    from PeopleAgentv2.UTIL.logging_setup import setup_logging
-    from PeopleAgentv2.CORE.people_agent import PeopleAgent
+    from PeopleAgentv3_native_streaming.UTIL.config import load_config
+    from PeopleAgentv3_native_streaming.UTIL.logging_setup import setup_logging
+    from PeopleAgentv3_native_streaming.CORE.app_context import get_app_context
+    from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
 except ImportError as e:
     logger.error(f"Import error: {e}")
     print(f"Import error: {e}")
@@ -52,6 +53,8 @@ async def main():
         # Load config for other settings
         try:
             config = load_config()
+            # Config, credentials and clients are built once and shared by every agent below.
+            app_context = get_app_context(config, configure_logging=False)
             logger.info("Configuration loaded")
         except Exception as e:
             logger.error(f"Error loading configuration: {e}")
@@ -65,14 +68,13 @@ async def main():
         # Handle no user input (show all)
         if not target_user:
             logger.info("No target user specified, showing all users")
-            agent = PeopleAgent("")
+            agent = PeopleAgent("", app_context)
         else:
             # If input doesn't look like email or GUID, try name search
             if "@" not in target_user and len(target_user) != 36:
                 logger.info(f"Searching for user by name: {target_user}")
-                temp_agent = PeopleAgent("")  # for searching
                 print("\nSearching users by name...")
-                search_results = await temp_agent.find_user_by_name(target_user)
+                search_results = await app_context.graph_client.find_user_by_name(target_user)
                 if isinstance(search_results, str):
                     error_msg = f"Error: {search_results}"
                     logger.error(error_msg)
@@ -105,7 +107,7 @@ async def main():
                     logger.info(f"Found user: {matches[0].get('displayName')} ({target_user})")
                     print(f"\nFound user: {matches[0].get('displayName')} ({target_user})")
 
-            agent = PeopleAgent(target_user)
+            agent = PeopleAgent(target_user, app_context)
 
         print("\nWelcome to the Microsoft 365 People Agent!")
         print("You can ask about a person's profile, manager, devices, or switch to another user.")
@@ -150,7 +152,7 @@ async def main():
                             print("\nNo users found with that name.")
                             continue
 
-                    agent = PeopleAgent(new_identifier)
+                    agent = PeopleAgent(new_identifier, app_context)
                     continue
 
                 prompt_msg = (
@@ -193,16 +195,16 @@ async def main():
                         else:
                             print("\nNo users found with that name. Treating as a question.")
                             print("\nProcessing your query...")
-                            response = await agent.process_query(user_input)
+                            response = await agent.process_query(user_input, stream=False)
                             print("\nResponse:", response)
                             continue
 
                     print(f"\nSwitching to user: {user_input}")
-                    agent = PeopleAgent(user_input)
+                    agent = PeopleAgent(user_input, app_context)
                     continue
 
                 print("\nProcessing your query...")
-                response = await agent.process_query(user_input)
+                response = await agent.process_query(user_input, stream=False)
                 print("\nResponse:", response)
 
             except KeyboardInterrupt:
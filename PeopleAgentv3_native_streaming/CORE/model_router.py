@@ -0,0 +1,228 @@
+"""
+Per-call routing between a fast (cheap) and a premium Azure OpenAI deployment.
+
+Every LLM call belongs to a route: intent classification, conversation
+summarization, simple answers and complex analysis. Each route is mapped to a
+tier ("fast" or "premium") in config, and answers are classified as simple or
+complex from the query (length, analytical wording) and the size of the
+context sent with it. A call that fails on its tier is retried once on the
+other tier. Latency and token usage are recorded per route.
+
+With AOAI_DEPLOYMENT_FAST unset both tiers are the AOAI_DEPLOYMENT client, so
+routing changes nothing until a second deployment is configured.
+"""
+
+import logging
+import re
+import time
+from collections import deque
+
+from PeopleAgentv3_native_streaming.CORE.endpoint_pool import get_endpoint_pool
+from PeopleAgentv3_native_streaming.CORE.context_serializer import count_tokens
+from PeopleAgentv3_native_streaming.CORE.rate_limiter import INTERACTIVE, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("intent", "summary", "simple", "complex")
+DEFAULT_TIERS = {"intent": "fast", "summary": "fast", "simple": "fast", "complex": "premium"}
+# Quota priority: summaries run after the answer and can wait behind interactive calls
+ROUTE_PRIORITY = {"intent": INTERACTIVE, "summary": BACKGROUND, "simple": INTERACTIVE, "complex": INTERACTIVE}
+
+# Wording that asks for analysis rather than a lookup
+ANALYTICAL = re.compile(
+    r"\b(compare|comparison|analy[sz]e|analysis|explain|why|summari[sz]e|overview|evaluate|assess|"
+    r"recommend|suggest|pros and cons|trade-?offs?|versus|vs\.?|relationship|across|trend|plan)\b",
+    re.IGNORECASE)
+
+
+def _message_tokens(messages):
+    return sum(count_tokens(message["content"]) for message in messages if isinstance(message, dict))
+
+
+def _usage(message):
+    """
+    (input_tokens, output_tokens) reported by the model, or None.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return None
+
+
+class RouteStats:
+    """
+    Calls, fallbacks, latency and tokens for one route.
+    """
+
+    def __init__(self, window=200):
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.by_tier = {"fast": 0, "premium": 0}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, tier, seconds, input_tokens, output_tokens):
+        self.calls += 1
+        self.by_tier[tier] += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.latencies.append(seconds)
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "by_tier": dict(self.by_tier),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "p50_ms": round(1000 * ordered[len(ordered) // 2]) if ordered else None,
+            "p95_ms": round(1000 * ordered[int(0.95 * (len(ordered) - 1))]) if ordered else None,
+        }
+
+
+class ModelRouter:
+    """
+    Maps routes to deployments and hands out route-bound clients.
+    """
+
+    def __init__(self, config, get_client=get_endpoint_pool):
+        premium = config.get("AOAI_DEPLOYMENT", "")
+        fast = config.get("AOAI_DEPLOYMENT_FAST") or premium
+        self.deployments = {"fast": fast, "premium": premium}
+        self.clients = {tier: get_client(dict(config, AOAI_DEPLOYMENT=name)) for tier, name in self.deployments.items()}
+        self.tiers = {}
+        for route in ROUTES:
+            tier = config.get(f"MODEL_ROUTE_{route.upper()}", DEFAULT_TIERS[route])
+            if tier not in self.deployments:
+                logger.warning(f"Unknown tier {tier!r} for route {route}, using {DEFAULT_TIERS[route]}")
+                tier = DEFAULT_TIERS[route]
+            self.tiers[route] = tier
+        self.fallback_enabled = config.get("MODEL_FALLBACK_ENABLED", True)
+        self.complex_context_tokens = config.get("COMPLEX_CONTEXT_TOKENS", 1500)
+        self.complex_query_words = config.get("COMPLEX_QUERY_WORDS", 25)
+        self.route_stats = {route: RouteStats() for route in ROUTES}
+        logger.info(f"Model routing: deployments={self.deployments} routes={self.tiers}")
+
+    def answer_route(self, query, context_tokens=0):
+        """
+        "complex" for analytical or long questions and large contexts, otherwise "simple".
+        """
+        if ANALYTICAL.search(query):
+            reason = "analytical wording"
+        elif len(query.split()) > self.complex_query_words:
+            reason = "long question"
+        elif context_tokens > self.complex_context_tokens:
+            reason = f"context {context_tokens} tokens"
+        else:
+            return "simple"
+        logger.debug(f"Routing answer as complex: {reason}")
+        return "complex"
+
+    def client(self, route, session=None):
+        return RoutedClient(self, route, session)
+
+    def _plan(self, route):
+        """
+        Tiers to try for a route: its own, then the other one if it is a different deployment.
+        """
+        tier = self.tiers[route]
+        other = "premium" if tier == "fast" else "fast"
+        if self.fallback_enabled and self.deployments[other] != self.deployments[tier]:
+            return [tier, other]
+        return [tier]
+
+    def _record(self, route, tier, started, messages, reply_text, usage=None):
+        seconds = time.perf_counter() - started
+        input_tokens, output_tokens = usage or (_message_tokens(messages), count_tokens(reply_text) if reply_text else 0)
+        self.route_stats[route].record(tier, seconds, input_tokens, output_tokens)
+        logger.info(f"LLM route={route} deployment={self.deployments[tier]} latency={1000 * seconds:.0f} ms "
+                    f"tokens in={input_tokens} out={output_tokens}")
+
+    def _failed(self, route, tier, error, retrying):
+        self.route_stats[route].errors += 1
+        if retrying:
+            self.route_stats[route].fallbacks += 1
+        logger.warning(f"LLM route={route} failed on {self.deployments[tier]}: {str(error)}"
+                       + (", falling back" if retrying else ""))
+
+    def stats(self):
+        return {
+            "deployments": dict(self.deployments),
+            "routes": {route: {"tier": self.tiers[route], **self.route_stats[route].stats()} for route in ROUTES},
+        }
+
+
+class RoutedClient:
+    """
+    Drop-in for the shared chat client (invoke / stream / ainvoke / astream), bound to one route.
+    """
+
+    def __init__(self, router, route, session=None):
+        self.router = router
+        self.route = route
+        self.session = session  # endpoint affinity key (see endpoint_pool.py)
+        self.priority = ROUTE_PRIORITY[route]
+
+    def invoke(self, messages, **kwargs):
+        plan = self.router._plan(self.route)
+        for attempt, tier in enumerate(plan):
+            started = time.perf_counter()
+            try:
+                reply = self.router.clients[tier].invoke(messages, priority=self.priority, session=self.session, **kwargs)
+            except Exception as e:
+                self.router._failed(self.route, tier, e, attempt + 1 < len(plan))
+                if attempt + 1 == len(plan):
+                    raise
+                continue
+            self.router._record(self.route, tier, started, messages, reply.content, _usage(reply))
+            return reply
+
+    def stream(self, messages, **kwargs):
+        tier = self.router._plan(self.route)[0]
+        return self.router.clients[tier].stream(messages, **kwargs)
+
+    async def ainvoke(self, messages, **kwargs):
+        plan = self.router._plan(self.route)
+        for attempt, tier in enumerate(plan):
+            started = time.perf_counter()
+            try:
+                reply = await self.router.clients[tier].ainvoke(messages, priority=self.priority, session=self.session, **kwargs)
+            except Exception as e:
+                self.router._failed(self.route, tier, e, attempt + 1 < len(plan))
+                if attempt + 1 == len(plan):
+                    raise
+                continue
+            self.router._record(self.route, tier, started, messages, reply.content, _usage(reply))
+            return reply
+
+    async def astream(self, messages, **kwargs):
+        """
+        Stream from the route's tier. Falls back only if it fails before the first chunk;
+        once text has reached the caller a retry would duplicate it.
+        """
+        plan = self.router._plan(self.route)
+        for attempt, tier in enumerate(plan):
+            started = time.perf_counter()
+            parts = []
+            usage = None
+            stream = self.router.clients[tier].astream(messages, priority=self.priority, session=self.session, **kwargs)
+            try:
+                async for chunk in stream:
+                    usage = _usage(chunk) or usage
+                    if chunk.content:
+                        parts.append(chunk.content)
+                    yield chunk
+            except Exception as e:
+                retrying = not parts and attempt + 1 < len(plan)
+                self.router._failed(self.route, tier, e, retrying)
+                if not retrying:
+                    raise
+                continue
+            finally:
+                await stream.aclose()
+            self.router._record(self.route, tier, started, messages, "".join(parts), usage)
+            return
@@ -1,26 +1,85 @@
-import requests
+import asyncio
 import logging
+import weakref
+
+import httpx
+
+from PeopleAgentv3_native_streaming.CORE.hedging import HedgePolicy
 
 logger = logging.getLogger(__name__)
 
 class MSGraphClient:
     def __init__(self, config, access_token):
+        """
+        access_token is either a token string or a callable returning a current
+        token (e.g. auth.TokenProvider), so one client can be shared for the
+        lifetime of the process.
+        """
         self.config = config
         self.access_token = access_token
 
+        # Pooled keep-alive connections for all Graph requests made through this client.
+        # httpx async clients belong to the event loop that created them, so one is kept per loop.
+        pool_size = int(config.get("GRAPH_MAX_CONNECTIONS", 32))
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._per_loop = weakref.WeakKeyDictionary()
+
+        # Optional hedging for the small idempotent GETs (profile, manager)
+        self.hedging = None
+        if config.get("GRAPH_HEDGE_ENABLED", False):
+            self.hedging = HedgePolicy(
+                sources=("profile", "manager"),
+                budget=config.get("GRAPH_HEDGE_BUDGET", 0.05),
+                min_samples=config.get("GRAPH_HEDGE_MIN_SAMPLES", 20)
+            )
+
+    async def _headers(self):
+        if hasattr(self.access_token, "aget_token"):
+            token = await self.access_token.aget_token()
+        elif callable(self.access_token):
+            # Token callables may block (MSAL refresh); keep them off the event loop
+            token = await asyncio.to_thread(self.access_token)
+        else:
+            token = self.access_token
+        return {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+
+    def hedge_stats(self):
+        return self.hedging.stats() if self.hedging is not None else {"enabled": False}
+
+    def _session(self):
+        loop = asyncio.get_running_loop()
+        session = self._per_loop.get(loop)
+        if session is None:
+            session = httpx.AsyncClient(limits=self.limits, timeout=30.0)
+            self._per_loop[loop] = session
+        return session
+
+    async def _get(self, endpoint, source=None):
+        """
+        GET a Graph endpoint and return the decoded JSON. The request is native
+        async, so parallel fetches overlap and cancelling the awaiting task
+        aborts the HTTP request instead of leaving it running in a worker thread.
+        Requests for a hedgeable source go through the hedge policy when enabled.
+        """
+        if self.hedging is not None and source in self.hedging.sources:
+            return await self.hedging.run(source, lambda: self._fetch(endpoint))
+        return await self._fetch(endpoint)
+
+    async def _fetch(self, endpoint):
+        response = await self._session().get(endpoint, headers=await self._headers())
+        response.raise_for_status()
+        return response.json()
+
     async def get_all_users(self):
         """
         Get all users in the tenant using '/users' with app-only permissions.
         """
         try:
             endpoint = self.config.get("endpoint", "https://graph.microsoft.com/v1.0/users")
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error getting all users: {str(e)}"
 
@@ -30,13 +89,7 @@ class MSGraphClient:
         """
         try:
             endpoint = "https://graph.microsoft.com/v1.0/me"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             logger.error(f"Error retrieving logged in user: {str(e)}")
             return f"Error getting logged in user: {str(e)}"
@@ -47,13 +100,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"{self.config.get('endpoint', 'https://graph.microsoft.com/v1.0/users')}?$filter=startswith(displayName,'{name}')"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error searching users: {str(e)}"
 
@@ -63,13 +110,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint, source="profile")
         except Exception as e:
             return f"Error getting profile: {str(e)}"
 
@@ -79,13 +120,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}/manager"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint, source="manager")
         except Exception as e:
             return f"Error getting manager info: {str(e)}"
 
@@ -95,13 +130,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}/directReports"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error getting direct reports: {str(e)}"
 
@@ -111,13 +140,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}/managedDevices"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error getting devices: {str(e)}"
 
@@ -127,13 +150,7 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}/people"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error getting colleagues: {str(e)}"
 
@@ -143,12 +160,6 @@ class MSGraphClient:
         """
         try:
             endpoint = f"https://graph.microsoft.com/v1.0/users/{user_identifier}/drive/recent"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(endpoint, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get(endpoint)
         except Exception as e:
             return f"Error getting documents: {str(e)}"
\ No newline at end of file
@@ -12,19 +12,20 @@
 
 
 import logging
-import sys
 import asyncio
 import re
 import time
-from langchain_openai import AzureChatOpenAI
-from PeopleAgentv3_native_streaming.UTIL.config import load_config
-from PeopleAgentv3_native_streaming.UTIL.logging_setup import setup_logging
-from PeopleAgentv3_native_streaming.CORE.auth import get_access_token
-from PeopleAgentv3_native_streaming.CORE.ms_graph_client import MSGraphClient
+from PeopleAgentv3_native_streaming.CORE.app_context import get_app_context
 from PeopleAgentv3_native_streaming.CORE.ai_analysis import analyze_query
-from PeopleAgentv3_native_streaming.CORE.response_generation import generate_response
-from PeopleAgentv3_native_streaming.CORE.response_generation import generate_response, generate_response_streaming
-import time
+from PeopleAgentv3_native_streaming.CORE.response_generation import agenerate_response, agenerate_response_stream
+from PeopleAgentv3_native_streaming.CORE.context_serializer import serialize_context, measure_context_tokens, record_context
+from PeopleAgentv3_native_streaming.CORE.context_pinning import SessionContext
+from PeopleAgentv3_native_streaming.CORE.stream_chunks import StreamChunk
+from PeopleAgentv3_native_streaming.CORE.intent_model import classify_intent
+from PeopleAgentv3_native_streaming.CORE.fast_path import match_question, render_answer
+from PeopleAgentv3_native_streaming.CORE.timezones import resolve_zone, local_time, asks_about_time
+from PeopleAgentv3_native_streaming.CORE.conversation_memory import ConversationMemory, strip_references
+from PeopleAgentv3_native_streaming.CORE.citations import CitationParser
 from functools import wraps
 import hashlib
 
@@ -33,12 +34,14 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Enable debug messages
 
 # in-memory cache with TTL support for API calls
+# The cache lives on the instance (self._ttl_cache), so it is freed together with
+# the agent instead of pinning every agent ever created in a module-level dict.
 def ttl_cache(ttl: int):
     def decorator(func):
-        cache = {}
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            key = (args, frozenset(kwargs.items()))
+            cache = args[0].__dict__.setdefault("_ttl_cache", {})
+            key = (func.__name__, args[1:], frozenset(kwargs.items()))
             current_time = time.time()
             if key in cache:
                 result, timestamp = cache[key]
@@ -52,22 +55,67 @@ def ttl_cache(ttl: int):
             result = await func(*args, **kwargs)
             cache[key] = (result, current_time)
             return result
+        wrapper.ttl = ttl
         return wrapper
     return decorator
 
+def stale_cached(instance, func_name, max_age):
+    """
+    Return (result, age_seconds) from an instance's ttl_cache entry for a no-argument
+    method, ignoring the TTL but not max_age. Error strings are never served stale.
+    """
+    entry = instance.__dict__.get("_ttl_cache", {}).get((func_name, (), frozenset()))
+    if entry is None:
+        return None
+    result, timestamp = entry
+    age = time.time() - timestamp
+    if age > max_age or isinstance(result, str):
+        return None
+    return result, age
+
+def is_fresh(instance, method, margin=0):
+    """
+    True if the ttl_cache-decorated no-argument method has a cached result that
+    stays fresh for at least margin more seconds.
+    """
+    entry = instance.__dict__.get("_ttl_cache", {}).get((method.__name__, (), frozenset()))
+    return entry is not None and time.time() - entry[1] < method.ttl - margin
+
+def fresh_for(instance, method):
+    """
+    Seconds until the cached result of a ttl_cache-decorated no-argument method expires (0 if none).
+    """
+    entry = instance.__dict__.get("_ttl_cache", {}).get((method.__name__, (), frozenset()))
+    return 0.0 if entry is None else max(0.0, method.ttl - (time.time() - entry[1]))
+
+async def refresh_cached(instance, method):
+    """
+    Re-fetch a ttl_cache-decorated no-argument method, bypassing and then updating its cache entry.
+    """
+    result = await method.__wrapped__(instance)
+    instance.__dict__.setdefault("_ttl_cache", {})[(method.__name__, (), frozenset())] = (result, time.time())
+    return result
+
+def _source_status(task):
+    """
+    Classify a finished source fetch. Graph client methods report failures as error strings.
+    """
+    if task.cancelled():
+        return "cancelled"
+    if task.exception() is not None or isinstance(task.result(), str):
+        return "error"
+    return "ok"
+
 class PeopleAgent:
-    def __init__(self, user_identifier):
+    def __init__(self, user_identifier, app_context=None):
         """
-        This agent uses a client credentials flow for Graph API queries.
+        Lightweight per-conversation view over the shared application context.
+        Config, logging, credentials (client credentials flow for Graph API queries)
+        and clients are built once in AppContext, not per agent.
         """
         self.logger = logger
-        self.config = load_config()
-        setup_logging(self.config)
-
-        self.access_token = get_access_token(self.config)
-        if not self.access_token:
-            self.logger.error("Failed to acquire access token.")
-            sys.exit(1)
+        self.app_context = app_context or get_app_context()
+        self.config = self.app_context.config
 
         self.logger.info(f"Initializing PeopleAgent for user: {user_identifier}")
         self.user_identifier = user_identifier
@@ -75,28 +123,57 @@ class PeopleAgent:
         # Initialize conversation memory
         self.conversation_history = []
         self.memory_limit = self.config.get("CONVERSATION_MEMORY_LIMIT", 10)
+        self.active_queries = 0  # the session store does not evict an agent while this is non-zero
 
-        # OpenAI client
-        self.openai_client = AzureChatOpenAI(
-            azure_deployment=self.config.get("AOAI_DEPLOYMENT", ""),
-            api_version=self.config.get("AOAI_API_VERSION", "2024-02-15-preview"),
-            api_key=self.config.get("AOAI_KEY", ""),
-            azure_endpoint=self.config.get("AOAI_ENDPOINT", "")
-        )
+        # Chat model router, shared process-wide (per-role deployments with fallback)
+        self.model_router = self.app_context.model_router
+
+        # MS Graph client, shared process-wide (token refreshed on demand)
+        self.graph_client = self.app_context.graph_client
 
-        # MS Graph client
-        self.graph_client = MSGraphClient(self.config, self.access_token)
+        # Token-bounded history window; older turns folded into a rolling summary in the background
+        self.memory = ConversationMemory(
+            self.model_router.client("summary"),
+            token_budget=self.config.get("HISTORY_TOKEN_BUDGET", 800),
+            max_messages=self.memory_limit,
+            summary_words=self.config.get("HISTORY_SUMMARY_WORDS", 120)
+        )
 
         # Begin addition for caching responses:
         self.response_cache = {}
         self.response_cache_times = {}
         self.response_cache_ttl = 60  # cache TTL in seconds
 
+        # Latency budget per query: Graph fetches get a share, late sources fall back to stale cache
+        self.query_budget = self.config.get("QUERY_BUDGET_MS", 8000) / 1000.0
+        self.graph_budget_share = self.config.get("GRAPH_BUDGET_SHARE", 0.6)
+        self.stale_max_age = self.config.get("STALE_SOURCE_MAX_AGE", 3600)
+        self._late_fetches = {}  # source -> fetch that missed a deadline and is still running
+
+        # Session-start warm-up of the Graph sources (see start_prefetch)
+        self.prefetch_sources = self.config.get("PREFETCH_SOURCES", None)
+        self._prefetching = {}
+        self._first_query = True
+
+        # Predictive follow-up prefetch (see _prefetch_predicted)
+        self.predictive_top_k = self.config.get("PREDICTIVE_PREFETCH_TOP_K", 2)
+        self._last_intent = None
+        self._predicted = None
+        self.predictive_lead = self.config.get("PREDICTIVE_PREFETCH_LEAD", 5)
+        self._speculating = {}  # kept apart from _prefetching: own lifecycle and counters
+        self._speculation_timers = {}  # source -> scheduled refresh, started shortly before its cache expires
+
+        # Deterministic answers for simple lookups (see _fast_path_answer)
+        self.fast_path_enabled = self.config.get("FAST_PATH_ENABLED", True)
+
+        # Session snapshot pinned into the stable prompt prefix; later turns send deltas only
+        self.session_context = SessionContext(self._format_context, user_identifier)
+
     async def analyze_query(self, user_query):
         """
         Determine answer intent via Azure OpenAI.
         """
-        return analyze_query(self.openai_client, user_query)
+        return await analyze_query(self.model_router.client("intent"), user_query)
 
      # API-level caching with TTL (60 seconds in this example)
     @ttl_cache(ttl=60)
@@ -127,6 +204,9 @@ class PeopleAgent:
     async def get_all_users(self):
         return await self.graph_client.get_all_users()
 
+    async def find_user_by_name(self, name):
+        return await self.graph_client.find_user_by_name(name)
+
     def _build_response_key(self, query, context):
         """
         Build a unique key for final response caching based on user identifier,
@@ -152,14 +232,15 @@ class PeopleAgent:
                     "email": data.get("mail"),
                     "title": data.get("jobTitle"),
                     "location": data.get("officeLocation", "Unknown"),
-                    "timezone": data.get("mailboxSettings", {}).get("timeZone", "Unknown")
+                    "timezone": self._zone_name(data)
                 }
             elif data_type == "manager":
                 result = {
                     "name": data.get("displayName"),
                     "title": data.get("jobTitle"),
                     "email": data.get("mail"),
-                    "location": data.get("officeLocation", "Unknown")
+                    "location": data.get("officeLocation", "Unknown"),
+                    "timezone": self._zone_name(data)
                 }
             elif data_type == "devices":
                 value_list = data.get("value", [])
@@ -195,6 +276,54 @@ class PeopleAgent:
             return f"Error formatting {data_type} data: {str(e)}"
         return result
 
+    def _zone_name(self, data):
+        """
+        IANA zone for a Graph user object, from its officeLocation.
+        """
+        resolved = resolve_zone(data.get("officeLocation"))
+        return resolved[0] if resolved else "Unknown"
+
+    def _add_local_time(self, context, query):
+        """
+        Add the current local time of the user and their manager as one compact field, only
+        when the query asks about time: the reading changes every minute, and in every other
+        prompt it would change the response cache and single-flight keys for nothing.
+        It is a string so it is never pinned into Session Data.
+        """
+        if not asks_about_time(query):
+            return context
+        readings = []
+        for key, label in (("profile", None), ("manager", "manager")):
+            person = context.get(key)
+            if not isinstance(person, dict) or person.get("timezone", "Unknown") == "Unknown":
+                continue
+            name = person.get("name") or key
+            readings.append(f"{label + ' ' if label else ''}{name}: {local_time(person['timezone'])}")
+        if readings:
+            context["local_time"] = "; ".join(readings)
+        return context
+
+    def render_context(self, context):
+        """
+        Render the fetched context for the prompt. Uses the compact format unless
+        CONTEXT_FORMAT=legacy; optionally records contexts and logs token savings.
+        """
+        self._observe_context(context)
+        return self._format_context(context)
+
+    def _observe_context(self, context):
+        if self.config.get("CONTEXT_RECORD_FILE"):
+            record_context(self.config["CONTEXT_RECORD_FILE"], context)
+        if self.config.get("CONTEXT_TOKEN_MEASURE"):
+            stats = measure_context_tokens(context)
+            self.logger.info(f"Context tokens legacy={stats['legacy_tokens']} compact={stats['compact_tokens']} "
+                             f"saved={stats['saved_pct']}%")
+
+    def _format_context(self, context):
+        if self.config.get("CONTEXT_FORMAT", "compact") == "legacy":
+            return str(context)
+        return serialize_context(context)
+
     def extract_citations(self, response: str):
         """
         Extract citations from the response. Assumes citations are marked as [1] ..., [2] ... etc.
@@ -208,137 +337,582 @@ class PeopleAgent:
         """
         return "\n".join(citations)
 
+    def _citation_chunks(self, text):
+        """
+        Citation events for a complete answer (fast path or cache), in stream order.
+        """
+        parser = CitationParser()
+        events = parser.feed(text) + parser.finish()
+        return [StreamChunk(StreamChunk.CITATION, "", citation) for citation in events]
+
 
 # ––––– Flow Changes Summary –––––
 #
-# In response_generation.py, the new generate_response_streaming() method builds the messages,
-# invokes the Azure OpenAI client with stream=True, and yields chunks via a generator wrapped in a 
-# Flask Response with appropriate SSE formatting.
-#
-# In people_agent.py, the generate_response method now accepts a stream flag. When stream=True, it
-# delegates to generate_response_streaming so that native streaming is used. Otherwise, it falls back 
-# to the full response version.
+# In response_generation.py, agenerate_response_stream() builds the messages and iterates the
+# chat model's astream(), yielding text deltas as the model produces them.
 #
-# Ensure your OpenAI client library supports streaming with stream=True and that the chunk structure 
-# (e.g. chunk.text) is correct.
+# In people_agent.py, process_query(stream=True) returns the stream_query() async generator, which
+# fetches the Graph context, then pipes the model's deltas straight through to the caller
+# (the Gradio bot) and logs time-to-first-token. process_query(stream=False) returns a coroutine
+# resolving to the full answer.
 
    
-    def generate_response(self, query, context, stream=False):
+    async def generate_response(self, query, context, stream=False):
         """
         Generate a full response from Azure OpenAI.
-        If stream is True, delegate to generate_response_streaming (returning a generator for Gradio).
-        Otherwise, get a complete response.
+        If stream is True, return the async generator of text deltas from agenerate_response_stream.
+        Otherwise, await a complete response.
         """
+        history = self.memory.prompt_history(self.conversation_history)
+        route = self.model_router.answer_route(query, self.session_context.last_full_tokens)
+        # Sticky per user: their pinned data is the prompt prefix an endpoint may have cached
+        client = self.model_router.client(route, session=self.user_identifier)
         if stream:
-            # Return a streaming generator (for Gradio) by not wrapping in a Flask Response.
-            return generate_response_streaming(self.openai_client, query, context, self.conversation_history, flask_response=False)
+            return agenerate_response_stream(client, query, context, history,
+                                             pinned_context=self.session_context.pinned_text,
+                                             summary=self.memory.prompt_text(), max_history=None,
+                                             single_flight=self.app_context.single_flight)
         else:
-            raw_response = generate_response(self.openai_client, query, context, self.conversation_history)
-            citations = self.extract_citations(raw_response)
-            if citations:
-                citation_block = self.format_citations(citations)
-                final_response = f"{raw_response}\n\nReferences:\n{citation_block}"
-            else:
-                final_response = raw_response
-            return final_response
+            raw_response = await agenerate_response(client, query, context, history,
+                                                    pinned_context=self.session_context.pinned_text,
+                                                    summary=self.memory.prompt_text(), max_history=None,
+                                                    single_flight=self.app_context.single_flight)
+            # The model's own References section is kept as is; only a missing one is added
+            parser = CitationParser()
+            parser.feed(raw_response)
+            parser.finish()
+            return raw_response + parser.references_block()
         
 
         
-    def process_query(self, query: str, stream: bool = True):
-        full_response = asyncio.run(self._process_query_core(query))
+    def process_query(self, query: str, stream: bool = True, progress=None, deadline=None):
+        """
+        Answer a query about the current user.
+        With stream=True returns an async generator of StreamChunk objects straight from the
+        model (consume with "async for"); otherwise returns a coroutine resolving to the full answer.
+        progress is forwarded to _gather_context for per-source progress reporting.
+        deadline is an absolute time.monotonic() for the first token (see _stage_deadlines).
+        """
         if stream:
-            chunk_size = 10  # fixed chunk size for simulation of streaming
-            for i in range(0, len(full_response), chunk_size):
-                yield full_response[i:i+chunk_size]
-        else:
-            return full_response    
+            return self._stream_active(self.stream_query(query, progress=progress, deadline=deadline))
+        return self._run_active(self._process_query_core(query, progress=progress, deadline=deadline))
 
-            
-    def generate_response_old(self, query, context):
+    async def _run_active(self, coro):
+        self.active_queries += 1
+        try:
+            return await coro
+        finally:
+            self.active_queries -= 1
+
+    async def _stream_active(self, stream):
+        self.active_queries += 1
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            self.active_queries -= 1
+            await stream.aclose()
+
+    def _sources(self):
         """
-        Use Azure OpenAI to generate a final natural language response.
-        Includes conversation history for context awareness.
-        Post-process the response to append a References section if citations are present.
+        The Graph sources gathered for every query, keyed by context name.
         """
-        raw_response = generate_response(self.openai_client, query, context, self.conversation_history)
-        citations = self.extract_citations(raw_response)
-        if citations:
-            citation_block = self.format_citations(citations)
-            final_response = f"{raw_response}\n\nReferences:\n{citation_block}"
-        else:
-            final_response = raw_response
-        return final_response
-    
-
-    async def _process_query_core(self, user_query):
-            """
-            Main method:
-            1) Fetch data in parallel from all sources (API-level caching applied)
-            2) Check final response cache; if a fresh answer exists, return it
-            3) Otherwise, generate a new answer using the LLM and cache it
-            4) Update conversation history and return the response
-            """
-            self.conversation_history.append({"role": "user", "content": user_query})
-            
-            # Create asynchronous tasks for parallel API calls
-            tasks = {
-                "profile": asyncio.create_task(self.get_user_profile()),
-                "manager": asyncio.create_task(self.get_manager_info()),
-                "reports": asyncio.create_task(self.get_direct_reports()),
-                "devices": asyncio.create_task(self.get_devices()),
-                "colleagues": asyncio.create_task(self.get_colleagues()),
-                "documents": asyncio.create_task(self.get_documents()),
-                "all_users": asyncio.create_task(self.get_all_users())
-            }
-
-            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-            data_sources = dict(zip(tasks.keys(), results))
-
-            # Build a combined context from API results
-            context = {}
-            for key, data in data_sources.items():
-                if isinstance(data, Exception):
-                    self.logger.error(f"Error fetching {key}: {data}")
-                    context[key] = f"Error getting {key}: {str(data)}"
-                else:
+        return {
+            "profile": self.get_user_profile,
+            "manager": self.get_manager_info,
+            "reports": self.get_direct_reports,
+            "devices": self.get_devices,
+            "colleagues": self.get_colleagues,
+            "documents": self.get_documents,
+            "all_users": self.get_all_users
+        }
+
+    def start_prefetch(self):
+        """
+        Start warming the cache for this agent's user in the background, so the
+        session's first question does not pay for every Graph call. Cancelled by
+        cancel_prefetch / clear_memory when the session switches or ends.
+        """
+        if self._prefetching or not self._first_query:
+            return
+        stats = self.app_context.prefetch_stats
+        stats.started += 1
+        wanted = self.prefetch_sources
+        for key, fetch in self._sources().items():
+            if wanted and key not in wanted:
+                continue
+            task = asyncio.create_task(fetch())
+            self._prefetching[key] = task
+        if not self._prefetching:
+            return
+        remaining = set(self._prefetching.values())
+
+        def finished(task):
+            remaining.discard(task)
+            if not remaining and not task.cancelled():
+                stats.completed += 1
+        for task in self._prefetching.values():
+            task.add_done_callback(finished)
+        self.logger.info(f"Prefetching {sorted(self._prefetching)} for {self.user_identifier}")
+
+    def cancel_prefetch(self):
+        running = [task for task in self._prefetching.values() if not task.done()]
+        for task in running:
+            task.cancel()
+        if running:
+            self.app_context.prefetch_stats.cancelled += 1
+            self.logger.info(f"Cancelled prefetch for {self.user_identifier} ({len(running)} sources in flight)")
+        self._prefetching = {}
+
+    def cancel_speculative(self):
+        for timer in self._speculation_timers.values():
+            timer.cancel()
+        self._speculation_timers = {}
+        running = [task for task in self._speculating.values() if not task.done()]
+        for task in running:
+            task.cancel()
+        self.app_context.prefetch_budget.cancelled += len(running)
+        self._speculating = {}
+
+    def _in_flight_fetch(self, key):
+        """
+        The session-start, late (missed an earlier query's deadline) or speculative fetch of
+        a source still running, if any, so a query waits on it instead of sending a duplicate.
+        Joining a speculative one is counted on the speculative budget, not as a prefetch hit.
+        """
+        prefetch = self._prefetching.get(key)
+        if prefetch is not None and not prefetch.done():
+            return prefetch
+        late = self._late_fetches.get(key)
+        if late is not None and not late.done():
+            return late
+        speculative = self._speculating.get(key)
+        if speculative is not None and not speculative.done():
+            self.app_context.prefetch_budget.joined += 1
+            return speculative
+        return None
+
+    def _record_prefetch_outcome(self, sources):
+        """
+        Classify each source for the session's first question: warm, joined (prefetch in flight) or cold.
+        """
+        if not self._prefetching:
+            return
+        outcome = {}
+        for key, fetch in sources.items():
+            prefetch = self._prefetching.get(key)
+            if is_fresh(self, fetch):
+                outcome[key] = "warm"
+            elif prefetch is not None and not prefetch.done():
+                outcome[key] = "joined"
+            else:
+                outcome[key] = "cold"
+        self.app_context.prefetch_stats.record_first_query(outcome)
+
+    def _note_first_query(self, sources):
+        """
+        Record the prefetch outcome once, for whichever path (fast path or full gather) fetches first.
+        """
+        if self._first_query:
+            self._first_query = False
+            self._record_prefetch_outcome(sources)
+
+    def _keep_late(self, key, task):
+        """
+        Track a fetch that missed a query's deadline until it finishes, so later queries join it.
+        """
+        if self._late_fetches.get(key) is task:
+            return
+        self._late_fetches[key] = task
+        task.add_done_callback(
+            lambda done: self._late_fetches.pop(key, None) if self._late_fetches.get(key) is done else None)
+
+    def _cancel_fetches(self, tasks):
+        """
+        On cancellation, report how many fetches are cut short, then cancel them. Late fetches
+        from an earlier query keep running: they warm the cache for the session, not just this query.
+        """
+        running = [task for key, task in tasks.items()
+                   if not task.done() and self._late_fetches.get(key) is not task]
+        self._aborted_graph_calls = len(running)
+        for task in running:
+            task.cancel()
+
+    def _note_intent(self, user_query):
+        """
+        Classify the query, feed the intent transition model and score the previous prediction.
+        """
+        intent = classify_intent(user_query)
+        model = self.app_context.intent_model
+        if self._last_intent is not None:
+            model.observe(self._last_intent, intent)
+        if self._predicted is not None:
+            model.score(self._predicted, intent)
+            self._predicted = None
+        self._last_intent = intent
+
+    def _prefetch_predicted(self):
+        """
+        After an answer, schedule a background refresh of the sources for the most likely
+        next intents, PREDICTIVE_PREFETCH_LEAD seconds before their cache entries expire
+        (at once if not cached), so a follow-up while the user reads still finds them warm.
+        Each refresh spends the speculative Graph call budget when it starts.
+        """
+        if not self.predictive_top_k or self._last_intent is None:
+            return
+        predicted = self.app_context.intent_model.predict(self._last_intent, self.predictive_top_k)
+        if not predicted:
+            return
+        self._predicted = predicted
+        for timer in self._speculation_timers.values():
+            timer.cancel()
+        self._speculation_timers = {}
+        loop = asyncio.get_running_loop()
+        sources = self._sources()
+        for key in predicted:
+            fetch = sources.get(key)
+            if fetch is None:
+                continue
+            delay = max(0.0, fresh_for(self, fetch) - self.predictive_lead)
+            self._speculation_timers[key] = loop.call_later(delay, self._start_speculative, key)
+        self.logger.debug(f"Predicted next intents after {self._last_intent}: {predicted}")
+
+    def _start_speculative(self, key):
+        """
+        Start a scheduled speculative refresh unless the source is already fresh or being fetched.
+        """
+        self._speculation_timers.pop(key, None)
+        fetch = self._sources()[key]
+        if is_fresh(self, fetch, margin=self.predictive_lead):
+            return
+        for running in (self._prefetching, self._late_fetches, self._speculating):
+            task = running.get(key)
+            if task is not None and not task.done():
+                return
+        if not self.app_context.prefetch_budget.try_spend():
+            self.logger.debug(f"Speculative Graph budget exhausted; not prefetching {key}")
+            return
+        self._speculating = {name: task for name, task in self._speculating.items() if not task.done()}
+        self._speculating[key] = asyncio.create_task(refresh_cached(self, fetch))
+
+    async def _fast_path_answer(self, user_query, progress=None, deadline=None):
+        """
+        Answer a templated lookup ("who is her manager") straight from the Graph data,
+        fetching only the sources the template needs. Returns (text, references) or
+        None to fall back to the LLM path. deadline, if given, is the time.monotonic()
+        the fetches must be done by, as in _gather_context; fetches still running then
+        are left to finish in the background and the query falls back.
+        """
+        if not self.fast_path_enabled:
+            return None
+        stats = self.app_context.fast_path_stats
+        matched = match_question(user_query)
+        if matched is None:
+            stats.record()
+            return None
+        template, who = matched
+
+        started = time.perf_counter()
+        sources = self._sources()
+        self._note_first_query(sources)
+        tasks = {}
+        for key in template.sources:
+            tasks[key] = self._in_flight_fetch(key) or asyncio.create_task(sources[key]())
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait(tasks.values(), timeout=timeout)
+        except asyncio.CancelledError:
+            self._cancel_fetches(tasks)
+            raise
+        late = [key for key, task in tasks.items() if not task.done()]
+        if late:
+            # _gather_context joins these instead of fetching them again
+            for key in late:
+                self._keep_late(key, tasks[key])
+            stats.record(template.name, False, "deadline")
+            self.logger.debug(f"Fast path '{template.name}' missed the Graph deadline waiting for {late}")
+            return None
+
+        context = {}
+        for key, task in tasks.items():
+            if task.exception() is not None:
+                context[key] = f"Error getting {key}: {str(task.exception())}"
+            else:
+                context[key] = self.format_data(key, task.result())
+        if progress is not None:
+            for key, data in context.items():
+                progress(key, "error" if isinstance(data, str) else "ok", 1000 * (time.perf_counter() - started))
+
+        text, references, reason = render_answer(template, who, context, self.user_identifier)
+        stats.record(template.name, text is not None, reason)
+        if text is None:
+            self.logger.debug(f"Fast path '{template.name}' fell back to the LLM: {reason}")
+            return None
+        self.logger.info(f"Fast-path answer '{template.name}' in {1000 * (time.perf_counter() - started):.0f} ms")
+        return text, references
+
+    def _stage_deadlines(self, deadline=None):
+        """
+        Split the request's latency budget across stages. deadline is the absolute
+        time.monotonic() the first token is due by (QUERY_BUDGET_MS from now if not given);
+        Graph fetches get GRAPH_BUDGET_SHARE of what is left, generation the rest.
+        Returns (deadline, graph_deadline).
+        """
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + self.query_budget
+        return deadline, now + self.graph_budget_share * max(0.0, deadline - now)
+
+    async def _gather_context(self, progress=None, deadline=None):
+        """
+        Fetch data in parallel from all sources (API-level caching applied) and
+        format it into the combined context.
+        progress, if given, is called as progress(source, status, elapsed_ms) as each source completes.
+        deadline, if given, is the time.monotonic() by which the fetches must be done. Sources still
+        running then are served from stale cache, left to the pinned Session Data, or marked unavailable;
+        a "partial" note is added to the context, and the late fetches finish in the background to warm the cache.
+        """
+        started = time.perf_counter()
+        sources = self._sources()
+        self._note_first_query(sources)
+        # Create asynchronous tasks for parallel API calls; a source still being
+        # prefetched (at session start or speculatively) is awaited rather than fetched twice.
+        tasks = {}
+        for key, fetch in sources.items():
+            tasks[key] = self._in_flight_fetch(key) or asyncio.create_task(fetch())
+        # any fetch still in flight now belongs to this query
+        self._prefetching = {}
+        self._speculating = {}
+        late = set()
+        if progress is not None:
+            def report(done, key):
+                if key not in late:
+                    progress(key, _source_status(done), 1000 * (time.perf_counter() - started))
+            for key, task in tasks.items():
+                task.add_done_callback(lambda done, key=key: report(done, key))
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait(tasks.values(), timeout=timeout)
+        except asyncio.CancelledError:
+            self._cancel_fetches(tasks)
+            raise
+
+        # Build a combined context from API results
+        context = {}
+        stale, missing = [], []
+        for key, task in tasks.items():
+            if not task.done():
+                late.add(key)
+                self._keep_late(key, task)
+                cached = stale_cached(self, sources[key].__name__, self.stale_max_age)
+                if cached is not None:
+                    data, age = cached
                     context[key] = self.format_data(key, data)
+                    stale.append(f"{key} (cached {age:.0f}s ago)")
+                elif self.session_context.is_pinned(key):
+                    # Leave it out: the pinned Session Data still holds this source, and an
+                    # "unavailable" marker would contradict it
+                    stale.append(f"{key} (as in Session Data)")
+                else:
+                    context[key] = f"Timed out getting {key}; not available for this answer."
+                    missing.append(key)
+                if progress is not None:
+                    progress(key, "timeout" if key in missing else "stale", 1000 * (time.perf_counter() - started))
+            elif task.exception() is not None:
+                self.logger.error(f"Error fetching {key}: {task.exception()}")
+                context[key] = f"Error getting {key}: {str(task.exception())}"
+            else:
+                context[key] = self.format_data(key, task.result())
+
+        if late:
+            notes = []
+            if stale:
+                notes.append(f"possibly outdated: {', '.join(stale)}")
+            if missing:
+                notes.append(f"not available: {', '.join(missing)}")
+            context["partial"] = f"Some sources missed the response deadline ({'; '.join(notes)})."
+            self.logger.warning(f"Graph deadline hit after {1000 * (time.perf_counter() - started):.0f} ms; "
+                                f"stale={stale} missing={missing}")
+        self.logger.info(f"Parallel API calls completed. Context: {context}")
+        return context
+
+    def _cached_response(self, final_key):
+        """
+        Return a fresh cached final answer for the key, or None.
+        """
+        now = time.time()
+        if final_key in self.response_cache and (now - self.response_cache_times.get(final_key, 0)) < self.response_cache_ttl:
+            self.logger.debug(f"Final response cache hit for key: {final_key}")
+            return self.response_cache[final_key]
+        return None
 
-            # Build a unique cache key based on the query and context
-            final_key = self._build_response_key(user_query, context)
-            now = time.time()
-            if final_key in self.response_cache and (now - self.response_cache_times.get(final_key, 0)) < self.response_cache_ttl:
-                self.logger.debug(f"Final response cache hit for key: {final_key}")
-                return self.response_cache[final_key]
+    def _prompt_context(self, context):
+        """
+        Fold the context into the session snapshot and render the per-turn delta.
+        """
+        delta = self.session_context.update(context)
+        self._observe_context(context)
+        return self._format_context(delta) if delta else "No changes since Session Data."
 
-            self.logger.info(f"Parallel API calls completed. Context: {context}")
-            response = self.generate_response(user_query, context)
-            self.conversation_history.append({"role": "assistant", "content": response})
+    def _abandon_query(self, turn, stage, llm_chunks=None):
+        """
+        Undo a query that was cancelled mid-flight: drop its unanswered user turn from the
+        history (even if a superseding query already added its own) and record the work that was cut short.
+        """
+        for index in range(len(self.conversation_history) - 1, -1, -1):
+            if self.conversation_history[index] is turn:
+                del self.conversation_history[index]
+                break
+        graph_calls = self.__dict__.pop("_aborted_graph_calls", 0)
+        self.app_context.cancellations.record(stage, graph_calls=graph_calls, llm_chunks=llm_chunks)
+
+    def _remember_response(self, final_key, response, cache=True):
+        """
+        Record the answer in conversation history and, unless cache is False
+        (answers from partial context), the final response cache.
+        """
+        # History keeps the answer without its References block
+        self.conversation_history.append({"role": "assistant", "content": strip_references(response)})
 
-            # Cache the generated response and record its timestamp
+        # Cache the generated response and record its timestamp
+        if cache:
             self.response_cache[final_key] = response
-            self.response_cache_times[final_key] = now
+            self.response_cache_times[final_key] = time.time()
 
-            if len(self.conversation_history) > self.memory_limit:
-                self.conversation_history = self.conversation_history[-self.memory_limit:]
-            self.logger.debug(f"Conversation history length: {len(self.conversation_history)}")
-            return response
+        # Keep the window within the token budget; older turns go to the rolling summary
+        self.conversation_history = self.memory.fold(self.conversation_history)
+        self.logger.debug(f"Conversation history length: {len(self.conversation_history)} "
+                          f"(memory {self.memory.stats()})")
 
+    async def _process_query_core(self, user_query, progress=None, deadline=None):
+        """
+        Main method:
+        1) Fetch data in parallel from all sources (API-level caching applied)
+        2) Check final response cache; if a fresh answer exists, return it
+        3) Otherwise, generate a new answer using the LLM and cache it
+        4) Update conversation history and return the response
+        """
+        turn = {"role": "user", "content": user_query}
+        self.conversation_history.append(turn)
+        self._note_intent(user_query)
+        stage = "graph"
+        deadline, graph_deadline = self._stage_deadlines(deadline)
+        try:
+            fast = await self._fast_path_answer(user_query, progress, graph_deadline)
+            if fast is not None:
+                response = "".join(fast)
+                self._remember_response(None, response, cache=False)
+                self._prefetch_predicted()
+                return response
 
-       
-        
-    def process_query_old(self, query: str, stream: bool = True):
-        full_response = asyncio.run(self._process_query_core(query))
+            context = self._add_local_time(await self._gather_context(progress, graph_deadline), user_query)
 
-        if stream:
-            chunk_size = 10  # fixed chunk size for simulation of streaming
-            for i in range(0, len(full_response), chunk_size):
-                yield full_response[i:i+chunk_size]
-        else:
-            return full_response
+            # Build a unique cache key based on the query and context
+            final_key = self._build_response_key(user_query, context)
+            cached = self._cached_response(final_key)
+            if cached is not None:
+                return cached
+
+            stage = "llm"
+            response = await self.generate_response(user_query, self._prompt_context(context))
+        except asyncio.CancelledError:
+            self._abandon_query(turn, stage)
+            raise
+        self._remember_response(final_key, response, cache="partial" not in context)
+        self._prefetch_predicted()
+        return response
+
+    async def stream_query(self, user_query, progress=None, deadline=None):
+        """
+        Streaming counterpart of _process_query_core. Yields StreamChunk objects with the
+        model's text deltas as they are produced and logs time-to-first-token for the whole request.
+        """
+        started = time.perf_counter()
+        turn = {"role": "user", "content": user_query}
+        self.conversation_history.append(turn)
+        self._note_intent(user_query)
+        deadline, graph_deadline = self._stage_deadlines(deadline)
+        try:
+            fast = await self._fast_path_answer(user_query, progress, graph_deadline)
+            if fast is None:
+                context = self._add_local_time(await self._gather_context(progress, graph_deadline), user_query)
+        except asyncio.CancelledError:
+            self._abandon_query(turn, "graph")
+            raise
+        if fast is not None:
+            text, references = fast
+            self.logger.info(f"TTFT {1000 * (time.perf_counter() - started):.0f} ms (fast path)")
+            yield StreamChunk(StreamChunk.DELTA, text)
+            yield StreamChunk(StreamChunk.REFERENCES, references)
+            for chunk in self._citation_chunks(text + references):
+                yield chunk
+            self._remember_response(None, text + references, cache=False)
+            self._prefetch_predicted()
+            return
+        fetched = time.perf_counter()
+
+        final_key = self._build_response_key(user_query, context)
+        cached = self._cached_response(final_key)
+        if cached is not None:
+            self.logger.info(f"TTFT {1000 * (time.perf_counter() - started):.0f} ms (cached answer)")
+            yield StreamChunk(StreamChunk.CACHED, cached)
+            for chunk in self._citation_chunks(cached):
+                yield chunk
+            return
+
+        parts = []
+        citations = CitationParser()
+        stream = await self.generate_response(user_query, self._prompt_context(context), stream=True)
+        try:
+            async for text in stream:
+                if not parts:
+                    first_token = time.perf_counter()
+                    self.logger.info(f"TTFT {1000 * (first_token - started):.0f} ms "
+                                     f"(graph {1000 * (fetched - started):.0f} ms, llm {1000 * (first_token - fetched):.0f} ms)")
+                    if time.monotonic() > deadline:
+                        self.logger.warning(f"TTFT missed the query budget by {1000 * (time.monotonic() - deadline):.0f} ms")
+                parts.append(text)
+                yield StreamChunk(StreamChunk.DELTA, text)
+                # Citations are emitted as soon as their line is complete
+                for citation in citations.feed(text):
+                    yield StreamChunk(StreamChunk.CITATION, "", citation)
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled, or the consumer closed this stream: stop the LLM request now.
+            await stream.aclose()
+            self._abandon_query(turn, "llm", llm_chunks=len(parts))
+            raise
+
+        response = "".join(parts)
+        for citation in citations.finish():
+            yield StreamChunk(StreamChunk.CITATION, "", citation)
+        # Only added when the model did not write its own References section
+        references = citations.references_block()
+        if references:
+            response += references
+            yield StreamChunk(StreamChunk.REFERENCES, references)
+        if citations.unresolved():
+            self.logger.debug(f"Citation markers without a reference: {citations.unresolved()}")
+        self.logger.info(f"Streamed answer in {1000 * (time.perf_counter() - started):.0f} ms ({len(parts)} chunks)")
+        self._remember_response(final_key, response, cache="partial" not in context)
+        self._prefetch_predicted()
 
     def clear_memory(self):
         """
         Clear conversation history when switching contexts or users.
         """
         self.conversation_history = []
+        self.memory.reset()
+        self.session_context.reset()
+        self.response_cache.clear()
+        self.response_cache_times.clear()
+        self.__dict__.pop("_ttl_cache", None)
+        for task in list(self._late_fetches.values()):
+            task.cancel()
+        self._late_fetches = {}
+        self.cancel_prefetch()
+        self.cancel_speculative()
+        self._first_query = True
+        self._last_intent = None
+        self._predicted = None
         self.logger.info("Conversation memory cleared")
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Metrics for the session-start Graph warm-up.
+
+When a session selects a user, the agent starts fetching that person's
+sources into its cache in the background (PeopleAgent.start_prefetch). The
+first question of the session then classifies every source as warm (fresh in
+the cache), joined (prefetch still in flight, awaited instead of re-fetched)
+or cold (fetched by the question itself). This module aggregates those
+outcomes across sessions.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchStats:
+    """
+    Process-wide counters for session-start prefetching.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.first_queries = 0
+        self.first_query_warm = 0  # every source warm or joined
+        self.sources = {"warm": 0, "joined": 0, "cold": 0}
+
+    def record_first_query(self, outcome):
+        """
+        outcome maps source -> "warm" | "joined" | "cold" for a session's first question.
+        """
+        self.first_queries += 1
+        for state in outcome.values():
+            self.sources[state] += 1
+        if "cold" not in outcome.values():
+            self.first_query_warm += 1
+        logger.info(f"First query prefetch outcome: {outcome}")
+
+    def stats(self):
+        total = sum(self.sources.values())
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "first_queries": self.first_queries,
+            "first_query_warm_rate": round(self.first_query_warm / self.first_queries, 4) if self.first_queries else 0.0,
+            "sources": dict(self.sources),
+            "source_warm_rate": round((self.sources["warm"] + self.sources["joined"]) / total, 4) if total else 0.0,
+        }
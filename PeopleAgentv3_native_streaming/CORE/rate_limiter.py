@@ -0,0 +1,193 @@
+"""
+TPM / RPM scheduling in front of an Azure OpenAI deployment.
+
+Each deployment has a tokens-per-minute and a requests-per-minute quota. Before
+a call is sent its prompt tokens are estimated (plus the expected completion)
+and taken from two token buckets refilled continuously at TPM/60 and RPM/60
+per second. Calls that do not fit wait in a priority queue: interactive answers
+go before background summarization, which goes before batch work, FIFO within a
+priority. A 429 pauses the whole deployment for the Retry-After it carries
+instead of letting every waiting call hit the same limit. A call that cannot
+be sent within queue_timeout fails with Overloaded, like a shed query.
+
+A quota of 0 disables that bucket; Retry-After backoff always applies.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import re
+import time
+from collections import deque
+
+from PeopleAgentv3_native_streaming.CORE.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BATCH: "batch"}
+
+_RETRY_AFTER_TEXT = re.compile(r"retry after (\d+(?:\.\d+)?) seconds?", re.IGNORECASE)
+
+
+def is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429 or "429" in str(error)[:200]
+
+
+def is_transient(error):
+    """
+    Server-side or connection errors worth retrying (or sending elsewhere).
+    """
+    status = getattr(error, "status_code", None)
+    return ((status is not None and status >= 500)
+            or type(error).__name__ in ("APIConnectionError", "APITimeoutError", "Overloaded"))
+
+
+def retry_after(error, default=1.0):
+    """
+    Seconds to back off after a 429: the retry-after(-ms) header, the message text, or default.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    found = _RETRY_AFTER_TEXT.search(str(error))
+    return float(found.group(1)) if found else default
+
+
+class _Bucket:
+    """
+    Token bucket holding up to one minute of quota, refilled continuously.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount, now):
+        """
+        Seconds until amount is available (0 if it is now). Requests larger than
+        the bucket only wait for a full bucket.
+        """
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        if self.capacity:
+            self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Priority queue over TPM and RPM buckets for one deployment.
+    """
+
+    def __init__(self, tpm=0, rpm=0, queue_timeout=30.0, poll=0.05, window=200):
+        self.tokens = _Bucket(tpm)
+        self.requests = _Bucket(rpm)
+        self.queue_timeout = queue_timeout
+        self.poll = poll
+        self.paused_until = 0.0
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self.sent = 0
+        self.queued = 0
+        self.timed_out = 0
+        self.throttled = 0
+        self.backoff_seconds = 0.0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self.max_depth = 0
+        self.waits = {name: deque(maxlen=window) for name in PRIORITY_NAMES.values()}
+
+    def _delay(self, estimate, now):
+        return max(self.paused_until - now, self.tokens.wait_for(estimate, now), self.requests.wait_for(1, now))
+
+    async def acquire(self, estimate, priority=INTERACTIVE):
+        """
+        Wait until a call of estimate tokens may be sent, then charge it to both buckets.
+        """
+        started = time.monotonic()
+        waited = False
+        entry = (priority, next(self._seq))
+        heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._delay(estimate, now)
+                if self._waiting[0] == entry and delay <= 0:
+                    break
+                if now - started + max(delay, 0) > self.queue_timeout:
+                    self.timed_out += 1
+                    wait = max(delay, self.poll)
+                    raise Overloaded(f"LLM quota, {len(self._waiting)} calls waiting", math.ceil(wait))
+                if not waited:
+                    waited = True
+                    self.queued += 1
+                    self.max_depth = max(self.max_depth, len(self._waiting))
+                await asyncio.sleep(min(max(delay, self.poll), 1.0))
+        finally:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+        self.tokens.take(estimate)
+        self.requests.take(1)
+        self.sent += 1
+        self.estimated_tokens += estimate
+        self.waits[PRIORITY_NAMES.get(priority, "batch")].append(time.monotonic() - started)
+
+    def settle(self, estimate, actual):
+        """
+        Correct the token bucket once the real usage of a call is known.
+        """
+        self.actual_tokens += actual
+        self.tokens.take(actual - estimate)
+
+    def backoff(self, seconds):
+        """
+        Pause every call to this deployment after a 429.
+        """
+        self.throttled += 1
+        until = time.monotonic() + seconds
+        if until > self.paused_until:
+            self.backoff_seconds += until - max(self.paused_until, time.monotonic())
+            self.paused_until = until
+        logger.warning(f"LLM deployment rate limited, backing off {seconds:.1f} s "
+                       f"({len(self._waiting)} calls waiting)")
+
+    def stats(self):
+        def percentile(samples, share):
+            ordered = sorted(samples)
+            return round(1000 * ordered[int(share * (len(ordered) - 1))]) if ordered else None
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _ in self._waiting:
+            depth[PRIORITY_NAMES.get(priority, "batch")] += 1
+        return {
+            "sent": self.sent,
+            "queued": self.queued,
+            "waiting": depth,
+            "max_depth": self.max_depth,
+            "timed_out": self.timed_out,
+            "throttled_429": self.throttled,
+            "backoff_seconds": round(self.backoff_seconds, 1),
+            "estimated_tokens": self.estimated_tokens,
+            "actual_tokens": self.actual_tokens,
+            "wait_ms": {name: {"p50": percentile(samples, 0.5), "p95": percentile(samples, 0.95)}
+                        for name, samples in self.waits.items()},
+        }
@@ -1,27 +1,24 @@
 import logging
-import json
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from flask import Response  # used for Flask-based endpoints
+from PeopleAgentv3_native_streaming.CORE.stream_chunks import StreamChunk
+from PeopleAgentv3_native_streaming.CORE.single_flight import prompt_key
 
 logger = logging.getLogger(__name__)
 
 
 
-def generate_response_streaming(openai_client, query, context, conversation_history=None, flask_response=False):
-    """
-    Generate and stream a natural language response using Azure OpenAI.
-    When flask_response is True, wraps the generator in a Flask Response for SSE.
-    Otherwise, returns a plain generator to work with Gradio.
-    """
-    current_gmt_time = datetime.now(timezone.utc).strftime("%H:%M")
-    print("Current GMT time:", current_gmt_time)
-    
-    system_prompt = f"""
+# Stable system instructions. Nothing in here may change between calls: the
+# provider caches prompts by exact prefix, so volatile values (current time,
+# query, fresh data) are only ever appended at the end of the message list.
+SYSTEM_PROMPT = """
             AI Generated Answer
             1. Start any reply with a clear, concise summary (max 150 words) of key information.
             2. Format with bullet points, brief sentences, and clear headings.
             3. Only include details if explicitly requested.
-            4. Display the calculated local time based on location when available (current UTC: {current_gmt_time}).
+            4. When local time is relevant, quote the local_time field as given; never calculate it yourself.
             5. Append a 'References:' section after your answer, listing each citation with its reference details.
             6. For missing information, briefly note it without suggestions.
             
@@ -33,78 +30,123 @@ def generate_response_streaming(openai_client, query, context, conversation_hist
             • Invalid Input: "The provided user is invalid. Please verify and try again."
             • Permission Issues: "You don't have permission to view these data. Please check your access rights."
     """
-    messages = [{"role": "system", "content": system_prompt}]
-    if conversation_history and len(conversation_history) > 0:
-        history_to_add = [msg for msg in conversation_history[-6:] if msg["role"] != "system"]
-        messages.extend(history_to_add)
-    messages.append({"role": "user", "content": f"Query: {query}\nAvailable Data: {context}"})
+
+# Prefix fingerprints seen by this process, used to log how often a prefix is reused.
+# Every pinned session snapshot is its own prefix, so keep only the most recent ones.
+PREFIX_SEEN_LIMIT = 1024
+_prefix_seen = OrderedDict()
+
+
+def _fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def build_messages(query, context, conversation_history=None, pinned_context=None, summary=None, max_history=6):
+    """
+    Assemble the chat messages as a stable, cacheable prefix followed by volatile parts.
+
+    Prefix: system instructions, then pinned per-session data (if any), then the rolling
+    conversation summary (if any), then history.
+    Suffix: a single user message with the current UTC time, the query and the data.
+    max_history=None sends the history as given (the caller already bounded it).
+    """
+    system_content = SYSTEM_PROMPT
+    if pinned_context:
+        system_content = f"{SYSTEM_PROMPT}\nSession Data:\n{pinned_context}"
+    messages = [{"role": "system", "content": system_content}]
+    if summary:
+        messages.append({"role": "system", "content": summary})
+
+    # Add up to the last max_history messages from history for context, skipping system messages
+    if conversation_history:
+        recent = conversation_history if max_history is None else conversation_history[-max_history:]
+        messages.extend(msg for msg in recent if msg["role"] != "system")
+
+    current_gmt_time = datetime.now(timezone.utc).strftime("%H:%M")
+    messages.append({
+        "role": "user",
+        "content": f"Current UTC: {current_gmt_time}\nQuery: {query}\nAvailable Data: {context}"
+    })
+    log_prompt_fingerprint(messages)
+    return messages
+
+
+def log_prompt_fingerprint(messages):
+    """
+    Log fingerprints of the system prefix and of the full prompt. A prefix fingerprint
+    that repeats across calls is a prefix the provider can serve from its prompt cache.
+    """
+    prefix = messages[0]["content"]
+    prefix_fp = _fingerprint(prefix)
+    full_fp = _fingerprint("\n".join(f"{msg['role']}:{msg['content']}" for msg in messages))
+    _prefix_seen[prefix_fp] = _prefix_seen.get(prefix_fp, 0) + 1
+    _prefix_seen.move_to_end(prefix_fp)
+    while len(_prefix_seen) > PREFIX_SEEN_LIMIT:
+        _prefix_seen.popitem(last=False)
+    logger.info(f"Prompt fingerprint prefix={prefix_fp} (chars={len(prefix)}, seen={_prefix_seen[prefix_fp]}) "
+                f"full={full_fp} messages={len(messages)}")
+    return prefix_fp, full_fp
+
+
+def generate_response_streaming(openai_client, query, context, conversation_history=None, pinned_context=None):
+    """
+    Generate and stream a natural language response using Azure OpenAI.
+    Returns a plain (synchronous) generator of StreamChunk objects. Server-Sent Events are
+    served natively by the FastAPI app (see UI/api.py).
+    """
+    messages = build_messages(query, context, conversation_history, pinned_context)
     
-    # Call Azure OpenAI with streaming enabled to retrieve responses in real-time 
-    response_stream = openai_client.invoke(messages, stream=True)
+    # invoke(..., stream=True) only returns once the completion is finished;
+    # stream() yields message chunks as the model produces them.
+    response_stream = openai_client.stream(messages)
     
     def generate():
-        accumulated_text = ""
         logger.info("Starting streaming response...")
 
         for chunk in response_stream:
-            if hasattr(chunk, "text") and chunk.text:
-                text = chunk.text
-                accumulated_text += text
-                # Yield each chunk as a JSON string or plain text.
-                yield json.dumps({'chunk': text})
+            if chunk.content:
+                # Typed chunks in-process; no JSON round trip per token.
+                yield StreamChunk(StreamChunk.DELTA, chunk.content)
         logger.info("Finished streaming response.")
-        yield "[DONE]"
     
-    if flask_response:
-        from flask import Response
-        return Response(generate(), mimetype='text/event-stream')
-    else:
-        return generate()
+    return generate()
 
 
 
-#generate_response_newResponse + Chat History
-def generate_response(openai_client, query, context, conversation_history=None):
+async def agenerate_response_stream(openai_client, query, context, conversation_history=None, pinned_context=None,
+                                    summary=None, max_history=6, single_flight=None):
     """
-    Generate a natural language response from structured data using Azure OpenAI.
+    Stream a natural language response using the chat model's astream().
+    Async generator yielding text deltas as soon as the model produces them.
+    With single_flight, identical prompts in flight share one model stream.
     """
-    current_gmt_time = datetime.now(timezone.utc).strftime("%H:%M")
-    print("Current GMT time:", current_gmt_time)
+    messages = build_messages(query, context, conversation_history, pinned_context, summary, max_history)
 
-    #New Improved Prompt:
-    system_prompt = f"""
-            AI Generated Answer
-            1. Start any reply with a clear, concise summary (max 150 words) of key information.
-            2. Format with bullet points, brief sentences, and clear headings.
-            3. Only include details if explicitly requested.
-            4. Display the calculated local time based on location when available (current UTC: {current_gmt_time}).
-            5. Append a 'References:' section after your answer, listing each citation with its reference details.
-            6. For missing information, briefly note it without suggestions.
-            
-            Data Sources to acknowledge: Profile (Graph API), Manager (Workday), Skills (Workday),
-            Time Tracking (Replicon), Project data (PSA), and GitHub data when relevant.
-            
-            Error responses:
-            • No Results: "I couldn't find any work items matching your query. Please check the user identity and try again."
-            • Invalid Input: "The provided user is invalid. Please verify and try again."
-            • Permission Issues: "You don't have permission to view these data. Please check your access rights."
+    started = time.perf_counter()
+    first_token = None
+    if single_flight is not None:
+        stream = single_flight.stream(prompt_key(messages, openai_client), lambda: openai_client.astream(messages))
+    else:
+        stream = openai_client.astream(messages)
+    try:
+        async for chunk in stream:
+            if not chunk.content:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter()
+                logger.info(f"LLM time to first token: {1000 * (first_token - started):.0f} ms")
+            yield chunk.content
+    finally:
+        await stream.aclose()
+    logger.info(f"LLM stream finished in {1000 * (time.perf_counter() - started):.0f} ms")
+
+
+#generate_response_newResponse + Chat History
+def generate_response(openai_client, query, context, conversation_history=None, pinned_context=None):
     """
-    messages = [
-        {"role": "system", "content": system_prompt}       
-    ]
-    
-    # Add conversation history if available to provide context
-    if conversation_history and len(conversation_history) > 0:
-        # Add up to the last 6 messages from history for context
-        # Skip adding system messages from history
-        history_to_add = [msg for msg in conversation_history[-6:] 
-                         if msg["role"] != "system"]
-        messages.extend(history_to_add)
-
-     # Always add the current query and context as the latest message
-    messages.append({"role": "user", "content": f"Query: {query}\nAvailable Data: {context}"})
-    
-    #openai_client.incoke_stream(messages)
+    Generate a natural language response from structured data using Azure OpenAI.
+    """
+    messages = build_messages(query, context, conversation_history, pinned_context)
 
     return openai_client.invoke(messages).content    
 
@@ -112,6 +154,19 @@ def generate_response(openai_client, query, context, conversation_history=None):
     #return openai_client.invoke(messages, max_tokens=225, temperature=0.3).content
 
 
+async def agenerate_response(openai_client, query, context, conversation_history=None, pinned_context=None,
+                             summary=None, max_history=6, single_flight=None):
+    """
+    Async variant of generate_response; awaits ainvoke so the event loop keeps serving other sessions.
+    With single_flight, identical prompts in flight share one model call.
+    """
+    messages = build_messages(query, context, conversation_history, pinned_context, summary, max_history)
+    if single_flight is not None:
+        reply = await single_flight.call(prompt_key(messages, openai_client), lambda: openai_client.ainvoke(messages))
+        return reply.content
+    return (await openai_client.ainvoke(messages)).content
+
+
 
 def generate_response_v1(openai_client, query, context):
     """
@@ -0,0 +1,249 @@
+"""
+Memory-bounded store for per-session PeopleAgent instances.
+
+Sessions are kept in LRU order. A session is evicted when it has been idle for
+longer than the idle timeout, or when the store is full and it is the least
+recently used one. A session whose agent is still answering a query is never
+evicted; it is left for a later pass. Idle sessions are swept periodically by
+a background task on the event loop. Evicted sessions can optionally be
+hibernated: their conversation history is written to disk and restored the
+next time the same session asks about the same user.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def approx_size(obj, _seen=None):
+    """
+    Approximate deep size in bytes of plain Python containers (dict, list, tuple, set, str).
+    """
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key, _seen) + approx_size(value, _seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    return size
+
+
+def agent_memory(agent):
+    """
+    Approximate bytes held by an agent's per-conversation state.
+    """
+    return {
+        "history_bytes": approx_size(agent.conversation_history),
+        "response_cache_bytes": approx_size(agent.response_cache) + approx_size(agent.response_cache_times),
+        "api_cache_bytes": approx_size(getattr(agent, "_ttl_cache", {})),
+        "session_context_bytes": approx_size(agent.session_context.pinned_text or ""),
+    }
+
+
+class SessionStore:
+    """
+    LRU map of session id -> PeopleAgent with idle eviction and optional hibernation.
+    """
+
+    def __init__(self, max_sessions=200, idle_timeout=1800, hibernate_dir="", sweep_interval=60):
+        """
+        Args:
+            sweep_interval: Seconds between idle sweeps (see start_sweeper); 0 disables them.
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.hibernate_dir = hibernate_dir
+        self.sweep_interval = sweep_interval
+        self._sessions = OrderedDict()  # session_id -> (agent, last_used)
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.evictions = 0
+        self.deferred = 0
+        self.hibernations = 0
+        self.restores = 0
+        if hibernate_dir:
+            os.makedirs(hibernate_dir, exist_ok=True)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        """
+        Return the session's agent (marking it as recently used), or None.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.time())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id, agent):
+        """
+        Store the session's agent, restoring hibernated history and evicting
+        idle or least recently used sessions to stay within bounds.
+        """
+        self._restore(session_id, agent)
+        with self._lock:
+            self._sessions[session_id] = (agent, time.time())
+            self._sessions.move_to_end(session_id)
+            evicted = self._collect_evictions()
+        for evicted_id, evicted_agent, reason in evicted:
+            self._evict(evicted_id, evicted_agent, reason)
+        return agent
+
+    def pop(self, session_id):
+        """
+        Remove a session without hibernating it (explicit end of session).
+        """
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        self._drop_hibernated(session_id)
+        return entry[0] if entry else None
+
+    def evict_idle(self):
+        """
+        Evict every session idle for longer than the timeout. Returns the number evicted.
+        """
+        with self._lock:
+            evicted = self._collect_evictions()
+        for evicted_id, evicted_agent, reason in evicted:
+            self._evict(evicted_id, evicted_agent, reason)
+        return len(evicted)
+
+    def start_sweeper(self):
+        """
+        Start the periodic idle sweep on the running event loop, if it is not running yet.
+        Evictions cancel the agent's background tasks, so they must run on the loop.
+        """
+        if self.sweep_interval and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.evict_idle()
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    def _collect_evictions(self):
+        evicted = []
+        busy = 0
+        now = time.time()
+        for session_id, (agent, last_used) in list(self._sessions.items()):
+            if now - last_used > self.idle_timeout:
+                if getattr(agent, "active_queries", 0):
+                    busy += 1
+                    continue
+                del self._sessions[session_id]
+                evicted.append((session_id, agent, "idle"))
+        if len(self._sessions) > self.max_sessions:
+            # Oldest first, skipping agents mid-query (and never the session just used);
+            # the store may stay over its bound until they finish
+            for session_id, (agent, _) in list(self._sessions.items())[:-1]:
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if getattr(agent, "active_queries", 0):
+                    busy += 1
+                    continue
+                del self._sessions[session_id]
+                evicted.append((session_id, agent, "lru"))
+        self.deferred += busy
+        return evicted
+
+    def _evict(self, session_id, agent, reason):
+        self.evictions += 1
+        self._hibernate(session_id, agent)
+        agent.clear_memory()
+        logger.info(f"Evicted session {session_id} ({reason}) for user {agent.user_identifier}; "
+                    f"{len(self._sessions)} sessions remain")
+
+    def _path(self, session_id):
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        return os.path.join(self.hibernate_dir, f"{safe_id}.json")
+
+    def _hibernate(self, session_id, agent):
+        if not self.hibernate_dir or not agent.conversation_history:
+            return
+        try:
+            with open(self._path(session_id), "w", encoding="utf-8") as f:
+                json.dump({
+                    "user_identifier": agent.user_identifier,
+                    "conversation_history": agent.conversation_history,
+                    "memory": agent.memory.snapshot(),
+                    "hibernated_at": time.time(),
+                }, f)
+            self.hibernations += 1
+        except OSError as e:
+            logger.warning(f"Could not hibernate session {session_id}: {e}")
+
+    def _restore(self, session_id, agent):
+        if not self.hibernate_dir:
+            return
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("user_identifier") == agent.user_identifier:
+                agent.conversation_history = saved.get("conversation_history", [])[-agent.memory_limit:]
+                agent.memory.restore(saved.get("memory"))
+                self.restores += 1
+                logger.info(f"Restored {len(agent.conversation_history)} history messages for session {session_id}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not restore session {session_id}: {e}")
+        self._drop_hibernated(session_id)
+
+    def _drop_hibernated(self, session_id):
+        if self.hibernate_dir:
+            try:
+                os.remove(self._path(session_id))
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Per-session memory accounting plus store-level counters.
+        """
+        now = time.time()
+        with self._lock:
+            entries = list(self._sessions.items())
+        sessions = []
+        for session_id, (agent, last_used) in entries:
+            memory = agent_memory(agent)
+            sessions.append({
+                "session_id": session_id,
+                "user": agent.user_identifier,
+                "idle_seconds": round(now - last_used, 1),
+                "history_messages": len(agent.conversation_history),
+                "approx_bytes": sum(memory.values()),
+                **memory,
+            })
+        return {
+            "sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "approx_bytes": sum(session["approx_bytes"] for session in sessions),
+            "evictions": self.evictions,
+            "deferred": self.deferred,
+            "hibernations": self.hibernations,
+            "restores": self.restores,
+            "by_session": sessions,
+        }
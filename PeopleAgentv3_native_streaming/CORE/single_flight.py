@@ -0,0 +1,157 @@
+"""
+Single-flight coalescing of identical LLM calls.
+
+When many people ask the same question about the same person at once (demos,
+all-hands), every session builds the same prompt before any of them has an
+answer cached. Calls are keyed on a normalized fingerprint of the prompt and
+the route it is sent on. While a call with that key is in flight, further
+identical calls do not go to the model; they share its result instead.
+
+For streams, one producer task reads the model and buffers the chunks, and
+every subscriber replays the buffer and then follows live chunks, so a late
+joiner still gets the whole answer. The producer belongs to no subscriber:
+one of them cancelling does not stop the others, and the model stream is only
+closed early once every subscriber has gone.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_CURRENT_TIME = re.compile(r"^Current UTC: \d{1,2}:\d{2}\n", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def prompt_key(messages, client=None):
+    """
+    Fingerprint of a prompt for coalescing: the per-minute clock line is dropped and
+    whitespace runs are collapsed; everything else (names, IDs, case) stays byte-exact.
+    The client's route (if any) is part of the key.
+    """
+    # The clock line opens the user message, so it is dropped per message, before the role prefix
+    text = "\n".join(f"{message['role']}:{_CURRENT_TIME.sub('', message['content'])}" for message in messages)
+    text = _WHITESPACE.sub(" ", text).strip()
+    route = getattr(client, "route", "")
+    return hashlib.sha256(f"{route}\n{text}".encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """
+    One in-flight stream: buffered chunks, completion state and subscriber count.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.updated = asyncio.Event()
+        self.task = None
+
+    def notify(self):
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+
+class SingleFlight:
+    """
+    Process-wide registry of in-flight LLM calls by prompt key.
+    """
+
+    def __init__(self):
+        self._streams = {}
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.coalesced_streams = 0
+        self.late_joins = 0  # joined a stream after its first chunk
+        self.max_fan_out = 0
+        self.abandoned = 0
+
+    async def stream(self, key, open_stream):
+        """
+        Async generator of the chunks of open_stream() (a zero-argument callable returning an
+        async iterator), shared with every concurrent caller using the same key.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._streams[key] = flight
+            self.leaders += 1
+            flight.task = asyncio.ensure_future(self._produce(key, flight, open_stream))
+        else:
+            self.coalesced += 1
+            self.coalesced_streams += 1
+            if flight.chunks:
+                self.late_joins += 1
+            logger.info(f"Coalesced identical LLM stream {key[:12]} ({flight.subscribers + 1} subscribers)")
+        flight.subscribers += 1
+        self.max_fan_out = max(self.max_fan_out, flight.subscribers)
+
+        index = 0
+        try:
+            while True:
+                updated = flight.updated
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await updated.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more; stop the model stream
+                self.abandoned += 1
+                flight.task.cancel()
+
+    async def _produce(self, key, flight, open_stream):
+        stream = open_stream()
+        try:
+            async for chunk in stream:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            await stream.aclose()
+            flight.done = True
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.notify()
+
+    async def call(self, key, make_call):
+        """
+        Await make_call() (a zero-argument coroutine function), or the identical call already in flight.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(make_call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced identical LLM call {key[:12]}")
+        # Shielded: one caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def stats(self):
+        total = self.leaders + self.coalesced
+        return {
+            "llm_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_streams": self.coalesced_streams,
+            "coalesced_share": round(self.coalesced / total, 4) if total else 0.0,
+            "late_joins": self.late_joins,
+            "max_fan_out": self.max_fan_out,
+            "in_flight": len(self._streams) + len(self._calls),
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,106 @@
+"""
+Typed stream chunks and frame coalescing for the streaming answer path.
+
+The agent yields StreamChunk objects in-process (no JSON encode/decode per
+token). Transports then group tokens into frames with coalesce(): a frame is
+flushed when the time window has elapsed since the last flush, when it has
+reached the size limit, or when the stream ends, so per-frame overhead
+(Gradio re-render, SSE/WebSocket write) is paid per frame rather than per token.
+"""
+
+import asyncio
+import time
+
+
+class StreamChunk:
+    """
+    One piece of a streamed answer.
+
+    kind is one of:
+        delta       model text
+        references  the References block appended after the model text
+        cached      a complete answer served from the response cache
+        citation    a completed citation (see citations.py); text is empty, citation is set
+    """
+    __slots__ = ("kind", "text", "citation")
+
+    DELTA = "delta"
+    REFERENCES = "references"
+    CACHED = "cached"
+    CITATION = "citation"
+
+    def __init__(self, kind, text, citation=None):
+        self.kind = kind
+        self.text = text
+        self.citation = citation
+
+    def __repr__(self):
+        return f"StreamChunk({self.kind!r}, {self.text!r})"
+
+
+class Frame:
+    """
+    Coalesced text from one or more chunks, ready to send, plus the citations completed in it.
+    """
+    __slots__ = ("text", "chunks", "citations")
+
+    def __init__(self, text, chunks, citations=None):
+        self.text = text
+        self.chunks = chunks
+        self.citations = citations or []
+
+
+async def coalesce(stream, window_ms=50, max_chars=256):
+    """
+    Group an async stream of StreamChunk into Frames on a time or size window.
+
+    A window of 0 yields one frame per chunk. The pending read is never cancelled
+    when the window expires, so the underlying stream is not disturbed. When the
+    consumer stops early, the pending read is cancelled and the stream closed, so
+    cancellation reaches the producer.
+    """
+    window = window_ms / 1000.0
+    iterator = stream.__aiter__()
+    parts = []
+    citations = []
+    chunks = 0
+    size = 0
+    last_flush = time.perf_counter()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None
+            if parts:
+                timeout = max(0.0, window - (time.perf_counter() - last_flush))
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    break
+                pending = None
+                parts.append(chunk.text)
+                if chunk.citation is not None:
+                    citations.append(chunk.citation)
+                chunks += 1
+                size += len(chunk.text)
+                if size < max_chars and time.perf_counter() - last_flush < window:
+                    continue
+            if parts:
+                yield Frame("".join(parts), chunks, citations)
+                parts, citations, chunks, size = [], [], 0, 0
+                last_flush = time.perf_counter()
+        if parts:
+            yield Frame("".join(parts), chunks, citations)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
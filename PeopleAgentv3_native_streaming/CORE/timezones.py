@@ -0,0 +1,84 @@
+"""
+Local time for people in the context, computed with zoneinfo instead of by the model.
+
+A person's IANA zone comes from officeLocation through the bundled city table
+below (the user objects we fetch do not carry mailboxSettings). Zone resolution
+is cached per office location; the local clock reading is only computed for
+queries that ask about time, so other prompts stay identical minute to minute.
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# officeLocation keywords (city or campus names), matched as whole words, case-insensitive.
+# Names that are also common words or US states ("reading", "washington") are left out.
+OFFICE_ZONES = {
+    "redmond": "America/Los_Angeles", "seattle": "America/Los_Angeles", "bellevue": "America/Los_Angeles",
+    "san francisco": "America/Los_Angeles", "mountain view": "America/Los_Angeles",
+    "los angeles": "America/Los_Angeles", "vancouver": "America/Vancouver",
+    "denver": "America/Denver", "phoenix": "America/Phoenix",
+    "chicago": "America/Chicago", "dallas": "America/Chicago", "austin": "America/Chicago",
+    "houston": "America/Chicago", "mexico city": "America/Mexico_City",
+    "new york": "America/New_York", "boston": "America/New_York", "atlanta": "America/New_York",
+    "charlotte": "America/New_York", "toronto": "America/Toronto",
+    "montreal": "America/Toronto", "sao paulo": "America/Sao_Paulo", "buenos aires": "America/Argentina/Buenos_Aires",
+    "london": "Europe/London", "edinburgh": "Europe/London",
+    "dublin": "Europe/Dublin", "lisbon": "Europe/Lisbon", "madrid": "Europe/Madrid", "barcelona": "Europe/Madrid",
+    "paris": "Europe/Paris", "amsterdam": "Europe/Amsterdam", "brussels": "Europe/Brussels",
+    "berlin": "Europe/Berlin", "munich": "Europe/Berlin", "frankfurt": "Europe/Berlin",
+    "zurich": "Europe/Zurich", "milan": "Europe/Rome", "rome": "Europe/Rome", "vienna": "Europe/Vienna",
+    "prague": "Europe/Prague", "warsaw": "Europe/Warsaw", "stockholm": "Europe/Stockholm",
+    "copenhagen": "Europe/Copenhagen", "oslo": "Europe/Oslo", "helsinki": "Europe/Helsinki",
+    "athens": "Europe/Athens", "istanbul": "Europe/Istanbul", "moscow": "Europe/Moscow",
+    "tel aviv": "Asia/Jerusalem", "herzliya": "Asia/Jerusalem", "cairo": "Africa/Cairo",
+    "johannesburg": "Africa/Johannesburg", "nairobi": "Africa/Nairobi", "lagos": "Africa/Lagos",
+    "dubai": "Asia/Dubai", "riyadh": "Asia/Riyadh", "karachi": "Asia/Karachi",
+    "bangalore": "Asia/Kolkata", "bengaluru": "Asia/Kolkata", "hyderabad": "Asia/Kolkata",
+    "mumbai": "Asia/Kolkata", "pune": "Asia/Kolkata", "chennai": "Asia/Kolkata",
+    "delhi": "Asia/Kolkata", "noida": "Asia/Kolkata", "gurgaon": "Asia/Kolkata",
+    "bangkok": "Asia/Bangkok", "jakarta": "Asia/Jakarta", "kuala lumpur": "Asia/Kuala_Lumpur",
+    "singapore": "Asia/Singapore", "manila": "Asia/Manila", "hong kong": "Asia/Hong_Kong",
+    "shanghai": "Asia/Shanghai", "beijing": "Asia/Shanghai", "shenzhen": "Asia/Shanghai",
+    "taipei": "Asia/Taipei", "seoul": "Asia/Seoul", "tokyo": "Asia/Tokyo", "osaka": "Asia/Tokyo",
+    "sydney": "Australia/Sydney", "melbourne": "Australia/Melbourne", "brisbane": "Australia/Brisbane",
+    "perth": "Australia/Perth", "auckland": "Pacific/Auckland",
+}
+
+_OFFICE_PATTERN = re.compile(r"\b(" + "|".join(sorted(map(re.escape, OFFICE_ZONES), key=len, reverse=True)) + r")\b")
+
+# Questions that need a local clock reading in the context
+TIME_QUESTION = re.compile(
+    r"\b(time|times|timezone|clock|o'clock|hours?|morning|afternoon|evening|night|awake|"
+    r"working hours|available|meet|meeting|call|schedule)\b", re.IGNORECASE)
+
+
+def asks_about_time(query):
+    return bool(TIME_QUESTION.search(query or ""))
+
+
+@lru_cache(maxsize=4096)
+def resolve_zone(office_location=None):
+    """
+    Return (iana_zone, source) for a person's office location, or None if it does not resolve.
+    source is "office".
+    """
+    if office_location and office_location != "Unknown":
+        found = _OFFICE_PATTERN.search(office_location.lower())
+        if found:
+            return OFFICE_ZONES[found.group(1)], "office"
+    return None
+
+
+def local_time(zone, now=None):
+    """
+    Compact local clock reading for an IANA zone, e.g. "Tue 14:05 UTC-07:00 America/Los_Angeles".
+    """
+    now = now or datetime.now(timezone.utc)
+    local = now.astimezone(ZoneInfo(zone))
+    offset = local.strftime("%z")
+    return f"{local.strftime('%a %H:%M')} UTC{offset[:3]}:{offset[3:]} {zone}"
@@ -12,10 +12,14 @@ import json
 # Add the project root to the Python path so that modules can be imported correctly.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-# Load config and logging setup from UTIL folder.
-from PeopleAgentv3_native_streaming.UTIL.config import load_config
-from PeopleAgentv3_native_streaming.UTIL.logging_setup import setup_logging
+from PeopleAgentv3_native_streaming.CORE.app_context import get_app_context
+from PeopleAgentv3_native_streaming.CORE.admission import Overloaded
+from PeopleAgentv3_native_streaming.CORE.llm_client import rate_limit_stats
+from PeopleAgentv3_native_streaming.CORE.endpoint_pool import endpoint_stats
 from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent 
+from PeopleAgentv3_native_streaming.CORE.session_store import SessionStore
+from PeopleAgentv3_native_streaming.CORE.stream_chunks import coalesce
+from PeopleAgentv3_native_streaming.UI.api import create_api_router
 
 
 # Initialize FastAPI application.
@@ -31,31 +35,84 @@ if __name__ == '__main__' and __package__ is None:
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Enable debug messages
 
-# Load configuration and set up logging.
-config = load_config()
-setup_logging(config)
+# Build the shared application context (config, logging, credentials, clients) once.
+app_context = get_app_context()
+config = app_context.config
 
-# Global dictionary to store agent instances by user identifier
-# This provides agent persistence for memory management.
-user_agents = {}
+# Selected user per Gradio session id. It outlives an evicted agent (the next question
+# recreates one for the same user) and is dropped only when the session closes.
+session_users = {}
 
-# Global state for the currently selected user.
-current_user = {"identifier": None, "profile_displayed": False}
+# Agent instances by Gradio session id (one per browser tab).
+# This provides agent persistence for memory management without sharing
+# conversation memory between tabs. The store is bounded: idle and least
+# recently used sessions are evicted (and optionally hibernated to disk).
+user_agents = SessionStore(
+    max_sessions=config.get("SESSION_MAX", 200),
+    idle_timeout=config.get("SESSION_IDLE_TIMEOUT", 1800),
+    hibernate_dir=config.get("SESSION_HIBERNATE_DIR", ""),
+    sweep_interval=config.get("SESSION_SWEEP_INTERVAL", 60)
+)
 
-# Async function to retrieve or create a PeopleAgent instance per user.
-async def get_or_create_agent(user_identifier):
-    """Retrieve an existing agent or create a new one to maintain conversation memory."""
-    if user_identifier not in user_agents:
-        logger.info(f"Creating new agent instance for user: {user_identifier}")
-        user_agents[user_identifier] = PeopleAgent(user_identifier)
-    return user_agents[user_identifier]
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+
+
+@app.get("/sessions/stats")
+def session_stats():
+    """Per-session memory accounting for the agent store (evicts idle sessions first)."""
+    user_agents.evict_idle()
+    return user_agents.stats()
+
+
+def collect_metrics():
+    """Admission and session-store metrics, served at /v1/metrics."""
+    return {"admission": app_context.admission.stats(),
+            "cancellation": app_context.cancellations.stats(),
+            "graph_hedging": app_context.graph_client.hedge_stats(),
+            "prefetch": app_context.prefetch_stats.stats(),
+            "fast_path": app_context.fast_path_stats.stats(),
+            "model_routing": app_context.model_router.stats(),
+            "llm_rate_limit": rate_limit_stats(),
+            "llm_endpoints": endpoint_stats(),
+            "single_flight": app_context.single_flight.stats() if app_context.single_flight else None,
+            "predictive_prefetch": {**app_context.intent_model.stats(),
+                                    "graph_calls": app_context.prefetch_budget.spent,
+                                    "budget_denied": app_context.prefetch_budget.denied,
+                                    "joined": app_context.prefetch_budget.joined,
+                                    "cancelled": app_context.prefetch_budget.cancelled},
+            "sessions": len(user_agents)}
+
+
+def get_session_id(request: gr.Request = None):
+    """Return the Gradio session id for the request (a fixed id outside of Gradio)."""
+    return getattr(request, "session_hash", None) or "default"
+
+
+def get_session_user(session_id):
+    """Return the mutable per-session state for the currently selected user."""
+    return session_users.setdefault(session_id, {"identifier": None, "profile_displayed": False})
+
+# Async function to retrieve or create a PeopleAgent instance per session.
+async def get_or_create_agent(session_id, user_identifier):
+    """Retrieve the session's agent or create a new one to maintain conversation memory."""
+    user_agents.start_sweeper()
+    agent = user_agents.get(session_id)
+    if agent is None or agent.user_identifier != user_identifier:
+        if agent is not None:
+            agent.cancel_prefetch()
+            agent.cancel_speculative()
+        logger.info(f"Creating new agent instance for user: {user_identifier} (session {session_id})")
+        # Cheap: the agent is a per-conversation view over the shared app_context.
+        agent = PeopleAgent(user_identifier, app_context)
+        user_agents.put(session_id, agent)
+    return agent
 
 # Async function to process a query using the persistent agent.
-async def get_response(user_query, user_identifier):
-    """Process a query using a persistent PeopleAgent instance to maintain context."""
-    agent = await get_or_create_agent(user_identifier)
+async def get_response(user_query, session_id):
+    """Process a query using the session's persistent PeopleAgent instance to maintain context."""
+    agent = await get_or_create_agent(session_id, get_session_user(session_id)["identifier"])
     # Process query using the agent's process_query method.
-    return await agent.process_query(user_query)
+    return await agent.process_query(user_query, stream=False)
 
 def format_response(response_text, is_profile=False):
     """Format the response text for better readability in the UI.
@@ -64,20 +121,25 @@ def format_response(response_text, is_profile=False):
     """
     return response_text
 
-def sync_handle(input_text, history):
-    """Synchronous handler that wraps asynchronous PeopleAgent logic while managing context."""
+def end_session(session_id):
+    """Clear the session's agent memory and drop its agent."""
+    agent = user_agents.pop(session_id)
+    if agent is not None:
+        logger.info(f"Clearing memory for user: {agent.user_identifier} (session {session_id})")
+        agent.clear_memory()
+
+async def handle(input_text, history, session_id):
+    """Handle session commands (exit, user selection) or answer a query for the session's user."""
     try:
+        current_user = get_session_user(session_id)
         # Check if input is an email or user identifier (simple regex check).
-        is_email = re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", input_text.strip())
+        is_email = EMAIL_PATTERN.match(input_text.strip())
         # Check if the user wants to exit the session.
         is_exit = input_text.strip().lower() == "exit"
         
         if is_exit:
-            # If the session ends, clear the agent memory and update current_user state.
-            if current_user["identifier"] and current_user["identifier"] in user_agents:
-                logger.info(f"Clearing memory for user: {current_user['identifier']}")
-                user_agents[current_user["identifier"]].clear_memory()
-                del user_agents[current_user["identifier"]]
+            # If the session ends, clear the agent memory and update the session state.
+            end_session(session_id)
             current_user["identifier"] = None
             current_user["profile_displayed"] = False
             return "Session ended."
@@ -88,24 +150,27 @@ def sync_handle(input_text, history):
             
             # If switching users, clear previous user's agent memory.
             if current_user["identifier"] and current_user["identifier"] != user_id:
-                if current_user["identifier"] in user_agents:
-                    logger.info(f"Switching users, clearing memory for: {current_user['identifier']}")
-                    user_agents[current_user["identifier"]].clear_memory()
-                    del user_agents[current_user["identifier"]]
+                logger.info(f"Switching users, clearing memory for: {current_user['identifier']}")
+                end_session(session_id)
             
             # Set new user details.
             current_user["identifier"] = user_id
             current_user["profile_displayed"] = True
+
+            # Warm this user's Graph sources while the first question is being typed.
+            if config.get("PREFETCH_ON_SESSION_START", True):
+                agent = await get_or_create_agent(session_id, user_id)
+                agent.start_prefetch()
             
             # Return session initialization information.
             return f"User {user_id} session started."
         else:
             # Otherwise, process input as a query related to the current user.
-            response = asyncio.run(get_response(input_text, current_user["identifier"]))
+            response = await get_response(input_text, session_id)
             
             # Log the conversation history length for debugging.
-            if current_user["identifier"] in user_agents:
-                history_len = len(user_agents[current_user["identifier"]].conversation_history)
+            if session_id in user_agents:
+                history_len = len(user_agents.get(session_id).conversation_history)
                 logger.debug(f"User {current_user['identifier']} conversation history length: {history_len}")
             
             formatted_response = format_response(response)
@@ -115,74 +180,60 @@ def sync_handle(input_text, history):
         logger.exception(f"Error processing query: {str(e)}")
         return f"Error processing your request: {str(e)}"
 
-def clear_conversation():
-    """Clear conversation memory when starting a new session."""
-    if current_user["identifier"] and current_user["identifier"] in user_agents:
-        logger.info(f"Clearing memory for user: {current_user['identifier']}")
-        user_agents[current_user["identifier"]].clear_memory()
-        del user_agents[current_user["identifier"]]
-    
-    # Reset current user state.
-    current_user["identifier"] = None
-    current_user["profile_displayed"] = False
+def close_session(session_id):
+    """Cancel the session's running query, then drop its agent and selected-user state."""
+    app_context.cancellations.cancel(session_id)
+    end_session(session_id)
+    session_users.pop(session_id, None)
+
+def clear_conversation(request: gr.Request = None):
+    """Clear conversation memory when a browser session closes or restarts."""
+    close_session(get_session_id(request))
     return None
 
 
-def bot(message: str, history: list):
-    """Stream responses from PeopleAgent using its generate functionality."""
-    # If the input is an email or no current user, handle it synchronously via sync_handle.
-    if re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", message.strip()) or not current_user["identifier"]:
-        response = sync_handle(message, history)
+async def bot(message: str, history: list, request: gr.Request):
+    """Stream responses from PeopleAgent, coalescing tokens into frames on a time/size window."""
+    session_id = get_session_id(request)
+    current_user = get_session_user(session_id)
+
+    # If the input is an email, "exit" or no current user, handle it as a session command.
+    if EMAIL_PATTERN.match(message.strip()) or message.strip().lower() == "exit" or not current_user["identifier"]:
+        response = await handle(message, history, session_id)
         yield response
         return
 
     # Otherwise, get the persistent agent to stream the response.
-    agent = asyncio.run(get_or_create_agent(current_user["identifier"]))
-    
-     # Log when native streaming starts.
-    logger.info(f"Native streaming started for user: {current_user['identifier']} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    
-
-    # Call process_query with streaming enabled.
-    response_generator = agent.process_query(message, stream=True)
-
-    answer = ""
-    for chunk in response_generator:
-        # Each chunk is a JSON string; decode if necessary.
-        try:
-            data = json.loads(chunk)
-            text_chunk = data.get("chunk", "")
-        except Exception:
-            text_chunk = chunk
-        answer += text_chunk
-
-         # Log each streaming chunk with timestamp and part of the content
-        logger.debug(f"Streaming chunk received at {time.strftime('%Y-%m-%d %H:%M:%S')}: {text_chunk[:50]}... (length: {len(text_chunk)})")
-        
-        yield answer
+    agent = await get_or_create_agent(session_id, current_user["identifier"])
+    logger.info(f"Native streaming started for user: {current_user['identifier']}")
+    started = time.perf_counter()
 
-
-def bot_old(message: str, history: list):
-    """Stream responses from PeopleAgent using its generate functionality."""
-    # If the input is an email or no current user, handle it synchronously via sync_handle.
-    if re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", message.strip()) or not current_user["identifier"]:
-        response = sync_handle(message, history)
-        yield response
+    # Gradio's chat message is replaced on every yield, so each frame must carry the
+    # accumulated answer; coalescing bounds how many times that happens per answer.
+    parts = []
+    frames = chunks = 0
+    # Registered so a closed tab (demo.unload -> close_session) cancels this answer mid-flight.
+    task = asyncio.current_task()
+    app_context.cancellations.start(session_id, task)
+    try:
+        async with app_context.admission.admit():
+            stream = agent.process_query(message, stream=True)
+            async for frame in coalesce(stream, config.get("STREAM_COALESCE_MS", 50), config.get("STREAM_COALESCE_CHARS", 256)):
+                if not frame.text:
+                    continue  # citation events only; the chat shows the references inline
+                if not parts:
+                    logger.info(f"First frame delivered to UI after {1000 * (time.perf_counter() - started):.0f} ms")
+                parts.append(frame.text)
+                frames += 1
+                chunks += frame.chunks
+                yield "".join(parts)
+    except Overloaded as e:
+        yield f"The service is busy right now. Please try again in {e.retry_after} seconds."
         return
+    finally:
+        app_context.cancellations.finish(session_id, task)
 
-    # Otherwise, get the persistent agent to stream the response.
-    agent = asyncio.run(get_or_create_agent(current_user["identifier"]))
-    # Call process_query with streaming enabled.
-    response_generator = agent.process_query(message, stream=True)
-    answer = ""
-
-    # Iterate over each response chunk.
-    for chunk in response_generator:
-        # Log each received chunk with a timestamp.
-        #logger.debug(f"Received chunk: {chunk}")
-        #logger.debug(f"Chunk received at {time.strftime('%H:%M:%S')}: {chunk[:50]}... (length: {len(chunk)})")
-        answer += chunk
-        yield answer
+    logger.debug(f"Streamed {chunks} chunks in {frames} frames in {1000 * (time.perf_counter() - started):.0f} ms")
 
 def build_ui():
     """Build the Gradio user interface for the People Agent."""
@@ -261,6 +312,9 @@ def build_ui():
             type="messages"
         )
         
+        # Drop the tab's agent and state when the browser session closes.
+        demo.unload(clear_conversation)
+
         # --- Instructions Section ---
         gr.Markdown("""
         ### How to use:
@@ -270,6 +324,18 @@ def build_ui():
     
     return demo
 
+# REST / SSE query API (registered before Gradio is mounted at "/").
+app.include_router(create_api_router(
+    get_or_create_agent, get_session_user, end_session=close_session,
+    max_conversations=config.get("WS_MAX_CONVERSATIONS", 4),
+    send_queue_size=config.get("WS_SEND_QUEUE", 64),
+    coalesce_ms=config.get("STREAM_COALESCE_MS", 50),
+    coalesce_chars=config.get("STREAM_COALESCE_CHARS", 256),
+    admission=app_context.admission,
+    metrics=collect_metrics,
+    cancellations=app_context.cancellations
+))
+
 # Build the UI using Gradio.
 ui = build_ui()
 
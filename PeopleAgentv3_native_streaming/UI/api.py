@@ -0,0 +1,378 @@
+"""
+REST and Server-Sent-Events query API for PeopleAgent.
+
+POST /v1/sessions/{session_id}/query
+    Body: {"query": "...", "user": "<email, optional once set>", "stream": true}
+
+With "stream": true the response is text/event-stream with these events:
+    source  {"source": "manager", "status": "ok", "ms": 212}   one per Graph source (status ok / error / stale / timeout)
+    delta   {"text": "..."}                                    token deltas only, never the accumulated answer
+    citation {"number": 1, "source": "Profile (Graph API): ..."} as soon as a reference line is complete
+    done    {"chars": 812, "ms": 2310}
+    error   {"message": "..."}
+    cancelled {"chars": 120}                                   superseded by a newer query on the session
+With "stream": false the response is JSON: {"session_id", "user", "answer"}, or 409
+{"session_id", "cancelled": true, "error"} when a newer query on the session superseded it.
+Optional "deadline_ms" is the query's latency budget to first token: it bounds the
+admission wait, and Graph sources that miss their share of it are answered from
+stale cache or left out.
+When the service is saturated the query is shed with 429 and a Retry-After header.
+
+A new query on a session cancels the one still running on it, and a streaming
+query is cancelled (Graph fetches and LLM stream included) when the client disconnects.
+
+GET /v1/metrics
+    Admission (in-flight, queue depth, wait times, shed counts), cancelled work and session-store stats.
+
+WS /v1/ws
+    One connection carries several conversations, multiplexed by conversation_id.
+    Client frames:
+        {"type": "query", "conversation_id": "c1", "query": "...", "user": "<email, optional once set>"}
+        {"type": "cancel", "conversation_id": "c1"}
+    A new query on a conversation that is still answering cancels the running one.
+    Server frames (all carry conversation_id):
+        source / delta / citation / done as in the SSE stream, plus cancelled and error
+        (a shed query's error frame carries "retry_after").
+    Flow control: frames go through a bounded per-connection send queue, so a slow
+    client pauses its conversations' streams instead of buffering without limit,
+    and at most max_conversations queries run at once per connection.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+
+from PeopleAgentv3_native_streaming.CORE.admission import Overloaded
+from PeopleAgentv3_native_streaming.CORE.stream_chunks import coalesce
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRequest(BaseModel):
+    query: str
+    user: Optional[str] = None
+    stream: bool = True
+    deadline_ms: Optional[int] = None
+
+
+def sse(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def deadline_from_ms(deadline_ms):
+    """Turn a relative deadline in milliseconds into an absolute time.monotonic() value."""
+    return time.monotonic() + deadline_ms / 1000.0 if deadline_ms else None
+
+
+def create_api_router(get_or_create_agent, get_session_user, end_session=None,
+                      max_conversations=4, send_queue_size=64, coalesce_ms=50, coalesce_chars=256,
+                      admission=None, metrics=None, cancellations=None):
+    """
+    Build the /v1 router on top of the UI's session plumbing, so API sessions and
+    Gradio sessions share one bounded agent store.
+
+    Args:
+        get_or_create_agent: async (session_id, user_identifier) -> PeopleAgent
+        get_session_user: session_id -> mutable {"identifier": ...} session state
+        end_session: optional session_id -> None, called for WebSocket conversations on disconnect
+        max_conversations: concurrent queries allowed per WebSocket connection
+        send_queue_size: frames buffered per WebSocket connection before streams pause
+        coalesce_ms, coalesce_chars: time / size window for grouping tokens into one delta frame
+        admission: optional AdmissionController every query must pass before it runs
+        metrics: optional () -> dict served at GET /v1/metrics
+        cancellations: optional CancellationTracker; a new query on a session supersedes the running one
+    """
+    router = APIRouter(prefix="/v1")
+
+    async def resolve_agent(session_id, body):
+        session = get_session_user(session_id)
+        if body.user:
+            session["identifier"] = body.user.strip()
+        if not session["identifier"]:
+            raise HTTPException(status_code=400, detail="No user selected for this session; pass 'user'.")
+        return await get_or_create_agent(session_id, session["identifier"])
+
+    @router.post("/sessions/{session_id}/query")
+    async def query(session_id: str, body: QueryRequest):
+        agent = await resolve_agent(session_id, body)
+
+        deadline = deadline_from_ms(body.deadline_ms)
+        release = None
+        if admission is not None:
+            try:
+                admitted_at = await admission.acquire(deadline)
+            except Overloaded as e:
+                return JSONResponse({"error": str(e), "retry_after": e.retry_after}, status_code=429,
+                                    headers={"Retry-After": str(e.retry_after)})
+            release = release_once(admission, admitted_at)
+
+        if not body.stream:
+            # The answer runs in a child task: a superseding query cancels that task, not this
+            # handler, so the first client still gets a response.
+            task = asyncio.create_task(agent.process_query(body.query, stream=False, deadline=deadline))
+            if cancellations is not None:
+                cancellations.start(session_id, task)
+            try:
+                answer = await task
+            except asyncio.CancelledError:
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise  # the request itself was cancelled (client gone)
+                return JSONResponse({"session_id": session_id, "cancelled": True,
+                                     "error": "Superseded by a newer query on this session."}, status_code=409)
+            finally:
+                if cancellations is not None:
+                    cancellations.finish(session_id, task)
+                if release is not None:
+                    release()
+            return {"session_id": session_id, "user": agent.user_identifier, "answer": answer}
+
+        # The admission slot is held until the event stream finishes, not just until headers go out.
+        # The background task releases it even if the client leaves before the body is iterated
+        # (then stream_events never runs); release_once makes the second call a no-op.
+        return StreamingResponse(stream_events(agent, body.query, coalesce_ms, coalesce_chars, on_close=release,
+                                               cancellations=cancellations, session_id=session_id, deadline=deadline),
+                                 media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                                 background=BackgroundTask(release) if release is not None else None)
+
+    @router.get("/metrics")
+    async def get_metrics():
+        if metrics is None:
+            return admission.stats() if admission is not None else {}
+        return metrics()
+
+    @router.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        await websocket.accept()
+        connection = WebSocketConnection(websocket, get_or_create_agent, get_session_user,
+                                         max_conversations, send_queue_size, coalesce_ms, coalesce_chars,
+                                         admission, cancellations)
+        try:
+            await connection.run()
+        finally:
+            if end_session is not None:
+                for session_id in connection.session_ids:
+                    end_session(session_id)
+
+    return router
+
+
+def release_once(admission, admitted_at):
+    """
+    Return a callable releasing an admission slot exactly once, however many paths call it.
+    """
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(admitted_at)
+    return release
+
+
+async def stream_events(agent, query, coalesce_ms=50, coalesce_chars=256, on_close=None,
+                        cancellations=None, session_id=None, deadline=None):
+    """
+    Run the agent's streaming path and interleave source-progress and delta events.
+    Deltas are coalesced into frames on a time / size window. on_close, if given,
+    is called once when the stream ends or the client goes away. If the client goes
+    away, or a newer query on the same session supersedes this one, the producer is
+    cancelled and the cancellation reaches the Graph fetches and the LLM stream.
+    """
+    events = asyncio.Queue()
+    started = time.perf_counter()
+
+    def progress(source, status, elapsed_ms):
+        events.put_nowait(sse("source", {"source": source, "status": status, "ms": round(elapsed_ms)}))
+
+    async def produce():
+        chars = 0
+        try:
+            stream = agent.process_query(query, stream=True, progress=progress, deadline=deadline)
+            async for frame in coalesce(stream, coalesce_ms, coalesce_chars):
+                chars += len(frame.text)
+                if frame.text:
+                    events.put_nowait(sse("delta", {"text": frame.text}))
+                for citation in frame.citations:
+                    events.put_nowait(sse("citation", citation.as_dict()))
+            events.put_nowait(sse("done", {"chars": chars, "ms": round(1000 * (time.perf_counter() - started))}))
+        except asyncio.CancelledError:
+            events.put_nowait(sse("cancelled", {"chars": chars}))
+            raise
+        except Exception as e:
+            logger.exception(f"Error streaming query: {str(e)}")
+            events.put_nowait(sse("error", {"message": str(e)}))
+        finally:
+            events.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    if cancellations is not None:
+        cancellations.start(session_id, producer)
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        if not producer.done():
+            producer.cancel()
+        if cancellations is not None:
+            cancellations.finish(session_id, producer)
+        if on_close is not None:
+            on_close()
+
+
+class WebSocketConnection:
+    """
+    One client connection carrying several concurrent conversations.
+    """
+
+    def __init__(self, websocket, get_or_create_agent, get_session_user, max_conversations, send_queue_size,
+                 coalesce_ms=50, coalesce_chars=256, admission=None, cancellations=None):
+        self.websocket = websocket
+        self.admission = admission
+        self.cancellations = cancellations
+        self.get_or_create_agent = get_or_create_agent
+        self.get_session_user = get_session_user
+        self.max_conversations = max_conversations
+        self.coalesce_ms = coalesce_ms
+        self.coalesce_chars = coalesce_chars
+        self.connection_id = uuid.uuid4().hex[:12]
+        self.outbox = asyncio.Queue(maxsize=send_queue_size)
+        self.conversations = {}  # conversation_id -> running task
+        self.session_ids = set()
+
+    async def run(self):
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                try:
+                    message = await self.websocket.receive_json()
+                except WebSocketDisconnect:
+                    break
+                except ValueError:
+                    self._send_nowait(None, "error", message="Frames must be JSON objects.")
+                    continue
+                await self._dispatch(message)
+        finally:
+            for task in list(self.conversations.values()):
+                task.cancel()
+            writer.cancel()
+            logger.info(f"WebSocket {self.connection_id} closed; cancelled {len(self.conversations)} conversations")
+
+    async def _dispatch(self, message):
+        # Never block here on a full outbox: the reader must keep reading cancel frames.
+        if not isinstance(message, dict):
+            self._send_nowait(None, "error", message="Frames must be JSON objects.")
+            return
+        kind = message.get("type")
+        conversation_id = str(message.get("conversation_id", ""))
+        if not conversation_id:
+            self._send_nowait(None, "error", message="conversation_id is required.")
+        elif kind == "cancel":
+            task = self.conversations.get(conversation_id)
+            if task is not None:
+                task.cancel()
+        elif kind == "query":
+            previous = self.conversations.get(conversation_id)
+            if previous is None and len(self.conversations) >= self.max_conversations:
+                self._send_nowait(conversation_id, "error",
+                                message=f"At most {self.max_conversations} concurrent conversations per connection.")
+            else:
+                # A new query on a busy conversation supersedes the running one.
+                task = asyncio.create_task(self._converse(conversation_id, message, previous))
+                self.conversations[conversation_id] = task
+                task.add_done_callback(lambda done, cid=conversation_id: self._finished(cid, done))
+                if self.cancellations is not None:
+                    self.cancellations.start(self._session_id(conversation_id), task)
+                elif previous is not None:
+                    previous.cancel()
+        else:
+            self._send_nowait(conversation_id, "error", message=f"Unknown frame type: {kind}")
+
+    def _session_id(self, conversation_id):
+        return f"ws:{self.connection_id}:{conversation_id}"
+
+    def _finished(self, conversation_id, task):
+        if self.conversations.get(conversation_id) is task:
+            del self.conversations[conversation_id]
+        if self.cancellations is not None:
+            self.cancellations.finish(self._session_id(conversation_id), task)
+
+    async def _converse(self, conversation_id, message, superseded=None):
+        if superseded is not None:
+            # Let the superseded query unwind first, so it drops its unanswered user turn
+            # from the agent's history before this query adds its own.
+            await asyncio.wait({superseded})
+        session_id = self._session_id(conversation_id)
+        self.session_ids.add(session_id)
+        session = self.get_session_user(session_id)
+        if message.get("user"):
+            session["identifier"] = str(message["user"]).strip()
+        if not session["identifier"]:
+            await self.send(conversation_id, "error", message="No user selected for this conversation; pass 'user'.")
+            return
+
+        started = time.perf_counter()
+        chars = 0
+        admitted_at = None
+        deadline = deadline_from_ms(message.get("deadline_ms"))
+        try:
+            if self.admission is not None:
+                admitted_at = await self.admission.acquire(deadline)
+            agent = await self.get_or_create_agent(session_id, session["identifier"])
+
+            def progress(source, status, elapsed_ms):
+                frame = {"conversation_id": conversation_id, "type": "source",
+                         "source": source, "status": status, "ms": round(elapsed_ms)}
+                # Progress frames are advisory: drop them rather than block when the client is slow.
+                if not self.outbox.full():
+                    self.outbox.put_nowait(frame)
+
+            stream = agent.process_query(str(message.get("query", "")), stream=True, progress=progress,
+                                         deadline=deadline)
+            async for frame in coalesce(stream, self.coalesce_ms, self.coalesce_chars):
+                chars += len(frame.text)
+                if frame.text:
+                    await self.send(conversation_id, "delta", text=frame.text)
+                for citation in frame.citations:
+                    await self.send(conversation_id, "citation", **citation.as_dict())
+            await self.send(conversation_id, "done", chars=chars, ms=round(1000 * (time.perf_counter() - started)))
+        except Overloaded as e:
+            await self.send(conversation_id, "error", message=str(e), retry_after=e.retry_after)
+        except asyncio.CancelledError:
+            self._send_nowait(conversation_id, "cancelled", chars=chars)
+            raise
+        except Exception as e:
+            logger.exception(f"Error in WebSocket conversation {conversation_id}: {str(e)}")
+            await self.send(conversation_id, "error", message=str(e))
+        finally:
+            if admitted_at is not None:
+                self.admission.release(admitted_at)
+
+    async def send(self, conversation_id, kind, **fields):
+        """Queue a frame; waits while the connection's send queue is full (backpressure)."""
+        await self.outbox.put({"conversation_id": conversation_id, "type": kind, **fields})
+
+    def _send_nowait(self, conversation_id, kind, **fields):
+        if not self.outbox.full():
+            self.outbox.put_nowait({"conversation_id": conversation_id, "type": kind, **fields})
+
+    async def _write(self):
+        try:
+            while True:
+                frame = await self.outbox.get()
+                await self.websocket.send_json(frame)
+        except (WebSocketDisconnect, RuntimeError):
+            logger.info(f"WebSocket {self.connection_id} writer stopped")
@@ -73,6 +73,90 @@ def load_config():
             "AOAI_DEPLOYMENT": os.environ["AOAI_DEPLOYMENT"],
             "AOAI_API_VERSION": os.environ.get("AOAI_API_VERSION", "2024-02-15-preview"),
 
+            # Further endpoints serving the same deployments ("url|key,url|key"; key defaults to AOAI_KEY)
+            "AOAI_ENDPOINTS": [entry.strip() for entry in os.environ.get("AOAI_ENDPOINTS", "").split(",") if entry.strip()],
+            "LLM_ENDPOINT_FAILURE_THRESHOLD": int(os.environ.get("LLM_ENDPOINT_FAILURE_THRESHOLD", "3")),
+            "LLM_ENDPOINT_COOLDOWN": float(os.environ.get("LLM_ENDPOINT_COOLDOWN", "30")),
+            "LLM_STICKY_SESSIONS": int(os.environ.get("LLM_STICKY_SESSIONS", "10000")),
+
+            # Model routing: optional fast deployment, tier ("fast"/"premium") per route, complexity thresholds
+            "AOAI_DEPLOYMENT_FAST": os.environ.get("AOAI_DEPLOYMENT_FAST", ""),
+            "MODEL_ROUTE_INTENT": os.environ.get("MODEL_ROUTE_INTENT", "fast").lower(),
+            "MODEL_ROUTE_SUMMARY": os.environ.get("MODEL_ROUTE_SUMMARY", "fast").lower(),
+            "MODEL_ROUTE_SIMPLE": os.environ.get("MODEL_ROUTE_SIMPLE", "fast").lower(),
+            "MODEL_ROUTE_COMPLEX": os.environ.get("MODEL_ROUTE_COMPLEX", "premium").lower(),
+            "MODEL_FALLBACK_ENABLED": os.environ.get("MODEL_FALLBACK_ENABLED", "true").lower() == "true",
+            "COMPLEX_CONTEXT_TOKENS": int(os.environ.get("COMPLEX_CONTEXT_TOKENS", "1500")),
+            "COMPLEX_QUERY_WORDS": int(os.environ.get("COMPLEX_QUERY_WORDS", "25")),
+
+            # Shared LLM client pool
+            "LLM_MAX_CONCURRENCY": int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+            "LLM_MAX_CONNECTIONS": int(os.environ.get("LLM_MAX_CONNECTIONS", "32")),
+            "LLM_KEEPALIVE_EXPIRY": float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "30")),
+
+            # LLM quota scheduling per deployment (0 = no limit), 429 / transient-error retries
+            "LLM_TPM": int(os.environ.get("LLM_TPM", "0")),
+            "LLM_RPM": int(os.environ.get("LLM_RPM", "0")),
+            "LLM_QUEUE_TIMEOUT": float(os.environ.get("LLM_QUEUE_TIMEOUT", "30")),
+            "LLM_EXPECTED_OUTPUT_TOKENS": int(os.environ.get("LLM_EXPECTED_OUTPUT_TOKENS", "300")),
+            "LLM_MAX_RETRIES": int(os.environ.get("LLM_MAX_RETRIES", "3")),
+
+            # Shared Graph client connection pool
+            "GRAPH_MAX_CONNECTIONS": int(os.environ.get("GRAPH_MAX_CONNECTIONS", "32")),
+            "GRAPH_HEDGE_ENABLED": os.environ.get("GRAPH_HEDGE_ENABLED", "false").lower() == "true",
+            "GRAPH_HEDGE_BUDGET": float(os.environ.get("GRAPH_HEDGE_BUDGET", "0.05")),
+            "GRAPH_HEDGE_MIN_SAMPLES": int(os.environ.get("GRAPH_HEDGE_MIN_SAMPLES", "20")),
+
+            # Admission control for the query path
+            "ADMISSION_MAX_IN_FLIGHT": int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "32")),
+            "ADMISSION_MAX_QUEUE": int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+            "ADMISSION_QUEUE_TIMEOUT": float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "10")),
+
+            # Per-query latency budget (to first token) and its Graph share
+            "QUERY_BUDGET_MS": int(os.environ.get("QUERY_BUDGET_MS", "8000")),
+            "GRAPH_BUDGET_SHARE": float(os.environ.get("GRAPH_BUDGET_SHARE", "0.6")),
+            "STALE_SOURCE_MAX_AGE": int(os.environ.get("STALE_SOURCE_MAX_AGE", "3600")),
+
+            # Background warm-up of a user's Graph sources when a session starts
+            "PREFETCH_ON_SESSION_START": os.environ.get("PREFETCH_ON_SESSION_START", "true").lower() == "true",
+            "PREFETCH_SOURCES": [source.strip() for source in os.environ.get("PREFETCH_SOURCES", "").split(",") if source.strip()],
+
+            # Predictive follow-up prefetch: top-k next intents, Graph calls per minute,
+            # seconds before cache expiry to refresh, optional counts file
+            "PREDICTIVE_PREFETCH_TOP_K": int(os.environ.get("PREDICTIVE_PREFETCH_TOP_K", "2")),
+            "PREDICTIVE_PREFETCH_BUDGET": int(os.environ.get("PREDICTIVE_PREFETCH_BUDGET", "60")),
+            "PREDICTIVE_PREFETCH_LEAD": float(os.environ.get("PREDICTIVE_PREFETCH_LEAD", "5")),
+            "INTENT_MODEL_FILE": os.environ.get("INTENT_MODEL_FILE", ""),
+
+            # Deterministic answers for simple lookups (skip the LLM)
+            "FAST_PATH_ENABLED": os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true",
+
+            # Share one LLM call among identical prompts in flight
+            "SINGLE_FLIGHT_ENABLED": os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() == "true",
+
+            # Conversation memory: token budget for verbatim history, size of the rolling summary
+            "HISTORY_TOKEN_BUDGET": int(os.environ.get("HISTORY_TOKEN_BUDGET", "800")),
+            "HISTORY_SUMMARY_WORDS": int(os.environ.get("HISTORY_SUMMARY_WORDS", "120")),
+
+            # UI session store
+            "SESSION_MAX": int(os.environ.get("SESSION_MAX", "200")),
+            "SESSION_IDLE_TIMEOUT": int(os.environ.get("SESSION_IDLE_TIMEOUT", "1800")),
+            "SESSION_HIBERNATE_DIR": os.environ.get("SESSION_HIBERNATE_DIR", ""),
+            "SESSION_SWEEP_INTERVAL": int(os.environ.get("SESSION_SWEEP_INTERVAL", "60")),
+
+            # Streaming frames: tokens are coalesced per time window (ms) or size (chars)
+            "STREAM_COALESCE_MS": int(os.environ.get("STREAM_COALESCE_MS", "50")),
+            "STREAM_COALESCE_CHARS": int(os.environ.get("STREAM_COALESCE_CHARS", "256")),
+
+            # WebSocket API
+            "WS_MAX_CONVERSATIONS": int(os.environ.get("WS_MAX_CONVERSATIONS", "4")),
+            "WS_SEND_QUEUE": int(os.environ.get("WS_SEND_QUEUE", "64")),
+
+            # Prompt context: "compact" (see CORE/context_serializer.py) or "legacy" str(dict)
+            "CONTEXT_FORMAT": os.environ.get("CONTEXT_FORMAT", "compact").lower(),
+            "CONTEXT_TOKEN_MEASURE": os.environ.get("CONTEXT_TOKEN_MEASURE", "false").lower() == "true",
+            "CONTEXT_RECORD_FILE": os.environ.get("CONTEXT_RECORD_FILE", ""),
+
             # Logging
             "logging": {
                 "enabled": os.environ.get("LOGGING_ENABLED", "false").lower() == "true",
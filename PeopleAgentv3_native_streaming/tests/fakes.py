@@ -0,0 +1,100 @@
+"""
+In-process stand-ins for MS Graph and the chat deployments, so agent-level
+tests run without Azure or Graph credentials.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from PeopleAgentv3_native_streaming.CORE.model_router import ModelRouter
+from PeopleAgentv3_native_streaming.CORE.cancellation import CancellationTracker
+from PeopleAgentv3_native_streaming.CORE.prefetch import PrefetchStats
+from PeopleAgentv3_native_streaming.CORE.intent_model import IntentTransitionModel, GraphCallBudget
+from PeopleAgentv3_native_streaming.CORE.fast_path import FastPathStats
+
+USER = "jane@example.com"
+
+GRAPH_DATA = {
+    "profile": {"displayName": "Jane Doe", "mail": USER, "jobTitle": "Engineer", "officeLocation": "London"},
+    "manager": {"displayName": "Bob Roe", "mail": "bob@example.com", "jobTitle": "Lead", "officeLocation": "Seattle"},
+    "reports": {"value": [{"displayName": "Al Poe"}]},
+    "devices": {"value": []},
+    "colleagues": {"value": []},
+    "documents": {"value": [{"name": "plan.docx"}]},
+    "all_users": {"value": []},
+}
+
+
+class FakeGraph:
+    """
+    MSGraphClient stand-in: per-source delays and call counts.
+    """
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = {}
+
+    async def _get(self, source):
+        self.calls[source] = self.calls.get(source, 0) + 1
+        await asyncio.sleep(self.delays.get(source, 0))
+        return GRAPH_DATA[source]
+
+    async def get_user_profile(self, user):
+        return await self._get("profile")
+
+    async def get_manager_info(self, user):
+        return await self._get("manager")
+
+    async def get_direct_reports(self, user):
+        return await self._get("reports")
+
+    async def get_devices(self, user):
+        return await self._get("devices")
+
+    async def get_colleagues(self, user):
+        return await self._get("colleagues")
+
+    async def get_documents(self, user):
+        return await self._get("documents")
+
+    async def get_all_users(self):
+        return await self._get("all_users")
+
+
+class FakeChat:
+    """
+    Chat client stand-in (ainvoke / astream) that records the messages it was sent.
+    """
+
+    def __init__(self, reply="Jane works on the plan. [1]\n\nReferences:\n[1] Profile (Graph API)"):
+        self.reply = reply
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append(messages)
+        return SimpleNamespace(content=self.reply, usage_metadata=None)
+
+    async def astream(self, messages, **kwargs):
+        self.calls.append(messages)
+        for word in self.reply.split(" "):
+            yield SimpleNamespace(content=word + " ", usage_metadata=None)
+
+
+def make_app_context(graph=None, chat=None, **config):
+    """
+    The AppContext attributes a PeopleAgent uses, wired to the fakes above.
+    """
+    config = {"AOAI_DEPLOYMENT": "test", **config}
+    chat = chat or FakeChat()
+    return SimpleNamespace(
+        config=config,
+        model_router=ModelRouter(config, get_client=lambda deployment_config: chat),
+        graph_client=graph or FakeGraph(),
+        cancellations=CancellationTracker(),
+        prefetch_stats=PrefetchStats(),
+        intent_model=IntentTransitionModel(),
+        prefetch_budget=GraphCallBudget(60),
+        fast_path_stats=FastPathStats(),
+        single_flight=None,
+        chat=chat,
+    )
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.admission import AdmissionController, Overloaded
+
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5.0)
+        admission._service_times.append(0.01)  # expected waits well inside the deadline
+        admitted_at = await admission.acquire()
+        queued = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire()
+        assert shed.value.reason == "queue full"
+        assert shed.value.retry_after >= 1
+        admission.release(admitted_at)
+        await queued
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.rejected == 1
+    assert admission.in_flight == 1  # the slot passed straight to the queued query
+
+
+def test_sheds_when_deadline_is_unreachable():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=8)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire(deadline=time.monotonic() + 0.01)
+        return shed.value
+
+    assert asyncio.run(scenario()).reason == "deadline unreachable"
+
+
+def test_expires_in_queue():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=8, queue_timeout=0.05)
+        admission._service_times.append(0.001)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire()
+        return admission, shed.value
+
+    admission, shed = asyncio.run(scenario())
+    assert shed.reason == "deadline expired in queue"
+    assert admission.expired == 1
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=8, queue_timeout=5.0)
+        admission._service_times.append(0.01)
+        admitted_at = await admission.acquire()
+        queued = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        admission.release(admitted_at)
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.cancelled == 1
+    assert admission.in_flight == 0
+
+
+def test_admit_releases_on_error():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=2)
+        with pytest.raises(RuntimeError):
+            async with admission.admit():
+                assert admission.in_flight == 1
+                raise RuntimeError("query failed")
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.in_flight == 0
+    assert admission.admitted == 1
+
+
+def test_release_once_is_idempotent():
+    pytest.importorskip("fastapi")
+    from PeopleAgentv3_native_streaming.UI.api import release_once
+
+    async def scenario():
+        admission = AdmissionController(max_in_flight=2)
+        release = release_once(admission, await admission.acquire())
+        release()  # stream_events' finally
+        release()  # the response's background task
+        return admission
+
+    assert asyncio.run(scenario()).in_flight == 0
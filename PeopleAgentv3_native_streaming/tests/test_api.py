@@ -0,0 +1,29 @@
+import asyncio
+
+from PeopleAgentv3_native_streaming.CORE.cancellation import CancellationTracker
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.UI.api import WebSocketConnection
+from PeopleAgentv3_native_streaming.tests.fakes import FakeGraph, USER, make_app_context
+
+
+def test_superseded_query_leaves_no_user_turn():
+    app_context = make_app_context(FakeGraph({"documents": 0.2}), FAST_PATH_ENABLED=False)
+    agents, sessions = {}, {}
+
+    async def get_or_create_agent(session_id, user):
+        return agents.setdefault(session_id, PeopleAgent(user, app_context))
+
+    def get_session_user(session_id):
+        return sessions.setdefault(session_id, {"identifier": None})
+
+    async def scenario():
+        connection = WebSocketConnection(None, get_or_create_agent, get_session_user, 4, 100,
+                                         cancellations=app_context.cancellations)
+        await connection._dispatch({"type": "query", "conversation_id": "c", "query": "first", "user": USER})
+        await asyncio.sleep(0.05)
+        await connection._dispatch({"type": "query", "conversation_id": "c", "query": "second"})
+        await asyncio.gather(*connection.conversations.values(), return_exceptions=True)
+        return next(iter(agents.values()))
+
+    agent = asyncio.run(scenario())
+    assert [turn["content"] for turn in agent.conversation_history if turn["role"] == "user"] == ["second"]
@@ -0,0 +1,45 @@
+from PeopleAgentv3_native_streaming.CORE.citations import CitationParser
+
+
+def _feed(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def test_references_section_streams_citations_as_lines_complete():
+    parser = CitationParser()
+    events = _feed(parser, ["Jane reports to Bob [1].\n\n**Refer", "ences:**\n[1] Graph ", "manager\n[2] Graph profile"])
+    assert [str(citation) for citation in events] == ["[1] Graph manager"]
+    events = parser.finish()
+    assert [citation.as_dict() for citation in events] == [{"number": 2, "source": "Graph profile"}]
+    assert parser.references_block() == ""  # the model wrote its own section
+
+
+def test_body_citations_without_references_section():
+    parser = CitationParser()
+    _feed(parser, ["Title is Engineer.\n[1] Graph ", "profile\n"])
+    events = parser.finish()
+    assert [str(citation) for citation in events] == ["[1] Graph profile"]
+    assert parser.references_block() == "\n\nReferences:\n[1] Graph profile"
+
+
+def test_repeated_reference_lines_are_ignored():
+    parser = CitationParser()
+    events = _feed(parser, ["See [1].\n### References\n- [1] Graph profile\n[1] Graph profile\n"])
+    assert len(events) == 1
+
+
+def test_unresolved_markers():
+    parser = CitationParser()
+    _feed(parser, ["Jane [1] and Bob [3].\nReferences:\n[1] Graph profile\n"])
+    parser.finish()
+    assert parser.unresolved() == [3]
+
+
+def test_no_citations():
+    parser = CitationParser()
+    _feed(parser, ["No sources here."])
+    assert parser.finish() == []
+    assert parser.references_block() == ""
@@ -0,0 +1,73 @@
+from PeopleAgentv3_native_streaming.CORE.context_pinning import SessionContext
+from PeopleAgentv3_native_streaming.CORE.context_serializer import serialize_context
+
+PROFILE = {"name": "Jane Doe", "title": "Engineer"}
+MANAGER = {"name": "Bob Roe"}
+REPORTS = [{"displayName": "Al Poe"}]
+
+
+def _session(**kwargs):
+    return SessionContext(serialize_context, "jane@example.com", **kwargs)
+
+
+def test_first_turn_pins_sources_and_sends_no_delta():
+    session = _session()
+    delta = session.update({"profile": PROFILE, "manager": MANAGER})
+    assert delta == {}
+    assert session.is_pinned("profile") and session.is_pinned("manager")
+    assert session.pinned_text.startswith("#keys")
+    assert "subject: jane@example.com" in session.pinned_text
+
+
+def test_later_turns_send_only_changed_and_new_sources():
+    session = _session()
+    session.update({"profile": PROFILE, "manager": MANAGER})
+    pinned_text = session.pinned_text
+    assert session.update({"profile": PROFILE, "manager": MANAGER}) == {}
+
+    moved = {**PROFILE, "title": "Lead"}
+    assert session.update({"profile": moved, "manager": MANAGER, "reports": REPORTS}) == {
+        "profile": moved, "reports": REPORTS}
+    assert session.pinned_text == pinned_text  # the cached prefix is unchanged
+
+
+def test_error_strings_are_never_pinned():
+    session = _session()
+    delta = session.update({"profile": PROFILE, "manager": "Error getting manager: 503"})
+    assert delta == {"manager": "Error getting manager: 503"}
+    assert not session.is_pinned("manager")
+    assert session.update({"profile": PROFILE, "manager": MANAGER}) == {"manager": MANAGER}
+
+
+def test_emptied_source_is_reported_explicitly():
+    session = _session()
+    session.update({"profile": PROFILE, "reports": REPORTS})
+    assert session.update({"profile": PROFILE, "reports": []}) == {"reports": "none (changed since Session Data)"}
+
+
+def test_repins_when_most_sources_change():
+    session = _session(repin_ratio=0.5)
+    session.update({"profile": PROFILE, "manager": MANAGER})
+    changed = {"profile": {**PROFILE, "title": "Lead"}, "manager": {"name": "Cy Doe"}, "devices": "Timed out"}
+    assert session.update(changed) == {"devices": "Timed out"}
+    assert "Cy Doe" in session.pinned_text
+
+
+def test_pinned_source_missing_from_a_turn_keeps_its_value():
+    session = _session(repin_ratio=0.0)
+    session.update({"profile": PROFILE, "manager": MANAGER})
+    session.update({"profile": {**PROFILE, "title": "Lead"}})  # manager late; re-pins on the profile change
+    assert session.is_pinned("manager")
+    assert "Bob Roe" in session.pinned_text
+
+
+def test_accounts_full_and_sent_tokens():
+    session = _session()
+    session.update({"profile": PROFILE, "manager": MANAGER})
+    session.update({"profile": PROFILE, "manager": MANAGER})
+    stats = session.stats()
+    assert stats["turns"] == 2
+    assert stats["saved_tokens"] == stats["full_tokens"] - stats["sent_tokens"] > 0
+
+    session.reset()
+    assert session.stats()["turns"] == 0 and session.pinned_text is None
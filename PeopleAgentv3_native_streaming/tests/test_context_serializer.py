@@ -0,0 +1,74 @@
+import json
+
+from PeopleAgentv3_native_streaming.CORE.context_serializer import main, measure_context_tokens, serialize_context
+
+UNESCAPES = {"\\": "\\", "n": "\n", "|": "|", ";": ";"}
+
+
+def _split(line, separator):
+    """
+    Split a rendered line on unescaped separators and undo the escapes: what a reader of the prompt sees.
+    """
+    cells, current, chars = [], [], iter(line)
+    for char in chars:
+        if char == "\\":
+            current.append(UNESCAPES[next(chars)])
+        elif char == separator:
+            cells.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    cells.append("".join(current))
+    return cells
+
+
+def test_renders_records_tables_and_legend():
+    context = {
+        "profile": {"name": "Jane Doe", "email": "jane@example.com", "location": "Unknown", "@odata.context": "x"},
+        "reports": [{"displayName": "Al Poe", "jobTitle": "Engineer"}, {"displayName": "Bo Roe"}],
+        "devices": [],
+        "partial": "Some sources missed the response deadline.",
+    }
+    assert serialize_context(context).splitlines() == [
+        "#keys n=name dn=displayName e=email jt=jobTitle",
+        "profile: n=Jane Doe; e=jane@example.com",
+        "reports[2]{dn,jt}:",
+        "Al Poe|Engineer",
+        "Bo Roe|",
+        "partial: Some sources missed the response deadline.",
+    ]
+
+
+def test_repeated_long_strings_become_references():
+    url = "https://contoso.sharepoint.com/sites/team"
+    rendered = serialize_context({"documents": [{"name": "a", "webUrl": url}, {"name": "b", "webUrl": url}]})
+    assert f"#ref ~1={url}" in rendered
+    assert rendered.count(url) == 1
+    assert rendered.endswith("a|~1\nb|~1")
+
+
+def test_separators_in_values_round_trip():
+    names = ["a|b", "x; y", "two\nlines", "back\\slash", "trailing\\"]
+    rendered = serialize_context({"documents": [{"name": name, "size": 1} for name in names]})
+    rows = rendered.splitlines()[2:]
+    assert len(rows) == len(names)  # no value broke a row
+    assert [_split(row, "|")[0] for row in rows] == names
+
+    record = serialize_context({"profile": {"name": "Doe; Jane", "title": "R|D"}}).splitlines()[1]
+    pairs = _split(record[len("profile: "):], ";")
+    assert [pair.strip() for pair in pairs] == ["n=Doe; Jane", "t=R|D"]
+
+
+def test_compact_format_is_smaller_than_str_dict():
+    context = {"reports": [{"displayName": f"Person {index}", "jobTitle": "Engineer", "mail": None}
+                           for index in range(20)]}
+    stats = measure_context_tokens(context)
+    assert stats["compact_tokens"] < stats["legacy_tokens"]
+    assert stats["saved_tokens"] == stats["legacy_tokens"] - stats["compact_tokens"]
+
+
+def test_measures_recorded_contexts(tmp_path, capsys):
+    path = tmp_path / "contexts.jsonl"
+    path.write_text(json.dumps({"profile": {"name": "Jane Doe"}}) + "\n\n", encoding="utf-8")
+    assert main([str(path)]) == 0
+    assert "1 contexts:" in capsys.readouterr().out
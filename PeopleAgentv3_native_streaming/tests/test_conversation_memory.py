@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from PeopleAgentv3_native_streaming.CORE.conversation_memory import ConversationMemory, strip_references
+from PeopleAgentv3_native_streaming.tests.fakes import FakeChat
+
+
+def _turns(count):
+    history = []
+    for index in range(count):
+        history.append({"role": "user", "content": f"question {index}"})
+        history.append({"role": "assistant", "content": f"answer {index}"})
+    return history
+
+
+class FailingChat:
+    async def ainvoke(self, messages, **kwargs):
+        raise RuntimeError("deployment unavailable")
+
+
+def test_strips_references_block():
+    assert strip_references("Bob Roe. [1]\n\nReferences:\n[1] Manager (Graph API)") == "Bob Roe. [1]"
+    assert strip_references("No references here.") == "No references here."
+
+
+def test_folds_to_max_messages_keeping_latest_exchange():
+    memory = ConversationMemory(FakeChat(), token_budget=10_000, max_messages=4)
+    kept = memory.fold(_turns(4))
+    assert kept == _turns(4)[-4:]
+    assert memory.pending == []  # no event loop: folded synchronously by the extractive fallback
+    assert memory.summary == "Earlier questions: question 0; question 1"
+
+
+def test_folds_to_token_budget_but_keeps_one_exchange():
+    memory = ConversationMemory(FakeChat(), token_budget=1, max_messages=100)
+    assert memory.fold(_turns(3)) == _turns(3)[-2:]
+    assert memory.folded == 4
+
+
+def test_summarizes_folded_turns_in_the_background():
+    chat = FakeChat(json.dumps({"summary": "Asked about Jane's manager.", "facts": {"manager": "Bob Roe"}}))
+    memory = ConversationMemory(chat, token_budget=10_000, max_messages=2)
+
+    async def scenario():
+        kept = memory.fold(_turns(2))
+        assert memory.prompt_history(kept) == _turns(2)  # folded turns stay verbatim until summarized
+        await memory._task
+        return kept
+
+    kept = asyncio.run(scenario())
+    assert memory.prompt_history(kept) == kept
+    assert memory.prompt_text() == "Earlier in this conversation: Asked about Jane's manager.\nKnown facts: manager: Bob Roe"
+    assert "question 0" in chat.calls[0][1]["content"]
+    assert memory.stats()["summaries"] == 1
+
+
+def test_failed_summary_keeps_only_the_questions():
+    memory = ConversationMemory(FailingChat(), token_budget=10_000, max_messages=2, summary_words=4)
+
+    async def scenario():
+        memory.fold(_turns(3))
+        await memory._task
+
+    asyncio.run(scenario())
+    assert memory.failures == 1 and memory.pending == []
+    assert memory.summary == "question 0; question 1"  # trimmed to the last summary_words words
+
+
+def test_snapshot_restores_into_a_fresh_memory():
+    memory = ConversationMemory(FakeChat(), max_messages=2)
+    memory.fold(_turns(2))
+    restored = ConversationMemory(FakeChat())
+    restored.restore(json.loads(json.dumps(memory.snapshot())))
+    assert restored.prompt_text() == memory.prompt_text()
+
+    restored.reset()
+    assert restored.prompt_text() is None
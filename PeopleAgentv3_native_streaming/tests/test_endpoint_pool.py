@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.endpoint_pool import EndpointPool, parse_endpoints
+
+CONFIG = {
+    "AOAI_ENDPOINT": "https://east.example.com/",
+    "AOAI_KEY": "key",
+    "AOAI_ENDPOINTS": ["https://west.example.com/|west-key"],
+    "LLM_ENDPOINT_FAILURE_THRESHOLD": 2,
+    "LLM_ENDPOINT_COOLDOWN": 30.0,
+}
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class EndpointClient:
+    """
+    Per-endpoint chat client stand-in: fails with the queued errors, then answers with its host name.
+    """
+
+    def __init__(self, config):
+        self.name = config["AOAI_ENDPOINT"].split("/")[2]
+        self.key = config["AOAI_KEY"]
+        self.errors = []
+        self.calls = []
+        self.in_flight = 0
+        self.scheduler = SimpleNamespace(paused_until=0.0, _waiting=[])
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(content=self.name)
+
+    async def astream(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        yield SimpleNamespace(content=self.name)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def _pool():
+    pool = EndpointPool(CONFIG, get_client=EndpointClient)
+    return pool, {member.name: member.client for member in pool.members}
+
+
+def _ask(pool, session="jane@example.com"):
+    return asyncio.run(pool.ainvoke([{"role": "user", "content": "q"}], session=session)).content
+
+
+def test_parses_extra_endpoints():
+    assert parse_endpoints(CONFIG) == [("https://east.example.com/", "key"), ("https://west.example.com/", "west-key")]
+
+
+def test_sessions_stick_to_their_endpoint():
+    pool, _ = _pool()
+    first = _ask(pool)
+    assert all(_ask(pool) == first for _ in range(5))
+    assert pool.stats()["sticky_hits"] == 5
+
+
+def test_fails_over_on_server_errors_without_retrying_first():
+    pool, clients = _pool()
+    first = _ask(pool)
+    other = next(name for name in clients if name != first)
+    clients[first].errors.append(ServerError("503"))
+    assert _ask(pool) == other
+    assert clients[first].calls[-1]["retries"] == 0  # only the last candidate spends retries
+    assert "retries" not in clients[other].calls[-1]
+    assert pool.failovers == 1
+
+
+def test_unhealthy_endpoint_is_skipped_and_session_moves():
+    pool, clients = _pool()
+    first = _ask(pool)
+    clients[first].errors.extend([ServerError("503"), ServerError("503")])
+    _ask(pool)
+    _ask(pool)
+    stats = pool.stats()
+    assert not stats["endpoints"][first]["healthy"]
+    calls = len(clients[first].calls)
+    assert _ask(pool) != first and len(clients[first].calls) == calls
+    assert pool.stats()["sticky_moves"] == 1
+
+
+def test_request_errors_do_not_fail_over():
+    pool, clients = _pool()
+    first = _ask(pool)
+    clients[first].errors.append(BadRequest("400"))
+    with pytest.raises(BadRequest):
+        _ask(pool)
+    assert pool.failovers == 0 and pool.stats()["endpoints"][first]["errors"] == 0
+
+
+def test_stream_fails_over_only_before_first_chunk():
+    pool, clients = _pool()
+    first = _ask(pool)
+    clients[first].errors.append(ServerError("503"))
+
+    async def collect():
+        return [chunk.content async for chunk in pool.astream([{"role": "user", "content": "q"}],
+                                                              session="jane@example.com")]
+
+    with pytest.raises(ServerError):
+        asyncio.run(collect())  # the first chunk was already yielded
+    assert pool.failovers == 0
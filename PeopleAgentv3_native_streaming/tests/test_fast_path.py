@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from PeopleAgentv3_native_streaming.CORE.fast_path import match_question, render_answer
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.tests.fakes import FakeGraph, USER, make_app_context
+
+
+def test_matches_templated_questions_only():
+    template, who = match_question("Who is her manager?")
+    assert (template.name, who) == ("manager", "her")
+    assert match_question("what's Jane's job title")[0].name == "title"
+    assert match_question("how many direct reports does she have")[0].name == "report_count"
+    assert match_question("who is her manager and what should I ask him") is None
+
+
+def test_renders_answer_with_references():
+    template, who = match_question("who is her manager")
+    context = {"profile": {"name": "Jane Doe"}, "manager": {"name": "Bob Roe", "title": "Lead", "email": None}}
+    text, references, reason = render_answer(template, who, context, USER)
+    assert text == "Jane Doe's manager is **Bob Roe** (Lead). [1]"
+    assert references == f"\n\nReferences:\n[1] Manager (Graph API): /users/{USER}/manager"
+    assert reason is None
+
+
+def test_falls_back_when_not_confident():
+    template, who = match_question("who is Bob's manager")
+    context = {"profile": {"name": "Jane Doe"}, "manager": {"name": "Bob Roe"}}
+    assert render_answer(template, who, context, USER)[2] == "other subject"
+    template, who = match_question("who is her manager")
+    context = {"profile": {"name": "Jane Doe"}, "manager": "Error getting manager: 503"}
+    assert render_answer(template, who, context, USER)[2] == "manager unavailable"
+    assert render_answer(template, who, {"profile": {}, "manager": {"name": None}}, USER)[2] == "missing field"
+
+
+def test_agent_answers_without_llm_and_fetches_only_template_sources():
+    app_context = make_app_context()
+    agent = PeopleAgent(USER, app_context)
+    response = asyncio.run(agent.process_query("who is her manager", stream=False))
+    assert response.startswith("Jane Doe's manager is **Bob Roe**")
+    assert app_context.graph_client.calls == {"profile": 1, "manager": 1}
+    assert app_context.chat.calls == []
+    assert app_context.fast_path_stats.answered == 1
+
+
+def test_deadline_falls_back_and_joins_the_late_fetch():
+    app_context = make_app_context(FakeGraph({"manager": 0.3}))
+    agent = PeopleAgent(USER, app_context)
+
+    async def scenario():
+        started = time.monotonic()
+        response = await agent.process_query("who is her manager", stream=False, deadline=time.monotonic() + 0.1)
+        return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.25  # did not wait for the slow manager fetch
+    assert response == app_context.chat.reply  # answered by the LLM from partial context
+    assert app_context.fast_path_stats.fallbacks == {"deadline": 1}
+    assert app_context.graph_client.calls["manager"] == 1  # the full gather joined the fast path's fetch
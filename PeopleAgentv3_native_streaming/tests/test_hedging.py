@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.hedging import HedgePolicy
+
+
+def _policy(budget=1.0, p90=0.01):
+    policy = HedgePolicy(budget=budget, min_samples=1)
+    policy._observe("profile", p90)
+    return policy
+
+
+def _requests(*behaviours):
+    """
+    request() coroutine function; the n-th call sleeps behaviours[n][0] and returns or raises behaviours[n][1].
+    """
+    calls = iter(behaviours)
+
+    async def request():
+        delay, outcome = next(calls)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return request
+
+
+def test_no_hedge_before_min_samples():
+    policy = HedgePolicy(budget=1.0, min_samples=5)
+    result = asyncio.run(policy.run("profile", _requests((0.01, "primary"))))
+    assert result == "primary"
+    assert policy.hedged == 0
+
+
+def test_hedge_wins_over_slow_primary():
+    policy = _policy()
+    result = asyncio.run(policy.run("profile", _requests((0.2, "primary"), (0.0, "hedge"))))
+    assert result == "hedge"
+    assert policy.hedged == 1 and policy.hedge_wins == 1
+    assert policy.cancelled == 1
+
+
+def test_successful_hedge_preferred_over_failed_primary():
+    policy = _policy()
+    request = _requests((0.03, RuntimeError("primary failed")), (0.02, "hedge"))
+    assert asyncio.run(policy.run("profile", request)) == "hedge"
+
+
+def test_waits_for_hedge_after_primary_fails():
+    policy = _policy()
+    request = _requests((0.02, RuntimeError("primary failed")), (0.05, "hedge"))
+    assert asyncio.run(policy.run("profile", request)) == "hedge"
+
+
+def test_raises_when_every_copy_fails():
+    policy = _policy()
+    request = _requests((0.02, RuntimeError("primary failed")), (0.02, RuntimeError("hedge failed")))
+    with pytest.raises(RuntimeError):
+        asyncio.run(policy.run("profile", request))
+
+
+def test_budget_denies_hedges():
+    policy = _policy(budget=0.0)
+    assert asyncio.run(policy.run("profile", _requests((0.03, "primary")))) == "primary"
+    assert policy.hedged == 0 and policy.denied == 1
+
+
+def test_records_primary_latency_not_the_winners():
+    async def scenario():
+        policy = _policy()
+        await policy.run("profile", _requests((0.2, "primary"), (0.0, "hedge")))
+        await asyncio.sleep(0.01)  # let the cancelled primary report
+        return policy
+
+    samples = list(asyncio.run(scenario()).latencies["profile"])
+    assert len(samples) == 2
+    assert samples[-1] >= 0.01  # at least the hedge delay, though the hedge answered sooner
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.tests.fakes import FakeGraph, USER, make_app_context
+
+
+def _agent(delays):
+    app_context = make_app_context(FakeGraph(delays), FAST_PATH_ENABLED=False, PREDICTIVE_PREFETCH_TOP_K=0)
+    return PeopleAgent(USER, app_context), app_context
+
+
+def _ask(agent, query, budget):
+    return agent.process_query(query, stream=False, deadline=time.monotonic() + budget)
+
+
+def test_late_source_is_marked_unavailable():
+    agent, app_context = _agent({"documents": 0.3})
+    context = asyncio.run(agent._gather_context(deadline=time.monotonic() + 0.05))
+    assert context["documents"] == "Timed out getting documents; not available for this answer."
+    assert "not available: documents" in context["partial"]
+    assert context["profile"]["name"] == "Jane Doe"
+
+
+def test_later_queries_join_the_late_fetch():
+    agent, app_context = _agent({"documents": 0.3})
+
+    async def scenario():
+        await _ask(agent, "which documents did she edit", 0.1)
+        await _ask(agent, "which files did she share", 0.1)
+        await _ask(agent, "what is she working on", 1.0)  # waits for the running fetch
+
+    asyncio.run(scenario())
+    assert app_context.graph_client.calls["documents"] == 1
+    assert ("get_documents", (), frozenset()) in agent._ttl_cache  # the late fetch warmed the cache
+
+
+def test_expired_cache_entry_serves_a_late_source():
+    agent, app_context = _agent({})
+
+    async def scenario():
+        await agent._gather_context()
+        entry = agent._ttl_cache[("get_documents", (), frozenset())]
+        agent._ttl_cache[("get_documents", (), frozenset())] = (entry[0], entry[1] - 120)  # past its TTL
+        app_context.graph_client.delays["documents"] = 0.3
+        return await agent._gather_context(deadline=time.monotonic() + 0.05)
+
+    context = asyncio.run(scenario())
+    assert context["documents"] == [{"name": "plan.docx"}]
+    assert "possibly outdated: documents (cached 120s ago)" in context["partial"]
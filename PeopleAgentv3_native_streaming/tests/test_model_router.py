@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.model_router import ModelRouter
+
+CONFIG = {"AOAI_DEPLOYMENT": "premium-model", "AOAI_DEPLOYMENT_FAST": "fast-model"}
+
+
+class Deployment:
+    """
+    Endpoint pool stand-in for one deployment: replies with its name, or fails.
+    """
+
+    def __init__(self, name, fail=False, fail_after=None):
+        self.name = name
+        self.fail = fail
+        self.fail_after = fail_after  # chunks streamed before failing
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return SimpleNamespace(content=self.name, usage_metadata={"input_tokens": 7, "output_tokens": 1})
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        for index, word in enumerate(("from", self.name)):
+            if self.fail or index == self.fail_after:
+                raise RuntimeError(f"{self.name} unavailable")
+            yield SimpleNamespace(content=word, usage_metadata=None)
+
+
+def _router(config=CONFIG, **failing):
+    deployments = {}
+
+    def get_client(deployment_config):
+        name = deployment_config["AOAI_DEPLOYMENT"]
+        return deployments.setdefault(name, Deployment(name, **failing.get(name, {})))
+    return ModelRouter(config, get_client=get_client), deployments
+
+
+def _stream(client):
+    async def collect():
+        return [chunk.content async for chunk in client.astream([{"role": "user", "content": "q"}])]
+    return asyncio.run(collect())
+
+
+def test_routes_by_query_and_context_size():
+    router, _ = _router()
+    assert router.answer_route("who is her manager") == "simple"
+    assert router.answer_route("compare her team with her manager's") == "complex"
+    assert router.answer_route("who is her manager", context_tokens=5000) == "complex"
+    assert router.tiers["intent"] == "fast" and router.tiers["complex"] == "premium"
+
+
+def test_records_usage_per_route():
+    router, _ = _router()
+    reply = asyncio.run(router.client("simple").ainvoke([{"role": "user", "content": "q"}]))
+    assert reply.content == "fast-model"
+    stats = router.stats()["routes"]["simple"]
+    assert stats["calls"] == 1 and stats["by_tier"]["fast"] == 1
+    assert (stats["input_tokens"], stats["output_tokens"]) == (7, 1)
+
+
+def test_falls_back_to_the_other_tier():
+    router, _ = _router(**{"fast-model": {"fail": True}})
+    reply = asyncio.run(router.client("simple").ainvoke([{"role": "user", "content": "q"}]))
+    assert reply.content == "premium-model"
+    stats = router.stats()["routes"]["simple"]
+    assert stats["errors"] == 1 and stats["fallbacks"] == 1 and stats["by_tier"]["premium"] == 1
+
+
+def test_raises_when_both_tiers_fail():
+    router, _ = _router(**{"fast-model": {"fail": True}, "premium-model": {"fail": True}})
+    with pytest.raises(RuntimeError):
+        asyncio.run(router.client("simple").ainvoke([{"role": "user", "content": "q"}]))
+    assert router.stats()["routes"]["simple"]["errors"] == 2
+
+
+def test_no_fallback_with_a_single_deployment():
+    router, deployments = _router({"AOAI_DEPLOYMENT": "only-model"}, **{"only-model": {"fail": True}})
+    with pytest.raises(RuntimeError):
+        asyncio.run(router.client("simple").ainvoke([{"role": "user", "content": "q"}]))
+    assert deployments["only-model"].calls == 1
+
+
+def test_stream_falls_back_only_before_the_first_chunk():
+    router, _ = _router(**{"fast-model": {"fail": True}})
+    assert _stream(router.client("simple")) == ["from", "premium-model"]
+
+    router, deployments = _router(**{"fast-model": {"fail_after": 1}})
+    with pytest.raises(RuntimeError):
+        _stream(router.client("simple"))  # text already reached the caller: no retry
+    assert deployments["premium-model"].calls == 0
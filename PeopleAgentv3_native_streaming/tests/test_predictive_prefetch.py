@@ -0,0 +1,78 @@
+import asyncio
+
+from PeopleAgentv3_native_streaming.CORE.intent_model import GraphCallBudget, classify_intent
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.tests.fakes import USER, make_app_context
+
+
+def _agent(**config):
+    app_context = make_app_context(**config)
+    for _ in range(3):
+        app_context.intent_model.observe("manager", "documents")
+    return PeopleAgent(USER, app_context), app_context
+
+
+def test_classifies_intent_by_source():
+    assert classify_intent("who is her manager") == "manager"
+    assert classify_intent("which documents did she edit") == "documents"
+
+
+def test_fetches_uncached_predicted_source_after_answer():
+    agent, app_context = _agent()
+
+    async def scenario():
+        await agent.process_query("who is her manager", stream=False)
+        await asyncio.sleep(0.05)
+        calls_before_follow_up = dict(app_context.graph_client.calls)
+        await agent.process_query("which documents did she edit", stream=False)
+        return calls_before_follow_up
+
+    calls_before_follow_up = asyncio.run(scenario())
+    assert calls_before_follow_up["documents"] == 1  # fetched speculatively while the user read
+    assert app_context.prefetch_budget.spent == 1
+    assert app_context.graph_client.calls["documents"] == 1  # the follow-up found it warm
+    assert app_context.intent_model.hits == 1
+
+
+def test_refreshes_cached_predicted_source_just_before_it_expires():
+    # a 60 s TTL with a 59.9 s lead: the refresh is due about 0.1 s after the answer
+    agent, app_context = _agent(FAST_PATH_ENABLED=False, PREDICTIVE_PREFETCH_LEAD=59.9)
+
+    async def scenario():
+        await agent.process_query("who is her manager", stream=False)
+        await asyncio.sleep(0.02)
+        early = app_context.graph_client.calls["documents"]
+        await asyncio.sleep(0.2)
+        return early
+
+    early = asyncio.run(scenario())
+    assert early == 1  # only the answer's own fetch; the cache entry is still fresh
+    assert app_context.graph_client.calls["documents"] == 2
+    assert app_context.prefetch_budget.spent == 1
+
+
+def test_budget_limits_speculative_fetches():
+    agent, app_context = _agent()
+    app_context.prefetch_budget = GraphCallBudget(calls_per_minute=1)
+    app_context.prefetch_budget.tokens = 0
+
+    async def scenario():
+        await agent.process_query("who is her manager", stream=False)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert "documents" not in app_context.graph_client.calls
+    assert app_context.prefetch_budget.denied == 1
+
+
+def test_clear_memory_cancels_scheduled_refreshes():
+    agent, app_context = _agent(FAST_PATH_ENABLED=False, PREDICTIVE_PREFETCH_LEAD=59.9)
+
+    async def scenario():
+        await agent.process_query("who is her manager", stream=False)
+        agent.clear_memory()
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    assert app_context.graph_client.calls["documents"] == 1
+    assert app_context.prefetch_budget.spent == 0
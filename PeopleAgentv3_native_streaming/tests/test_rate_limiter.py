@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.admission import Overloaded
+from PeopleAgentv3_native_streaming.CORE.rate_limiter import (
+    BATCH, INTERACTIVE, LLMScheduler, is_rate_limited, is_transient, retry_after)
+
+
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class _APIError(Exception):
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = _Response(headers or {})
+
+
+def test_interactive_goes_before_batch():
+    async def scenario():
+        scheduler = LLMScheduler(poll=0.01)
+        scheduler.backoff(0.05)  # hold both calls in the queue
+        order = []
+
+        async def call(priority, name):
+            await scheduler.acquire(10, priority)
+            order.append(name)
+
+        batch = asyncio.create_task(call(BATCH, "batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call(INTERACTIVE, "interactive"))
+        await asyncio.gather(batch, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_backoff_pauses_calls_for_retry_after():
+    async def scenario():
+        scheduler = LLMScheduler(poll=0.01)
+        scheduler.backoff(0.1)
+        started = time.monotonic()
+        await scheduler.acquire(10)
+        return scheduler, time.monotonic() - started
+
+    scheduler, waited = asyncio.run(scenario())
+    assert waited >= 0.09
+    assert scheduler.stats()["throttled_429"] == 1
+
+
+def test_token_bucket_delays_calls_over_quota():
+    async def scenario():
+        scheduler = LLMScheduler(tpm=6000, poll=0.01)  # 100 tokens per second
+        await scheduler.acquire(6000)
+        started = time.monotonic()
+        await scheduler.acquire(10)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.08
+
+
+def test_times_out_with_overloaded():
+    async def scenario():
+        scheduler = LLMScheduler(queue_timeout=0.05, poll=0.01)
+        scheduler.backoff(5)
+        await scheduler.acquire(10)
+
+    with pytest.raises(Overloaded):
+        asyncio.run(scenario())
+
+
+def test_retry_after_sources():
+    assert retry_after(_APIError("429", headers={"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(_APIError("429", headers={"retry-after": "7"})) == 7.0
+    assert retry_after(_APIError("Rate limit. Please retry after 12 seconds.")) == 12.0
+    assert retry_after(_APIError("429"), default=3.0) == 3.0
+
+
+def test_error_classification():
+    assert is_rate_limited(_APIError("Too many requests", status_code=429))
+    assert not is_rate_limited(_APIError("Bad request", status_code=400))
+    assert is_transient(_APIError("Service unavailable", status_code=503))
+    assert is_transient(Overloaded("queue full", 1))
+    assert not is_transient(_APIError("Bad request", status_code=400))
@@ -0,0 +1,88 @@
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.CORE.session_store import SessionStore
+from PeopleAgentv3_native_streaming.tests.fakes import USER, make_app_context
+
+
+def _agent(user=USER):
+    return PeopleAgent(user, make_app_context())
+
+
+def _age(store, session_id, seconds):
+    agent, last_used = store._sessions[session_id]
+    store._sessions[session_id] = (agent, last_used - seconds)
+
+
+def test_evicts_least_recently_used_over_capacity():
+    store = SessionStore(max_sessions=2, sweep_interval=0)
+    store.put("a", _agent())
+    store.put("b", _agent())
+    store.get("a")
+    store.put("c", _agent())
+    assert "b" not in store and "a" in store and "c" in store
+    assert store.evictions == 1
+
+
+def test_evicts_idle_sessions():
+    store = SessionStore(idle_timeout=60, sweep_interval=0)
+    agent = _agent()
+    agent.conversation_history.append({"role": "user", "content": "who is her manager"})
+    store.put("a", agent)
+    store.put("b", _agent())
+    _age(store, "a", 120)
+    assert store.evict_idle() == 1
+    assert "a" not in store and "b" in store
+    assert agent.conversation_history == []  # cleared on eviction
+
+
+def test_defers_eviction_of_busy_agents():
+    store = SessionStore(max_sessions=1, idle_timeout=60, sweep_interval=0)
+    busy = _agent()
+    store.put("a", busy)
+    busy.active_queries = 1
+    store.put("b", _agent())
+    assert "a" in store and len(store) == 2  # over the bound until the query finishes
+    _age(store, "a", 120)
+    assert store.evict_idle() == 0
+    assert store.deferred == 3  # once on put, then in both the idle and the LRU pass
+
+    busy.active_queries = 0
+    assert store.evict_idle() == 1
+    assert "a" not in store
+
+
+def test_never_evicts_the_session_just_used():
+    store = SessionStore(max_sessions=1, sweep_interval=0)
+    busy = _agent()
+    store.put("a", busy)
+    busy.active_queries = 1
+    agent = store.put("b", _agent())
+    assert store.get("b") is agent
+
+
+def test_hibernated_history_is_not_restored_for_another_user(tmp_path):
+    store = SessionStore(idle_timeout=60, hibernate_dir=str(tmp_path), sweep_interval=0)
+    agent = _agent()
+    history = [{"role": "user", "content": "who is her manager"}, {"role": "assistant", "content": "Bob Roe."}]
+    agent.conversation_history.extend(history)
+    store.put("a", agent)
+    _age(store, "a", 120)
+    store.evict_idle()
+    assert store.hibernations == 1
+
+    other_user = store.put("a", _agent("bob@example.com"))
+    assert other_user.conversation_history == []
+    assert store.restores == 0
+
+
+def test_restores_for_the_same_user(tmp_path):
+    store = SessionStore(idle_timeout=60, hibernate_dir=str(tmp_path), sweep_interval=0)
+    agent = _agent()
+    agent.conversation_history.append({"role": "user", "content": "who is her manager"})
+    store.put("a", agent)
+    _age(store, "a", 120)
+    store.evict_idle()
+
+    restored = store.put("a", _agent())
+    assert restored.conversation_history == [{"role": "user", "content": "who is her manager"}]
+    assert store.restores == 1
+    assert store.stats()["by_session"][0]["history_messages"] == 1
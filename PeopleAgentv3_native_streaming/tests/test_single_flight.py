@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from PeopleAgentv3_native_streaming.CORE.single_flight import SingleFlight, prompt_key
+
+
+def _messages(prompt):
+    return [{"role": "system", "content": "You are a helpful assistant."}, {"role": "user", "content": prompt}]
+
+
+def test_prompt_key_normalizes_clock_and_whitespace_only():
+    base = prompt_key(_messages("Current UTC: 10:15\nWho is  Jane's manager?"))
+    assert prompt_key(_messages("Current UTC: 10:16\nWho is Jane's manager?")) == base
+    assert prompt_key(_messages("Current UTC: 10:15\nWho is JANE's manager?")) != base
+
+
+def test_prompt_key_includes_route():
+    class Client:
+        route = "complex"
+    assert prompt_key(_messages("hi"), Client()) != prompt_key(_messages("hi"))
+
+
+def test_identical_calls_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def make_call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flights.call("key", make_call) for _ in range(5)))
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["answer"] * 5
+    assert flights.stats()["coalesced"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def make_call():
+            await asyncio.sleep(0.02)
+            return "answer"
+
+        first = asyncio.create_task(flights.call("key", make_call))
+        second = asyncio.create_task(flights.call("key", make_call))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "answer"
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def _model_stream(opened, chunks=("a", "b", "c"), delay=0.005):
+    async def stream():
+        opened.append(1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+    return stream
+
+
+def test_stream_fan_out_replays_to_late_joiners():
+    async def scenario():
+        flights = SingleFlight()
+        opened = []
+        open_stream = _model_stream(opened)
+        first = asyncio.create_task(_collect(flights.stream("key", open_stream)))
+        await asyncio.sleep(0.008)  # the first chunk is already out
+        late = asyncio.create_task(_collect(flights.stream("key", open_stream)))
+        return flights, opened, await first, await late
+
+    flights, opened, first, late = asyncio.run(scenario())
+    assert len(opened) == 1
+    assert first == late == ["a", "b", "c"]
+    assert flights.stats()["late_joins"] == 1
+    assert flights.stats()["max_fan_out"] == 2
+
+
+def test_stream_survives_one_subscriber_cancelling():
+    async def scenario():
+        flights = SingleFlight()
+        open_stream = _model_stream([])
+        leaving = asyncio.create_task(_collect(flights.stream("key", open_stream)))
+        staying = asyncio.create_task(_collect(flights.stream("key", open_stream)))
+        await asyncio.sleep(0.007)
+        leaving.cancel()
+        return flights, await staying
+
+    flights, chunks = asyncio.run(scenario())
+    assert chunks == ["a", "b", "c"]
+    assert flights.abandoned == 0
+
+
+def test_stream_closed_when_every_subscriber_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        closed = []
+
+        async def stream():
+            try:
+                while True:
+                    await asyncio.sleep(0.005)
+                    yield "chunk"
+            finally:
+                closed.append(1)
+
+        subscribers = [asyncio.create_task(_collect(flights.stream("key", stream))) for _ in range(2)]
+        await asyncio.sleep(0.012)
+        for subscriber in subscribers:
+            subscriber.cancel()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return flights, closed
+
+    flights, closed = asyncio.run(scenario())
+    assert flights.abandoned == 1
+    assert closed == [1]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_stream_error_reaches_every_subscriber():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def stream():
+            yield "a"
+            await asyncio.sleep(0.005)
+            raise RuntimeError("model failed")
+
+        return await asyncio.gather(*(_collect(flights.stream("key", stream)) for _ in range(2)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
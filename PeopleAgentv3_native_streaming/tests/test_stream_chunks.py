@@ -0,0 +1,64 @@
+import asyncio
+
+from PeopleAgentv3_native_streaming.CORE.stream_chunks import StreamChunk, coalesce
+
+
+async def _chunks(texts, delay=0.0, citation_at=None):
+    for index, text in enumerate(texts):
+        if delay:
+            await asyncio.sleep(delay)
+        yield StreamChunk(StreamChunk.DELTA, text)
+        if index == citation_at:
+            yield StreamChunk(StreamChunk.CITATION, "", "citation")
+
+
+def _frames(stream, window_ms, max_chars=256):
+    async def collect():
+        return [frame async for frame in coalesce(stream, window_ms, max_chars)]
+    return asyncio.run(collect())
+
+
+def test_zero_window_yields_one_frame_per_chunk():
+    frames = _frames(_chunks(["a", "b", "c"]), 0)
+    assert [frame.text for frame in frames] == ["a", "b", "c"]
+
+
+def test_groups_chunks_within_the_window():
+    frames = _frames(_chunks(["a", "b", "c", "d"]), 1000)
+    assert [(frame.text, frame.chunks) for frame in frames] == [("abcd", 4)]
+
+
+def test_flushes_on_size():
+    frames = _frames(_chunks(["aa", "bb", "cc", "d"]), 1000, max_chars=4)
+    assert [frame.text for frame in frames] == ["aabb", "ccd"]
+
+
+def test_flushes_when_window_expires_between_slow_chunks():
+    frames = _frames(_chunks(["a", "b"], delay=0.05), 10)
+    assert [frame.text for frame in frames] == ["a", "b"]
+
+
+def test_carries_citations_with_their_frame():
+    frames = _frames(_chunks(["a", "b"], citation_at=0), 1000)
+    assert len(frames) == 1 and frames[0].citations == ["citation"]
+
+
+def test_consumer_stopping_closes_the_stream():
+    closed = []
+
+    async def stream():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield StreamChunk(StreamChunk.DELTA, "x")
+        finally:
+            closed.append(True)
+
+    async def first_frame():
+        frames = coalesce(stream(), 0)
+        frame = await frames.__anext__()
+        await frames.aclose()
+        return frame
+
+    assert asyncio.run(first_frame()).text == "x"
+    assert closed == [True]
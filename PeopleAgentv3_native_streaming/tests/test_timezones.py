@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from PeopleAgentv3_native_streaming.CORE.people_agent import PeopleAgent
+from PeopleAgentv3_native_streaming.CORE.timezones import asks_about_time, local_time, resolve_zone
+from PeopleAgentv3_native_streaming.tests.fakes import USER, make_app_context
+
+
+def test_resolves_office_locations_as_whole_words():
+    assert resolve_zone("Building 92, Redmond") == ("America/Los_Angeles", "office")
+    assert resolve_zone("London - Paddington") == ("Europe/London", "office")
+    assert resolve_zone("Londonderry") is None
+    assert resolve_zone("Reading") is None  # a common word, not in the table
+    assert resolve_zone("Unknown") is None and resolve_zone(None) is None
+
+
+def test_local_time_reading_includes_offset_and_zone():
+    summer = datetime(2024, 7, 2, 21, 5, tzinfo=timezone.utc)
+    assert local_time("America/Los_Angeles", summer) == "Tue 14:05 UTC-07:00 America/Los_Angeles"
+    winter = datetime(2024, 1, 2, 21, 5, tzinfo=timezone.utc)
+    assert local_time("Europe/London", winter) == "Tue 21:05 UTC+00:00 Europe/London"
+
+
+def test_detects_time_questions():
+    assert asks_about_time("Is she awake right now?")
+    assert asks_about_time("when can I schedule a meeting with her manager")
+    assert not asks_about_time("who is her manager")
+
+
+def test_agent_adds_local_time_only_for_time_questions():
+    agent = PeopleAgent(USER, make_app_context())
+    profile = agent.format_data("profile", {"displayName": "Jane Doe", "officeLocation": "London"})
+    manager = agent.format_data("manager", {"displayName": "Bob Roe", "officeLocation": "Mars Base"})
+    assert profile["timezone"] == "Europe/London" and manager["timezone"] == "Unknown"
+
+    assert "local_time" not in agent._add_local_time({"profile": profile, "manager": manager}, "who is her manager")
+    context = agent._add_local_time({"profile": profile, "manager": manager}, "what time is it for her")
+    assert context["local_time"].startswith("Jane Doe: ") and context["local_time"].endswith(" Europe/London")
+    assert "manager" not in context["local_time"]  # no zone for the manager